@@ -10,9 +10,11 @@ class AESEncryption:
         aes_key = os.getenv("AES_KEY")
         
         if aes_key:
-            self.cipher = Fernet(aes_key.encode())
+            self.key = aes_key.encode()
+            self.cipher = Fernet(self.key)
         else:
             generated_key = Fernet.generate_key()
+            self.key = generated_key
             self.cipher = Fernet(generated_key)
             print("⚠️  AES_KEY not set in .env")
             print(f"📌 Generated key: {generated_key.decode()}")
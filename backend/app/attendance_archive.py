@@ -0,0 +1,86 @@
+from datetime import date
+from typing import List
+from sqlalchemy import select, delete, func
+from sqlalchemy.engine import Engine
+from app.models import Attendance, AttendanceArchive, ArchivedMonth
+from app.integrity_digests import month_key, month_bounds
+
+hot = Attendance.__table__
+cold = AttendanceArchive.__table__
+
+def shift_month(day: date, months: int) -> date:
+    """First day of the month `months` after (negative: before) the month of `day`"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def months_to_archive(engine: Engine, keep_months: int, today: date = None) -> List[str]:
+    """
+    Months still in the attendance table that are older than the current
+    month and the `keep_months` closed months before it, oldest first
+    """
+    cutoff = shift_month(today or date.today(), -keep_months)
+    with engine.connect() as conn:
+        oldest = conn.execute(select(func.min(hot.c.day))).scalar()
+
+    months = []
+    month_start = shift_month(oldest, 0) if oldest else cutoff
+    while month_start < cutoff:
+        months.append(month_key(month_start))
+        month_start = shift_month(month_start, 1)
+    return months
+
+def archive_month(engine: Engine, month: str) -> int:
+    """
+    Move one month of attendance into attendance_archive in a single transaction
+
+    Rows keep their ids, HMACs and digests, so integrity checks work the
+    same on archived rows. Returns the number of rows moved.
+    """
+    first_day, last_day = month_bounds(month)
+    in_month = (hot.c.day >= first_day) & (hot.c.day <= last_day)
+
+    with engine.begin() as conn:
+        moved = conn.execute(cold.insert().from_select(
+            [column.name for column in hot.c],
+            select(hot).where(in_month)
+        )).rowcount
+        deleted = conn.execute(delete(hot).where(in_month)).rowcount
+        if deleted != moved:
+            raise RuntimeError(f"Archiving {month} copied {moved} rows but deleted {deleted}")
+
+        record_count = conn.execute(select(ArchivedMonth.record_count).where(ArchivedMonth.month == month)).scalar()
+        if record_count is None:
+            conn.execute(ArchivedMonth.__table__.insert().values(month=month, record_count=moved))
+        else:
+            conn.execute(ArchivedMonth.__table__.update().where(ArchivedMonth.month == month).values(record_count=record_count + moved))
+    return moved
+
+def archive_closed_months(engine: Engine, keep_months: int, today: date = None) -> dict:
+    """
+    Archive every month older than the last `keep_months` closed months
+
+    Months are archived oldest first, so archived months are always older
+    than hot ones and attendance_tier only has to compare against the
+    newest archived month. Rows added later to an archived month (e.g. a
+    late approval) are moved on the next run.
+    """
+    months = months_to_archive(engine, keep_months, today)
+    stats = {"months": 0, "rows": 0}
+    if not months:
+        return stats
+
+    if engine.dialect.name == "sqlite":
+        # SQLite hands out max(id) + 1 for new rows; if the newest row were
+        # archived, its id would be reused in the hot table
+        with engine.connect() as conn:
+            newest_day = conn.execute(select(hot.c.day).order_by(hot.c.id.desc()).limit(1)).scalar()
+        if newest_day is None or month_key(newest_day) <= months[-1]:
+            print("[ARCHIVE] ⚠️ The newest attendance row is in a month to archive; skipping until newer attendance exists")
+            return stats
+
+    for month in months:
+        moved = archive_month(engine, month)
+        stats["months"] += 1
+        stats["rows"] += moved
+        print(f"[ARCHIVE] ✅ {month}: {moved} attendance rows archived")
+    return stats
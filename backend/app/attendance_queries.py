@@ -0,0 +1,158 @@
+import base64
+import calendar
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import or_, and_, func, select, union_all
+from sqlalchemy.orm import Session, aliased
+from app.models import User, Employee, Attendance, AttendanceArchive, ArchivedMonth
+
+MAX_PAGE_SIZE = 1000
+
+# Hot and archived attendance as one relation, mapped to Attendance so the
+# same ORM query can run against either tier
+ALL_ATTENDANCE = aliased(Attendance, union_all(
+    select(Attendance.__table__),
+    select(*[AttendanceArchive.__table__.c[column.name] for column in Attendance.__table__.c])
+).subquery("attendance_all"), name="attendance_all")
+
+def day_range(start_date: str, end_date: str, source=Attendance) -> tuple:
+    """
+    Sargable predicates for an inclusive ISO date range
+
+    Filters on the indexed Attendance.day column instead of wrapping
+    Attendance.date in a function, so SQLite can use the index.
+
+    Raises:
+        ValueError: If either date is not in ISO format
+    """
+    return (
+        source.day >= date.fromisoformat(start_date),
+        source.day <= date.fromisoformat(end_date)
+    )
+
+def archive_horizon(db: Session) -> Optional[date]:
+    """Last day of the newest archived month, or None if nothing is archived"""
+    month = db.query(func.max(ArchivedMonth.month)).scalar()
+    if month is None:
+        return None
+    year, month_number = int(month[:4]), int(month[5:7])
+    return date(year, month_number, calendar.monthrange(year, month_number)[1])
+
+def attendance_tier(db: Session, start_date: Optional[str] = None):
+    """
+    The attendance entity to query for a range starting at start_date
+    (None for the whole history)
+
+    Returns Attendance when the range starts after the newest archived month,
+    so the query only touches the hot table; otherwise ALL_ATTENDANCE.
+
+    Raises:
+        ValueError: If start_date is not in ISO format
+    """
+    start = date.fromisoformat(start_date) if start_date else None
+    horizon = archive_horizon(db)
+    if horizon is None or (start is not None and start > horizon):
+        return Attendance
+    return ALL_ATTENDANCE
+
+def encode_cursor(record_date: datetime, record_id: int) -> str:
+    """
+    Encode the (date, id) of the last row on a page as an opaque cursor
+    """
+    raw = f"{record_date.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+def fetch_attendance_range(
+    db: Session,
+    start_date: str,
+    end_date: str,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Tuple[List, Optional[str]]:
+    """
+    Fetch attendance of all approved employees in a date range with a single
+    joined query over Attendance/Employee/User
+
+    Rows are ordered newest first by (date, id), which is also the keyset used
+    for pagination: pass the returned cursor back to get the next page.
+    Archived attendance is included when the range reaches into it.
+
+    Args:
+        db: Database session
+        start_date: First day (inclusive) in ISO format
+        end_date: Last day (inclusive) in ISO format
+        department: Only return employees of this department
+        status: Only return records with this status
+        cursor: Cursor returned by a previous call
+        limit: Page size (None returns the whole range)
+
+    Returns:
+        (rows, next_cursor) - next_cursor is None on the last page
+    """
+    source = attendance_tier(db, start_date)
+    query = db.query(
+        source.id,
+        source.employee_id,
+        source.date,
+        source.status,
+        source.marked_at,
+        source.latitude,
+        source.longitude,
+        source.location_name,
+        source.hmac,
+        Employee.full_name,
+        Employee.employee_id.label("employee_code"),
+        Employee.department,
+        Employee.position,
+        User.email
+    ).join(
+        Employee, Employee.id == source.employee_id
+    ).outerjoin(
+        User, User.id == Employee.user_id
+    ).filter(
+        Employee.is_approved == True,
+        *day_range(start_date, end_date, source)
+    )
+
+    if department:
+        query = query.filter(Employee.department == department)
+    if status:
+        query = query.filter(source.status == status)
+
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            source.date < cursor_date,
+            and_(source.date == cursor_date, source.id < cursor_id)
+        ))
+
+    query = query.order_by(source.date.desc(), source.id.desc())
+
+    if limit is None:
+        return query.all(), None
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date, rows[-1].id)
+
+    return rows, next_cursor
@@ -1,22 +1,345 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature, encode_dss_signature
 from jose import JWTError, jwt
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
 from app.config import settings
+from app.jwt_keys import ASYMMETRIC_ALGORITHMS, load_private_key, load_public_key, parse_time, read_keyset
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+def _json_segment(value: dict) -> bytes:
+    return _b64encode(json.dumps(value, separators=(",", ":")).encode())
+
+class VerificationKey:
+    __slots__ = ("kid", "algorithm", "public_key", "not_after")
+
+    def __init__(self, kid: str, algorithm: str, public_key, not_after: Optional[float]):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.public_key = public_key
+        self.not_after = not_after
+
+    def verify(self, signature: bytes, signing_input: bytes):
+        """Raises InvalidSignature"""
+        if self.algorithm == "EdDSA":
+            self.public_key.verify(signature, signing_input)
+            return
+        # JWS carries ES256 signatures as raw r || s, not DER
+        if len(signature) != 64:
+            raise InvalidSignature()
+        der = encode_dss_signature(int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big"))
+        self.public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+
+class TokenService:
+    """
+    Signs and validates access tokens
+
+    HS256 uses SECRET_KEY through python-jose, so every node needs the
+    secret. EdDSA (Ed25519) and ES256 sign with the private key of the key
+    set's active kid and name it in the token header; validating needs
+    only the public keys, which are parsed once and looked up by kid.
+    Signing and validating re-read the key set when its file has changed
+    (checked at most every reload_interval seconds, and at once for an
+    unknown kid), so nodes follow `activate` and `prune` without a
+    restart. A retired key validates its tokens until its not_after; see
+    app.jwt_keys.
+    """
+
+    def __init__(
+        self,
+        algorithm: str = settings.ALGORITHM,
+        secret_key: str = settings.SECRET_KEY,
+        keyset_file: str = settings.JWT_KEYSET_FILE,
+        private_key_dir: str = settings.JWT_PRIVATE_KEY_DIR,
+        reload_interval: float = settings.JWT_KEYSET_RELOAD_SECONDS
+    ):
+        if algorithm != "HS256" and algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise ValueError(f"Unsupported JWT_ALGORITHM '{algorithm}', expected HS256, {', '.join(ASYMMETRIC_ALGORITHMS)}")
+        self.algorithm = algorithm
+        self.secret_key = secret_key
+        self.keyset_file = keyset_file
+        self.private_key_dir = private_key_dir
+        self.reload_interval = reload_interval
+        self.keys = {}
+        self.active_kid = None
+        self._signing_key = None
+        self.generation = 0
+        self._file_state = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        if algorithm in ASYMMETRIC_ALGORITHMS:
+            self.reload()
+
+    def _stat_keyset(self):
+        # write_keyset replaces the file, so the inode changes even when the mtime does not
+        try:
+            stat = os.stat(self.keyset_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def reload(self):
+        file_state = self._stat_keyset()
+        keyset = read_keyset(self.keyset_file)
+        keys = {
+            key["kid"]: VerificationKey(key["kid"], key["alg"], load_public_key(key["alg"], key["public_key"]), parse_time(key.get("not_after")))
+            for key in keyset["keys"]
+            if key["alg"] == self.algorithm
+        }
+        active_kid = keyset.get("active_kid")
+        signing_key = load_private_key(active_kid, self.private_key_dir) if active_kid in keys else None
+        with self._lock:
+            self.keys = keys
+            self.active_kid = active_kid if active_kid in keys else None
+            self._signing_key = signing_key
+            self._file_state = file_state
+            self._checked_at = time.monotonic()
+            self.generation += 1
+        print(f"[AUTH] 🔑 {len(keys)} {self.algorithm} verification keys loaded, "
+              f"signing with {self.active_kid if signing_key is not None else 'none (validate only)'}")
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Re-read the key set if its file changed since it was loaded
+
+        Returns:
+            The key set generation, which changes on every reload
+        """
+        if self.algorithm == "HS256":
+            return self.generation
+        now = time.monotonic()
+        if force or now - self._checked_at >= self.reload_interval:
+            self._checked_at = now
+            if self._stat_keyset() != self._file_state:
+                self.reload()
+        return self.generation
+
+    def sign(self, claims: dict) -> str:
+        if self.algorithm == "HS256":
+            return jwt.encode(claims, self.secret_key, algorithm="HS256")
+        self.refresh()
+        with self._lock:
+            signing_key, kid = self._signing_key, self.active_kid
+        if signing_key is None:
+            raise RuntimeError(f"No private key for the active kid in {self.private_key_dir}; this node can only validate tokens")
+        payload = {name: calendar.timegm(value.utctimetuple()) if isinstance(value, datetime) else value for name, value in claims.items()}
+        signing_input = _json_segment({"alg": self.algorithm, "typ": "JWT", "kid": kid}) + b"." + _json_segment(payload)
+        if self.algorithm == "EdDSA":
+            signature = signing_key.sign(signing_input)
+        else:
+            r, s = decode_dss_signature(signing_key.sign(signing_input, ec.ECDSA(hashes.SHA256())))
+            signature = r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def _key_for(self, kid) -> Optional[VerificationKey]:
+        self.refresh()
+        key = self.keys.get(kid)
+        if key is None:
+            self.refresh(force=True)
+            key = self.keys.get(kid)
+        return key
+
+    def validate(self, token: str) -> Tuple[dict, Optional[float]]:
+        """
+        Returns:
+            (payload, valid_until) - valid_until is the Unix time after which
+            the token must be rejected (its exp, or its key's not_after if sooner)
+
+        Raises:
+            JWTError: bad signature, unknown or retired kid, or expired token
+        """
+        if self.algorithm == "HS256":
+            payload = jwt.decode(token, self.secret_key, algorithms=["HS256"])
+            return payload, payload.get("exp")
+
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature_segment)
+        except (ValueError, TypeError):
+            raise JWTError("Malformed token")
+        # The algorithm is fixed by configuration; the header only has to agree
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise JWTError("Unexpected token algorithm")
+        kid = header.get("kid")
+        key = self._key_for(kid) if isinstance(kid, str) else None
+        if key is None:
+            raise JWTError("Unknown signing key")
+        now = time.time()
+        if key.not_after is not None and now >= key.not_after:
+            raise JWTError("Signing key has been retired")
+        try:
+            key.verify(signature, f"{header_segment}.{payload_segment}".encode())
+            payload = json.loads(_b64decode(payload_segment))
+        except (InvalidSignature, ValueError, TypeError):
+            raise JWTError("Signature verification failed")
+        exp = payload.get("exp") if isinstance(payload, dict) else None
+        if not isinstance(exp, (int, float)) or now >= exp:
+            raise JWTError("Token has expired")
+        return payload, min(exp, key.not_after) if key.not_after is not None else exp
+
+    def metrics(self) -> dict:
+        return {
+            "algorithm": self.algorithm,
+            "active_kid": self.active_kid,
+            "can_sign": self.algorithm == "HS256" or self._signing_key is not None,
+            "keys": {key.kid: {"not_after": key.not_after} for key in self.keys.values()}
+        }
+
+token_service = TokenService()
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(hours=24)
+    expire = datetime.utcnow() + timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    return token_service.sign(to_encode)
+
+class TokenCache:
+    """
+    Bounded LRU of decoded, validated tokens
+
+    A hit is returned only while the token's `exp` (or its signing key's
+    retirement, if sooner) is in the future and the key set has not been
+    reloaded since it was cached, so a cached token stops working exactly
+    when validating it again would fail. Tokens that fail to decode are
+    never cached.
+    """
+
+    def __init__(self, max_entries: int = settings.AUTH_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (exp, generation, payload)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str, generation: int = 0) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time() or entry[1] != generation:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, token: str, payload: dict, valid_until: Optional[float] = None, generation: int = 0):
+        exp = valid_until if valid_until is not None else payload.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (exp, generation, payload)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+token_cache = TokenCache()
+
+def decode_token(token: str) -> dict:
+    """Decode and validate a JWT without the cache; raises JWTError"""
+    return token_service.validate(token)[0]
 
 def verify_token(token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    generation = token_service.refresh()
+    payload = token_cache.get(token, generation)
+    if payload is not None:
         return payload
+    try:
+        payload, valid_until = token_service.validate(token)
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+    token_cache.put(token, payload, valid_until, generation)
+    return payload
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+class RequireRole:
+    """
+    FastAPI dependency that validates the bearer token and checks its role
+
+    The allowed roles are fixed when the route is declared; an empty set
+    accepts any signed-in user. Returns the token payload.
+    """
+
+    def __init__(self, *roles: str):
+        self.roles = frozenset(roles)
+
+    async def __call__(self, credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)) -> dict:
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        payload = verify_token(credentials.credentials)
+        if self.roles and payload.get("role") not in self.roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed for this role")
+        return payload
+
+require_user = RequireRole()
+require_hr = RequireRole("hr", "admin")
+require_admin = RequireRole("admin")
+
+device_key_scheme = APIKeyHeader(name="X-Device-Key", auto_error=False)
+
+class RequireDevice:
+    """
+    FastAPI dependency for endpoints only enrolled devices may call, such
+    as the attendance kiosk's face identification
+
+    The device sends one of KIOSK_API_KEYS in the X-Device-Key header. With
+    no keys configured every request is refused.
+    """
+
+    def __init__(self, keys=settings.KIOSK_API_KEYS):
+        # Compared as digests so the check takes the same time for any key length
+        self.digests = [hashlib.sha256(key.encode()).digest() for key in keys]
+
+    async def __call__(self, key: Optional[str] = Depends(device_key_scheme)):
+        if key:
+            digest = hashlib.sha256(key.encode()).digest()
+            if any(hmac.compare_digest(digest, known) for known in self.digests):
+                return
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown device")
+
+require_kiosk = RequireDevice()
@@ -3,40 +3,146 @@ import numpy as np
 from PIL import Image
 import base64
 import io
+import threading
 from sklearn.metrics.pairwise import cosine_similarity
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List
 import json
+from app.config import settings
+from app.face_templates import encode_template, decode_template, normalize
+
+class HaarFaceDetector:
+    """OpenCV Haar cascade frontal face detector (default)"""
+    
+    CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    
+    def __init__(self, model_path: str = ""):
+        self.classifier = cv2.CascadeClassifier(model_path or self.CASCADE_PATH)
+        if self.classifier.empty():
+            raise ValueError(f"Could not load Haar cascade: {model_path or self.CASCADE_PATH}")
+    
+    def detect(self, gray: np.ndarray, bgr: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        return [tuple(int(v) for v in face) for face in self.classifier.detectMultiScale(gray, 1.3, 5)]
+
+class YuNetFaceDetector:
+    """OpenCV DNN face detector (cv2.FaceDetectorYN); needs FACE_DETECTOR_MODEL pointing at the YuNet ONNX file"""
+    
+    SCORE_THRESHOLD = 0.9
+    
+    def __init__(self, model_path: str = ""):
+        if not model_path:
+            raise ValueError("FACE_DETECTOR_MODEL must point to a YuNet .onnx model")
+        self.detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), self.SCORE_THRESHOLD)
+    
+    def detect(self, gray: np.ndarray, bgr: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        if bgr.ndim == 2:
+            bgr = cv2.cvtColor(bgr, cv2.COLOR_GRAY2BGR)
+        self.detector.setInputSize((bgr.shape[1], bgr.shape[0]))
+        _, faces = self.detector.detect(bgr)
+        if faces is None:
+            return []
+        return [tuple(max(0, int(v)) for v in face[:4]) for face in faces]
+
+FACE_DETECTORS = {
+    "haar": HaarFaceDetector,
+    "yunet": YuNetFaceDetector,
+}
+
+_detector_local = threading.local()
+
+def get_face_detector(name: str = None):
+    """
+    Return this thread's instance of the configured face detector
+    
+    Detectors are loaded once per thread (and so once per worker process);
+    OpenCV classifiers are not thread-safe, so instances are never shared.
+    """
+    name = name or settings.FACE_DETECTOR
+    detectors = getattr(_detector_local, "detectors", None)
+    if detectors is None:
+        detectors = _detector_local.detectors = {}
+    detector = detectors.get(name)
+    if detector is None:
+        if name not in FACE_DETECTORS:
+            raise ValueError(f"Unknown face detector: {name}")
+        detector = detectors[name] = FACE_DETECTORS[name](settings.FACE_DETECTOR_MODEL)
+    return detector
+
+def warm_face_detector() -> bool:
+    """Load the configured detector in the calling thread/process"""
+    get_face_detector()
+    return True
 
 class BiometricProcessor:
     
-    FACE_CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    FACE_CASCADE_PATH = HaarFaceDetector.CASCADE_PATH
     FINGERPRINT_THRESHOLD = 0.85
     FACE_THRESHOLD = 0.60
     
+    @staticmethod
+    def _load_grayscale(image_data: str) -> np.ndarray:
+        """
+        Decode a base64 image straight to 8-bit grayscale, bounded to FACE_MAX_DECODE_PIXELS
+        
+        JPEGs use PIL draft mode, so the decoder itself scales down (by 1/2, 1/4
+        or 1/8) and skips colour conversion; other formats are resized after decoding.
+        """
+        image_bytes = base64.b64decode(image_data.split(',')[1] if ',' in image_data else image_data)
+        image = Image.open(io.BytesIO(image_bytes))
+        
+        width, height = image.size
+        scale = min(1.0, (settings.FACE_MAX_DECODE_PIXELS / float(width * height)) ** 0.5)
+        target_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        
+        if image.format == "JPEG":
+            image.draft("L", target_size)
+        if image.mode != "L":
+            image = image.convert("L")
+        if image.size[0] * image.size[1] > settings.FACE_MAX_DECODE_PIXELS:
+            image = image.resize(target_size, Image.BILINEAR)
+        
+        return np.asarray(image)
+    
+    @staticmethod
+    def _detect_face(gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Detect on a pyramid-reduced copy (longest side <= FACE_DETECT_MAX_SIDE)
+        and map the first face back to full-resolution coordinates
+        
+        If nothing is found, the next finer pyramid level is tried, so faces
+        too small for the reduced image are still found at a higher resolution.
+        """
+        pyramid = [gray]
+        while max(pyramid[-1].shape[:2]) > settings.FACE_DETECT_MAX_SIDE:
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        
+        detector = get_face_detector()
+        for level in range(len(pyramid) - 1, -1, -1):
+            faces = detector.detect(pyramid[level], pyramid[level])
+            if len(faces) > 0:
+                break
+        else:
+            return None
+        
+        scale = 2 ** level
+        x, y, w, h = (value * scale for value in faces[0])
+        height, width = gray.shape[:2]
+        x, y = min(x, width - 1), min(y, height - 1)
+        return x, y, min(w, width - x), min(h, height - y)
+    
     @staticmethod
     def process_face_image(image_data: str) -> Optional[str]:
         try:
-            image_bytes = base64.b64decode(image_data.split(',')[1] if ',' in image_data else image_data)
-            image = Image.open(io.BytesIO(image_bytes))
-            img_array = np.array(image)
-            
-            if len(img_array.shape) == 3 and img_array.shape[2] == 4:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
-            elif len(img_array.shape) == 3 and img_array.shape[2] == 3:
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            
-            gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
-            face_cascade = cv2.CascadeClassifier(BiometricProcessor.FACE_CASCADE_PATH)
-            faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+            gray = BiometricProcessor._load_grayscale(image_data)
             
-            if len(faces) == 0:
+            face = BiometricProcessor._detect_face(gray)
+            if face is None:
                 return None
             
-            x, y, w, h = faces[0]
-            face_roi = img_array[y:y+h, x:x+w]
+            x, y, w, h = face
+            face_roi = gray[y:y+h, x:x+w]
             
             face_features = BiometricProcessor._extract_face_features(face_roi)
-            return json.dumps(face_features.tolist())
+            return encode_template(face_features)
             
         except Exception as e:
             print(f"Error processing face image: {str(e)}")
@@ -49,7 +155,7 @@ class BiometricProcessor:
         resized = cv2.resize(gray, (128, 128))
         normalized = (resized - resized.mean()) / (resized.std() + 1e-8)
         
-        flattened = normalized.flatten()
+        flattened = normalized.flatten().astype(np.float32)
         
         return flattened
     
@@ -82,20 +188,19 @@ class BiometricProcessor:
         
         return flattened
     
+    @staticmethod
+    def match_face_vectors(stored_vector: np.ndarray, captured_vector: np.ndarray) -> Tuple[float, bool]:
+        """Cosine similarity of two unit-normalized templates (a dot product)"""
+        similarity = float(np.dot(stored_vector, captured_vector))
+        return similarity, similarity >= BiometricProcessor.FACE_THRESHOLD
+    
     @staticmethod
     def compare_faces(face_data1: str, face_data2: str) -> Tuple[float, bool]:
         try:
-            features1 = np.array(json.loads(face_data1))
-            features2 = np.array(json.loads(face_data2))
-            
-            features1 = features1.reshape(1, -1)
-            features2 = features2.reshape(1, -1)
-            
-            similarity = cosine_similarity(features1, features2)[0][0]
+            features1 = normalize(decode_template(face_data1))
+            features2 = normalize(decode_template(face_data2))
             
-            is_match = similarity >= BiometricProcessor.FACE_THRESHOLD
-            
-            return float(similarity), is_match
+            return BiometricProcessor.match_face_vectors(features1, features2)
             
         except Exception as e:
             print(f"Error comparing faces: {str(e)}")
@@ -0,0 +1,163 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from app.config import settings
+
+def _timed_call(fn, args):
+    """Run fn in a worker and report how long the work itself took"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def _warm_up_worker():
+    # Pays the OpenCV import and detector load once per worker
+    from app.biometric import warm_face_detector
+    return warm_face_detector()
+
+class BiometricWorkerPool:
+    """
+    Bounded worker pool for CPU-heavy biometric processing
+
+    Keeps OpenCV/PIL work off the event loop. Uses worker processes by
+    default and falls back to threads if processes are unavailable or the
+    pool breaks. At most `workers + queue_size` jobs are accepted at once;
+    beyond that callers get 503 instead of piling up, and a job that takes
+    longer than `timeout` seconds returns 504. A job counts against the
+    limit until the worker is done with it, not until its caller gives up,
+    so timed-out jobs still occupy their slot.
+    """
+    
+    def __init__(
+        self,
+        workers: int = settings.BIOMETRIC_WORKERS,
+        queue_size: int = settings.BIOMETRIC_QUEUE_SIZE,
+        timeout: float = settings.BIOMETRIC_TIMEOUT_SECONDS,
+        mode: str = settings.BIOMETRIC_POOL_MODE
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.mode = mode
+        self._executor = None
+        self._started_at = time.monotonic()
+        self._pending_lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+    
+    def _get_executor(self):
+        if self._executor is None and self.mode == "process":
+            try:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            except (OSError, NotImplementedError, ImportError) as e:
+                print(f"[BIOMETRIC POOL] ⚠️ Process pool unavailable ({e}), falling back to threads")
+                self.mode = "thread"
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="biometric")
+        return self._executor
+    
+    def _fall_back_to_threads(self):
+        print("[BIOMETRIC POOL] ⚠️ Process pool broke, falling back to threads")
+        broken = self._executor
+        self._executor = None
+        self.mode = "thread"
+        if broken is not None:
+            broken.shutdown(wait=False, cancel_futures=True)
+    
+    def _job_done(self, future):
+        # Runs on the executor's thread once the worker has finished the job
+        with self._pending_lock:
+            self.pending -= 1
+    
+    def _submit(self, fn, args) -> asyncio.Future:
+        future = self._get_executor().submit(_timed_call, fn, args)
+        with self._pending_lock:
+            self.pending += 1
+        future.add_done_callback(self._job_done)
+        return asyncio.wrap_future(future)
+    
+    async def run(self, fn, *args):
+        """
+        Run fn(*args) on the pool and return its result
+        
+        Raises:
+            HTTPException: 503 if the queue is full, 504 on timeout
+        """
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Biometric service is busy. Please try again in a moment."
+            )
+        
+        self.submitted += 1
+        submitted_at = time.perf_counter()
+        try:
+            try:
+                result, service_seconds = await asyncio.wait_for(self._submit(fn, args), timeout=self.timeout)
+            except BrokenProcessPool:
+                self._fall_back_to_threads()
+                result, service_seconds = await asyncio.wait_for(self._submit(fn, args), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Biometric processing timed out. Please try again."
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        
+        self.completed += 1
+        self.busy_seconds += service_seconds
+        self.wait_seconds += max(0.0, time.perf_counter() - submitted_at - service_seconds)
+        return result
+    
+    async def warm_up(self):
+        """Start every worker and load the face detector before the first real request"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(executor, _warm_up_worker) for _ in range(self.workers)))
+        except BrokenProcessPool:
+            self._fall_back_to_threads()
+        print(f"[BIOMETRIC POOL] ✅ {self.workers} {self.mode} workers ready")
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def metrics(self) -> dict:
+        uptime = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_capacity": self.queue_size,
+            "in_flight": self.pending,
+            "queue_depth": max(0, self.pending - self.workers),
+            "busy_workers": min(self.pending, self.workers),
+            "utilization": round(self.busy_seconds / (self.workers * uptime), 4),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+            "avg_service_ms": round(self.busy_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_queue_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0
+        }
+
+
+biometric_pool = BiometricWorkerPool()
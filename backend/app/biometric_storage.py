@@ -0,0 +1,147 @@
+import base64
+import json
+import os
+import struct
+from typing import Optional, Tuple, Union
+import numpy as np
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from app.aes_encryption import aes_encryption
+
+TEMPLATE_PREFIX = "f32:"
+
+KIND_FACE_IMAGE = 1
+KIND_FACE_TEMPLATE = 2
+KIND_FACE_THUMBNAIL = 3
+
+# version (1 byte) + kind (1 byte); authenticated as associated data
+HEADER = struct.Struct("<BB")
+
+StoredValue = Union[bytes, str]
+
+def encode_template(features: np.ndarray) -> str:
+    """
+    Serialize a feature vector as compact float32 text
+
+    Used to hand templates between the biometric workers and the API;
+    "f32:" + base64 of the little-endian float32 buffer.
+    """
+    raw = np.ascontiguousarray(features, dtype="<f4").tobytes()
+    return TEMPLATE_PREFIX + base64.b64encode(raw).decode("ascii")
+
+def decode_template(template: str) -> np.ndarray:
+    """
+    Parse a template produced by encode_template, or a legacy JSON float list
+    """
+    if template.startswith(TEMPLATE_PREFIX):
+        return np.frombuffer(base64.b64decode(template[len(TEMPLATE_PREFIX):]), dtype="<f4")
+    return np.asarray(json.loads(template), dtype=np.float32)
+
+def decode_image_data(image_data: str) -> bytes:
+    """Raw image bytes from a base64 string or data URL"""
+    return base64.b64decode(image_data.split(',')[1] if ',' in image_data else image_data)
+
+class AesGcmCodecV1:
+    """
+    Format 1: header | 12-byte nonce | AES-256-GCM ciphertext and tag
+
+    28 bytes of overhead per value, against roughly 1.8x for a Fernet
+    token wrapping base64 text.
+    """
+
+    VERSION = 1
+    NONCE_SIZE = 12
+
+    def __init__(self, key: bytes):
+        self.aead = AESGCM(key)
+
+    def encode(self, kind: int, payload: bytes) -> bytes:
+        header = HEADER.pack(self.VERSION, kind)
+        nonce = os.urandom(self.NONCE_SIZE)
+        return header + nonce + self.aead.encrypt(nonce, payload, header)
+
+    def decode(self, blob: bytes) -> Tuple[int, bytes]:
+        header = blob[:HEADER.size]
+        _, kind = HEADER.unpack(header)
+        nonce = blob[HEADER.size:HEADER.size + self.NONCE_SIZE]
+        return kind, self.aead.decrypt(nonce, blob[HEADER.size + self.NONCE_SIZE:], header)
+
+class BiometricStorage:
+    """
+    Versioned binary storage for face images, templates and thumbnails
+
+    New values are written as BLOBs with the current codec. Values written
+    before this format existed are Fernet tokens over base64/JSON text and
+    are still read transparently, so rows can be converted at any pace
+    (see migrate_biometric_storage.py).
+    """
+
+    CURRENT_VERSION = AesGcmCodecV1.VERSION
+
+    def __init__(self, key_material: bytes = None):
+        # Derived from AES_KEY so no extra secret has to be configured, but
+        # never used for anything other than this format
+        key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"biometric-storage-v1"
+        ).derive(key_material or aes_encryption.key)
+        self.codecs = {AesGcmCodecV1.VERSION: AesGcmCodecV1(key)}
+
+    @staticmethod
+    def is_legacy(value: Optional[StoredValue]) -> bool:
+        return isinstance(value, str)
+
+    def encode(self, kind: int, payload: bytes) -> bytes:
+        return self.codecs[self.CURRENT_VERSION].encode(kind, payload)
+
+    def decode(self, kind: int, blob: bytes) -> bytes:
+        """
+        Raises:
+            ValueError: Unknown format version or a value of another kind
+            cryptography.exceptions.InvalidTag: If the value was tampered with
+        """
+        blob = bytes(blob)
+        codec = self.codecs.get(blob[0]) if blob else None
+        if codec is None:
+            raise ValueError("Unknown biometric storage format")
+        stored_kind, payload = codec.decode(blob)
+        if stored_kind != kind:
+            raise ValueError(f"Expected biometric value of kind {kind}, got {stored_kind}")
+        return payload
+
+    def encrypt_face_image(self, image_bytes: bytes) -> bytes:
+        return self.encode(KIND_FACE_IMAGE, image_bytes)
+
+    def decrypt_face_image(self, value: Optional[StoredValue]) -> Optional[bytes]:
+        """Raw image bytes (JPEG/PNG as captured)"""
+        if not value:
+            return None
+        if self.is_legacy(value):
+            return decode_image_data(aes_encryption.decrypt_data(value))
+        return self.decode(KIND_FACE_IMAGE, value)
+
+    def encrypt_face_template(self, vector: np.ndarray) -> bytes:
+        return self.encode(KIND_FACE_TEMPLATE, np.ascontiguousarray(vector, dtype="<f4").tobytes())
+
+    def decrypt_face_template(self, value: Optional[StoredValue]) -> Optional[np.ndarray]:
+        if not value:
+            return None
+        if self.is_legacy(value):
+            return decode_template(aes_encryption.decrypt_data(value))
+        return np.frombuffer(self.decode(KIND_FACE_TEMPLATE, value), dtype="<f4")
+
+    def encrypt_thumbnail(self, jpeg: bytes) -> bytes:
+        return self.encode(KIND_FACE_THUMBNAIL, jpeg)
+
+    def decrypt_thumbnail(self, value: Optional[StoredValue]) -> Optional[bytes]:
+        if not value:
+            return None
+        if self.is_legacy(value):
+            return base64.b64decode(aes_encryption.decrypt_data(value))
+        return self.decode(KIND_FACE_THUMBNAIL, value)
+
+
+biometric_storage = BiometricStorage()
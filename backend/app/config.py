@@ -3,19 +3,93 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _optional_int(name: str):
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
 class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY")
-    ALGORITHM = "HS256"
+    ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")  # HS256, EdDSA (Ed25519) or ES256
+    ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS", 24))
+    # Asymmetric modes: public keys by kid, shared read-only by every node; private keys only on nodes that sign
+    JWT_KEYSET_FILE = os.getenv("JWT_KEYSET_FILE", "keys/jwt_keyset.json")
+    JWT_PRIVATE_KEY_DIR = os.getenv("JWT_PRIVATE_KEY_DIR", "keys/jwt_private")
+    JWT_KEYSET_RELOAD_SECONDS = float(os.getenv("JWT_KEYSET_RELOAD_SECONDS", 5))  # check the key set file for changes at most this often
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))  # decoded JWTs kept until their exp
+    KIOSK_API_KEYS = [key.strip() for key in os.getenv("KIOSK_API_KEYS", "").split(",") if key.strip()]  # X-Device-Key values of attendance kiosks
     DATABASE_URL = os.getenv("DATABASE_URL")
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")  # defaults to DATABASE_URL with an async driver
+    ENVIRONMENT = os.getenv("ENVIRONMENT", "development")  # development, production or test
+    DB_EMULATE_DIALECT = os.getenv("DB_EMULATE_DIALECT", "")  # e.g. postgresql: run that dialect's repository on SQLite
+    
+    # Unset values fall back to the ENVIRONMENT profile in app/database.py
+    DB_POOL_SIZE = _optional_int("DB_POOL_SIZE")
+    DB_MAX_OVERFLOW = _optional_int("DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT = _optional_int("DB_POOL_TIMEOUT")
+    DB_POOL_RECYCLE = _optional_int("DB_POOL_RECYCLE")
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = _optional_int("SQLITE_BUSY_TIMEOUT_MS")
+    SQLITE_MMAP_SIZE = _optional_int("SQLITE_MMAP_SIZE")
+    SQLITE_CACHE_SIZE = _optional_int("SQLITE_CACHE_SIZE")  # negative = KiB, as in PRAGMA cache_size
+    
+    ATTENDANCE_HOT_MONTHS = int(os.getenv("ATTENDANCE_HOT_MONTHS", 3))  # closed months kept out of the archive
+    HMAC_VERDICT_CACHE_SIZE = int(os.getenv("HMAC_VERDICT_CACHE_SIZE", 100000))  # attendance integrity verdicts kept in memory
+    
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_ENTRIES = int(os.getenv("RATE_LIMIT_MAX_ENTRIES", 100000))
+    LOGIN_RATE_EMAIL_BURST = int(os.getenv("LOGIN_RATE_EMAIL_BURST", 10))
+    LOGIN_RATE_EMAIL_PER_MINUTE = float(os.getenv("LOGIN_RATE_EMAIL_PER_MINUTE", 10))
+    LOGIN_RATE_IP_BURST = int(os.getenv("LOGIN_RATE_IP_BURST", 50))
+    LOGIN_RATE_IP_PER_MINUTE = float(os.getenv("LOGIN_RATE_IP_PER_MINUTE", 60))
+    LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", 5))  # wrong passwords within the window before lockout
+    LOGIN_FAILURE_WINDOW_SECONDS = float(os.getenv("LOGIN_FAILURE_WINDOW_SECONDS", 1800))
+    LOGIN_LOCKOUT_MINUTES = int(os.getenv("LOGIN_LOCKOUT_MINUTES", 30))
+    LOGIN_AUDIT_BATCH_SIZE = int(os.getenv("LOGIN_AUDIT_BATCH_SIZE", 200))
+    LOGIN_AUDIT_FLUSH_SECONDS = float(os.getenv("LOGIN_AUDIT_FLUSH_SECONDS", 2))
+    LOGIN_AUDIT_MAX_PENDING = int(os.getenv("LOGIN_AUDIT_MAX_PENDING", 50000))
+    
+    OTP_TTL_MINUTES = int(os.getenv("OTP_TTL_MINUTES", 10))
+    OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))  # wrong guesses before a code is revoked
+    OTP_PURGE_INTERVAL_SECONDS = float(os.getenv("OTP_PURGE_INTERVAL_SECONDS", 300))
     
     SMTP_SERVER = os.getenv("SMTP_SERVER")
     SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
     SMTP_USERNAME = os.getenv("SMTP_USERNAME")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
     FROM_EMAIL = os.getenv("FROM_EMAIL")
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+    SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", 60))  # close the pooled connection after this long unused
+    MAIL_TRANSPORT = os.getenv("MAIL_TRANSPORT", "smtp")  # smtp or memory
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+    MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", 10))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 6))
+    MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", 30))
+    MAIL_CLAIM_TIMEOUT_SECONDS = float(os.getenv("MAIL_CLAIM_TIMEOUT_SECONDS", 300))
+    MAIL_KEEP_SENT_DAYS = int(os.getenv("MAIL_KEEP_SENT_DAYS", 7))
     
     HTTPS_ENABLED = os.getenv("HTTPS_ENABLED", "true").lower() == "true"
     SSL_CERT_PATH = os.getenv("SSL_CERT_PATH", "certs/cert.pem")
     SSL_KEY_PATH = os.getenv("SSL_KEY_PATH", "certs/key.pem")
+    
+    BIOMETRIC_POOL_MODE = os.getenv("BIOMETRIC_POOL_MODE", "process")  # process or thread
+    BIOMETRIC_WORKERS = int(os.getenv("BIOMETRIC_WORKERS", min(4, os.cpu_count() or 1)))
+    BIOMETRIC_QUEUE_SIZE = int(os.getenv("BIOMETRIC_QUEUE_SIZE", 32))
+    BIOMETRIC_TIMEOUT_SECONDS = float(os.getenv("BIOMETRIC_TIMEOUT_SECONDS", 15))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_MAX_CONCURRENT = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENT", min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", 10))
+    PQ_SESSION_CACHE_SIZE = int(os.getenv("PQ_SESSION_CACHE_SIZE", 4096))  # decapsulated envelope keys kept per client session
+    PQ_SESSION_TTL_SECONDS = float(os.getenv("PQ_SESSION_TTL_SECONDS", 3600))
+    FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar")  # haar or yunet
+    FACE_DETECTOR_MODEL = os.getenv("FACE_DETECTOR_MODEL", "")
+    FACE_MAX_DECODE_PIXELS = int(os.getenv("FACE_MAX_DECODE_PIXELS", 2000000))
+    FACE_DETECT_MAX_SIDE = int(os.getenv("FACE_DETECT_MAX_SIDE", 640))
+    FACE_TEMPLATE_CACHE_SIZE = int(os.getenv("FACE_TEMPLATE_CACHE_SIZE", 1024))  # decrypted face templates kept in memory
+    FACE_THUMBNAIL_SIZE = int(os.getenv("FACE_THUMBNAIL_SIZE", 128))
+    FACE_THUMBNAIL_MAX_AGE = int(os.getenv("FACE_THUMBNAIL_MAX_AGE", 3600))
+    FACE_THUMBNAIL_CACHE_SIZE = int(os.getenv("FACE_THUMBNAIL_CACHE_SIZE", 512))  # decrypted thumbnail JPEGs kept in memory
 
 settings = Settings()
\ No newline at end of file
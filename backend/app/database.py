@@ -1,15 +1,209 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+# Per-environment defaults; any DB_* / SQLITE_* setting overrides them.
+# SQLite allows one writer at a time, so pools are kept small: extra threads
+# wait their turn in the pool (FIFO, pool_timeout) instead of starving in
+# SQLite's busy handler. Server databases handle concurrent writers and use
+# SERVER_POOL_PROFILES instead.
+DATABASE_PROFILES = {
+    "development": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": -1,
+        "busy_timeout_ms": 5000,
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000,
+    },
+    "production": {
+        "pool_size": 3,
+        "max_overflow": 0,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "busy_timeout_ms": 10000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+    },
+    "test": {
+        "pool_size": 2,
+        "max_overflow": 0,
+        "pool_timeout": 5,
+        "pool_recycle": -1,
+        "busy_timeout_ms": 1000,
+        "mmap_size": 0,
+        "cache_size": -2000,
+    },
+}
+
+SERVER_POOL_PROFILES = {
+    "development": {"pool_size": 5, "max_overflow": 10},
+    "production": {"pool_size": 10, "max_overflow": 20},
+    "test": {"pool_size": 2, "max_overflow": 2},
+}
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def database_profile(environment: str = None, backend: str = "sqlite") -> dict:
+    """
+    Resolve the pool and SQLite tuning for an environment
+
+    Starts from DATABASE_PROFILES[environment] (with SERVER_POOL_PROFILES
+    for backends other than SQLite) and applies any value set explicitly
+    in Settings.
+    """
+    environment = environment or settings.ENVIRONMENT
+    if environment not in DATABASE_PROFILES:
+        raise ValueError(f"Unknown ENVIRONMENT '{environment}', expected one of {', '.join(DATABASE_PROFILES)}")
+    
+    profile = dict(DATABASE_PROFILES[environment])
+    if backend != "sqlite":
+        profile.update(SERVER_POOL_PROFILES[environment])
+    overrides = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "busy_timeout_ms": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+    }
+    profile.update({key: value for key, value in overrides.items() if value is not None})
+    profile["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+    profile["journal_mode"] = settings.SQLITE_JOURNAL_MODE
+    profile["synchronous"] = settings.SQLITE_SYNCHRONOUS
+    return profile
+
+def sqlite_pragmas(profile: dict) -> list:
+    """PRAGMA statements run on every new SQLite connection"""
+    return [
+        f"PRAGMA journal_mode={profile['journal_mode']}",
+        f"PRAGMA synchronous={profile['synchronous']}",
+        f"PRAGMA busy_timeout={int(profile['busy_timeout_ms'])}",
+        f"PRAGMA mmap_size={int(profile['mmap_size'])}",
+        f"PRAGMA cache_size={int(profile['cache_size'])}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def _engine_options(url, profile: dict) -> dict:
+    options = {"pool_pre_ping": profile["pool_pre_ping"]}
+    is_sqlite = url.get_backend_name() == "sqlite"
+    if is_sqlite:
+        options["connect_args"] = {"timeout": profile["busy_timeout_ms"] / 1000}
+        if url.get_driver_name() == "pysqlite":
+            options["connect_args"]["check_same_thread"] = False
+    if not (is_sqlite and url.database in (None, "", ":memory:")):
+        options.update(
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_timeout=profile["pool_timeout"],
+            pool_recycle=profile["pool_recycle"]
+        )
+    return options
+
+def _install_sqlite_pragmas(engine: Engine, profile: dict):
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas(profile)
+    
+    @event.listens_for(engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def create_database_engine(database_url: str = None, environment: str = None) -> Engine:
+    """
+    Build the engine for DATABASE_URL with the environment's pool settings
+
+    SQLite connections get WAL journaling and the profile's PRAGMAs when
+    they are opened; pre-ping replaces connections that went stale.
+    """
+    url = make_url(database_url or settings.DATABASE_URL)
+    profile = database_profile(environment, url.get_backend_name())
+    engine = create_engine(url, **_engine_options(url, profile))
+    _install_sqlite_pragmas(engine, profile)
+    return engine
+
+def async_database_url(database_url: str = None):
+    """
+    The async driver URL for a database: ASYNC_DATABASE_URL if set, otherwise
+    DATABASE_URL with its driver swapped (sqlite -> aiosqlite, postgresql -> asyncpg)
+    """
+    if database_url is None and settings.ASYNC_DATABASE_URL:
+        return make_url(settings.ASYNC_DATABASE_URL)
+    url = make_url(database_url or settings.DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def create_async_database_engine(database_url: str = None, environment: str = None) -> AsyncEngine:
+    """
+    Async counterpart of create_database_engine, with the same profile and PRAGMAs
+    """
+    url = async_database_url(database_url)
+    profile = database_profile(environment, url.get_backend_name())
+    options = _engine_options(url, profile)
+    if "pool_size" in options:
+        # aiosqlite would otherwise open a new connection for every session
+        options["poolclass"] = AsyncAdaptedQueuePool
+    engine = create_async_engine(url, **options)
+    _install_sqlite_pragmas(engine.sync_engine, profile)
+    return engine
+
+def database_status(engine: Engine) -> dict:
+    """Pool usage and, for SQLite, the PRAGMAs actually in effect"""
+    status = {
+        "environment": settings.ENVIRONMENT,
+        "dialect": engine.dialect.name,
+        "pool": engine.pool.status()
+    }
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            status["pragmas"] = {
+                name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size")
+            }
+    return status
+
+engine = create_database_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Used by the hot endpoints; objects stay readable after commit because
+# lazy loads are not possible on an AsyncSession
+async_engine = create_async_database_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def release_connection(db: Session):
+    """
+    Hand a sync Session's connection back to the pool before an async
+    handler awaits slow work (password hashing, the biometric pool)
+
+    Those handlers run their Session on the event loop, so a connection
+    held across an await can leave another request blocking the whole loop
+    in pool checkout until pool_timeout. Commits the open transaction,
+    which is usually reads only; loaded objects reload on next access.
+    """
+    db.commit()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
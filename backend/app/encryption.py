@@ -1,14 +1,181 @@
-from passlib.context import CryptContext
+import asyncio
 import hashlib
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from argon2 import extract_parameters
+from argon2.exceptions import InvalidHashError
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.config import settings
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
+# Argon2 parameters per account role (memory_cost in KiB). Hashes carry their
+# own parameters, so old hashes keep verifying and are re-hashed with the
+# role's profile on the next successful login, unless that would lower their
+# memory or time cost (see rehash_weakens). "secret" covers security answers
+# and OTP codes.
+PASSWORD_HASH_PROFILES = {
+    "admin": {"memory_cost": 65536, "rounds": 3, "parallelism": 4},
+    "hr": {"memory_cost": 65536, "rounds": 3, "parallelism": 4},
+    "employee": {"memory_cost": 19456, "rounds": 2, "parallelism": 1},
+    "secret": {"memory_cost": 19456, "rounds": 2, "parallelism": 1},
+}
+
+def _profile_context(profile: dict) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        argon2__memory_cost=profile["memory_cost"],
+        argon2__rounds=profile["rounds"],
+        argon2__parallelism=profile["parallelism"]
+    )
+
+profile_contexts = {name: _profile_context(profile) for name, profile in PASSWORD_HASH_PROFILES.items()}
+
+def rehash_weakens(profile: dict, hashed: str) -> bool:
+    """True if re-hashing with `profile` would lower the stored hash's memory or time cost"""
+    try:
+        stored = extract_parameters(hashed)
+    except InvalidHashError:
+        return False
+    return profile["memory_cost"] < stored.memory_cost or profile["rounds"] < stored.time_cost
+
+def _verify_and_update(profile: str, secret: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    matches, new_hash = profile_contexts[profile].verify_and_update(secret, hashed)
+    if new_hash is not None and rehash_weakens(PASSWORD_HASH_PROFILES[profile], hashed):
+        return matches, None
+    return matches, new_hash
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def get_password_hash(password, profile: str = None):
+    context = profile_contexts[profile] if profile else pwd_context
+    return context.hash(password)
 
 def get_deterministic_hash(value):
     """Returns SHA-256 hash of the value for deterministic matching (e.g. CNIC)"""
-    return hashlib.sha256(value.encode()).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(value.encode()).hexdigest()
+
+class PasswordHasher:
+    """
+    Runs Argon2 hashing and verification off the event loop
+
+    Work goes to a small thread pool (argon2-cffi releases the GIL while
+    hashing). A semaphore caps how many memory-hard hashes run at once, so
+    peak memory is about max_concurrent x memory_cost; requests beyond that
+    wait on the event loop and get 503 after `queue_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_concurrent: int = settings.PASSWORD_HASH_MAX_CONCURRENT,
+        queue_timeout: float = settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.workers = max(1, workers)
+        self.max_concurrent = max(1, min(max_concurrent, self.workers))
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._semaphore = None
+        self._semaphore_loop = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.by_profile = defaultdict(int)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+        return self._executor
+
+    def _get_semaphore(self):
+        # asyncio primitives belong to one event loop; tests and benchmarks may start several
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _run(self, profile: str, fn, *args):
+        semaphore = self._get_semaphore()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many sign-in requests right now. Please try again in a moment."
+            )
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - queued_at
+        self.in_flight += 1
+        try:
+            started = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+            self.hash_seconds += time.perf_counter() - started
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+        self.completed += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.by_profile[profile] += 1
+        return result
+
+    async def hash(self, secret: str, profile: str = "employee") -> str:
+        return await self._run(profile, profile_contexts[profile].hash, secret)
+
+    async def verify(self, secret: Optional[str], hashed: Optional[str], profile: str = "secret") -> bool:
+        """Check a secret against its hash; a missing secret or hash never matches"""
+        if not secret or not hashed:
+            return False
+        return await self._run(profile, profile_contexts[profile].verify, secret, hashed)
+
+    async def verify_and_update(self, secret: Optional[str], hashed: Optional[str], profile: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, if its hash uses other parameters than the
+        profile, return a new hash to store. A hash made with a higher memory
+        or time cost than the profile's is kept as it is.
+
+        Returns:
+            (matches, new_hash) - new_hash is None when no update is needed
+        """
+        if not secret or not hashed:
+            return False, None
+        return await self._run(profile, _verify_and_update, profile, secret, hashed)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_concurrent": self.max_concurrent,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "by_profile": dict(self.by_profile),
+            "avg_hash_ms": round(self.hash_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_queue_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_queue_wait_ms": round(self.max_wait_seconds * 1000, 2),
+            "peak_memory_mb": self.max_concurrent * max(p["memory_cost"] for p in PASSWORD_HASH_PROFILES.values()) // 1024,
+            "profiles": PASSWORD_HASH_PROFILES
+        }
+
+
+password_hasher = PasswordHasher()
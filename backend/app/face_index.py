@@ -0,0 +1,147 @@
+import threading
+from typing import Iterable, List, Tuple
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models import Employee, FaceIndexState
+from app.biometric_storage import biometric_storage
+from app.face_templates import normalize
+
+class FaceIndex:
+    """
+    In-memory matrix of unit-normalized face templates for 1:N identification
+
+    One row per enrolled employee; a search is a single matrix-vector product.
+    The index is built from the database on first use. Every worker process
+    has its own copy, so each change is recorded in the database through
+    mark_changed(), and ensure_current() re-reads only the employees changed
+    since this copy's version before a search.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = 0
+        self._matrix = None
+        self._active = None
+        self._employee_ids: List[int] = []
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._employee_ids)
+
+    def _reserve(self, dimensions: int):
+        if self._matrix is None:
+            self._matrix = np.zeros((self.INITIAL_CAPACITY, dimensions), dtype=np.float32)
+            self._active = np.zeros(self.INITIAL_CAPACITY, dtype=bool)
+        elif len(self._employee_ids) == self._matrix.shape[0]:
+            capacity = self._matrix.shape[0] * 2
+            matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+            matrix[:len(self._employee_ids)] = self._matrix
+            active = np.zeros(capacity, dtype=bool)
+            active[:len(self._employee_ids)] = self._active
+            self._matrix, self._active = matrix, active
+
+    def _upsert(self, employee_id: int, vector: np.ndarray, active: bool):
+        if self._matrix is not None and vector.shape[0] != self._matrix.shape[1]:
+            print(f"[FACE INDEX] ⚠️ Skipping employee {employee_id}: template size {vector.shape[0]} != {self._matrix.shape[1]}")
+            return
+        row = self._rows.get(employee_id)
+        if row is None:
+            self._reserve(vector.shape[0])
+            row = len(self._employee_ids)
+            self._employee_ids.append(employee_id)
+            self._rows[employee_id] = row
+        self._matrix[row] = vector
+        self._active[row] = active
+
+    @staticmethod
+    def mark_changed(db: Session, employee_ids: Iterable[int]):
+        """
+        Record that these employees' templates or approval changed, in the
+        caller's transaction, so other workers pick the change up
+
+        The version row is locked until the caller commits, so versions
+        become visible in the order they were handed out.
+        """
+        version = db.execute(
+            update(FaceIndexState).where(FaceIndexState.id == 1)
+            .values(version=FaceIndexState.version + 1)
+            .returning(FaceIndexState.version)
+        ).scalar_one()
+        db.execute(update(Employee).where(Employee.id.in_(list(employee_ids))).values(face_index_version=version))
+
+    def _load(self, employees):
+        for employee in employees:
+            active = bool(employee.is_approved) and not employee.is_disapproved
+            if employee.face_data is None:
+                self._set_active(employee.id, False)
+                continue
+            try:
+                vector = normalize(biometric_storage.decrypt_face_template(employee.face_data))
+            except Exception as e:
+                print(f"[FACE INDEX] ⚠️ Could not load template for employee {employee.id}: {e}")
+                continue
+            self._upsert(employee.id, vector, active)
+
+    def ensure_current(self, db: Session):
+        """
+        Build the index from Employee.face_data the first time it is needed,
+        then apply changes other workers recorded with mark_changed()
+        """
+        version = db.query(FaceIndexState.version).filter(FaceIndexState.id == 1).scalar() or 0
+        if self._loaded and version == self._version:
+            return
+        with self._lock:
+            columns = (Employee.id, Employee.face_data, Employee.is_approved, Employee.is_disapproved)
+            if not self._loaded:
+                self._load(db.query(*columns).filter(
+                    Employee.face_data != None,
+                    Employee.is_disapproved == False
+                ).all())
+                self._loaded = True
+                print(f"[FACE INDEX] ✅ Loaded {len(self._employee_ids)} face templates")
+            elif version != self._version:
+                changed = db.query(*columns).filter(Employee.face_index_version > self._version).all()
+                self._load(changed)
+                print(f"[FACE INDEX] 🔄 Applied {len(changed)} changed templates (version {self._version} -> {version})")
+            self._version = version
+
+    def upsert(self, employee_id: int, vector: np.ndarray, active: bool):
+        """Add or replace an employee's template (no-op until the index is loaded)"""
+        with self._lock:
+            if self._loaded:
+                self._upsert(employee_id, vector, active)
+
+    def _set_active(self, employee_id: int, active: bool):
+        row = self._rows.get(employee_id)
+        if row is not None:
+            self._active[row] = active
+
+    def set_active(self, employee_id: int, active: bool):
+        """Include or exclude an employee from search results"""
+        with self._lock:
+            self._set_active(employee_id, active)
+
+    def search(self, vector: np.ndarray, top_k: int = 3) -> List[Tuple[int, float]]:
+        """
+        Return up to top_k (employee_id, score) pairs for approved employees,
+        best match first
+        """
+        with self._lock:
+            count = len(self._employee_ids)
+            if count == 0 or vector.shape[0] != self._matrix.shape[1]:
+                return []
+            scores = self._matrix[:count] @ vector
+            scores[~self._active[:count]] = -np.inf
+            employee_ids = list(self._employee_ids)
+
+        top_k = max(1, min(top_k, count))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(employee_ids[row], float(scores[row])) for row in best if np.isfinite(scores[row])]
+
+
+face_index = FaceIndex()
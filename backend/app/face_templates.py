@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from app.config import settings
+from app.biometric_storage import biometric_storage, encode_template, decode_template
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    """Scale to unit length so cosine similarity becomes a dot product"""
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return vector.astype(np.float32)
+    return (vector / norm).astype(np.float32)
+
+class FaceTemplateStore:
+    """
+    In-process LRU of decrypted, unit-normalized face templates
+
+    Entries are keyed by employee id and tagged with the tail of the stored
+    ciphertext (its authentication tag), so a re-enrolled template is never
+    served stale even without an explicit invalidate().
+    """
+
+    def __init__(self, max_size: int = settings.FACE_TEMPLATE_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version(encrypted_face_data):
+        return encrypted_face_data[-44:]
+
+    def get(self, employee_id: int, encrypted_face_data) -> Optional[np.ndarray]:
+        """
+        Return the normalized template for an employee, decrypting on a miss
+        """
+        if not encrypted_face_data:
+            return None
+        version = self._version(encrypted_face_data)
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(employee_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        vector = normalize(biometric_storage.decrypt_face_template(encrypted_face_data))
+        vector.setflags(write=False)
+        self.put(employee_id, encrypted_face_data, vector)
+        return vector
+
+    def put(self, employee_id: int, encrypted_face_data, vector: np.ndarray):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[employee_id] = (self._version(encrypted_face_data), vector)
+            self._entries.move_to_end(employee_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, employee_id: int):
+        with self._lock:
+            self._entries.pop(employee_id, None)
+
+
+face_template_store = FaceTemplateStore()
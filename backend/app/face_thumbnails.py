@@ -0,0 +1,90 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from PIL import Image
+from app.config import settings
+
+THUMBNAIL_QUALITY = 80
+
+def make_thumbnail(image_bytes: bytes, size: int = None) -> Tuple[bytes, str]:
+    """
+    Shrink a face image to a small JPEG
+
+    Args:
+        image_bytes: Raw image as captured at signup/enrollment
+        size: Longest side in pixels (defaults to FACE_THUMBNAIL_SIZE)
+
+    Returns:
+        (jpeg_bytes, etag) - the etag is derived from the JPEG content
+    """
+    size = size or settings.FACE_THUMBNAIL_SIZE
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == "JPEG":
+        image.draft("RGB", (size, size))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((size, size), Image.LANCZOS)
+
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    jpeg = output.getvalue()
+    return jpeg, hashlib.sha256(jpeg).hexdigest()[:32]
+
+def thumbnail_url(employee_id: int) -> str:
+    return f"/api/employee/face-thumbnail/{employee_id}"
+
+def face_image_url(employee_id: int) -> str:
+    return f"/api/employee/face-image/{employee_id}"
+
+def image_media_type(image_bytes: bytes) -> str:
+    """MIME type of a stored face image, read from its header only"""
+    return Image.open(io.BytesIO(image_bytes)).get_format_mimetype() or "application/octet-stream"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header (possibly a list or weak tags) against an etag"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/").strip('"') == etag:
+            return True
+    return False
+
+class ThumbnailCache:
+    """
+    In-process LRU of decrypted thumbnail JPEGs keyed by employee id
+
+    Entries carry their etag, so a thumbnail replaced by re-enrollment is
+    never served stale even without an explicit invalidate().
+    """
+
+    def __init__(self, max_size: int = settings.FACE_THUMBNAIL_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, employee_id: int, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(employee_id)
+            return entry[1]
+
+    def put(self, employee_id: int, etag: str, jpeg: bytes):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[employee_id] = (etag, jpeg)
+            self._entries.move_to_end(employee_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, employee_id: int):
+        with self._lock:
+            self._entries.pop(employee_id, None)
+
+
+thumbnail_cache = ThumbnailCache()
@@ -1,13 +1,68 @@
 import hmac
 import hashlib
 import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence
 from dotenv import load_dotenv
+from app.config import settings
 
 load_dotenv()
 
+class VerdictCache:
+    """
+    Bounded LRU of integrity verdicts per attendance record
+    
+    An entry is keyed by the attendance id and only counts as a hit when the
+    stored hmac and the signed message both still match, so a row edited
+    directly in the database is always re-verified.
+    """
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, attendance_id: int, stored_hmac: str, message: str) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get(attendance_id)
+            if entry is None or entry[0] != stored_hmac or entry[1] != message:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(attendance_id)
+            self.hits += 1
+            return entry[2]
+    
+    def put(self, attendance_id: int, stored_hmac: str, message: str, verdict: bool):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[attendance_id] = (stored_hmac, message, verdict)
+            self._entries.move_to_end(attendance_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, attendance_id: int):
+        with self._lock:
+            self._entries.pop(attendance_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
 class HMACIntegrity:
     def __init__(self):
         self.secret_key = os.getenv("HMAC_SECRET_KEY", "your-super-secret-hmac-key-change-in-production").encode()
+        # Keyed inner/outer SHA-256 state, copied per message instead of re-keying
+        self._keyed_hmac = hmac.new(self.secret_key, digestmod=hashlib.sha256)
+        self.verdict_cache = VerdictCache(settings.HMAC_VERDICT_CACHE_SIZE)
+    
+    def _sign(self, message: bytes) -> str:
+        mac = self._keyed_hmac.copy()
+        mac.update(message)
+        return mac.hexdigest()
     
     def compute_attendance_hmac(self, employee_id: int, date_str: str, status: str, latitude: str = "", longitude: str = "") -> str:
         """
@@ -28,13 +83,7 @@ class HMACIntegrity:
         """
         data_to_sign = f"{employee_id}|{date_str}|{status}|{latitude}|{longitude}".encode()
         
-        signature = hmac.new(
-            self.secret_key,
-            data_to_sign,
-            hashlib.sha256
-        ).hexdigest()
-        
-        return signature
+        return self._sign(data_to_sign)
     
     def verify_attendance_hmac(self, employee_id: int, date_str: str, status: str, stored_hmac: str, latitude: str = "", longitude: str = "") -> bool:
         """
@@ -55,5 +104,112 @@ class HMACIntegrity:
         
         return hmac.compare_digest(computed_hmac, stored_hmac)
 
+    
+    def _verify_chunk(self, employee_ids, date_strs, statuses, stored_hmacs, latitudes, longitudes) -> List[bool]:
+        template = self._keyed_hmac
+        compare = hmac.compare_digest
+        results = []
+        for employee_id, date_str, status, stored_hmac, latitude, longitude in zip(
+            employee_ids, date_strs, statuses, stored_hmacs, latitudes, longitudes
+        ):
+            if not stored_hmac:
+                results.append(False)
+                continue
+            mac = template.copy()
+            mac.update(f"{employee_id}|{date_str}|{status}|{latitude}|{longitude}".encode())
+            results.append(compare(mac.hexdigest(), stored_hmac))
+        return results
+    
+    def verify_many(
+        self,
+        employee_ids: Sequence[int],
+        date_strs: Sequence[str],
+        statuses: Sequence[str],
+        stored_hmacs: Sequence[str],
+        latitudes: Optional[Sequence[str]] = None,
+        longitudes: Optional[Sequence[str]] = None
+    ) -> List[bool]:
+        """
+        Verify many attendance records at once
+        
+        Takes one sequence per column (all the same length). Verification
+        stays on the calling thread: attendance messages are ~50 bytes, far
+        below the size at which hashlib releases the GIL, so threads only
+        add overhead.
+        
+        Returns:
+            One verdict per record, in input order
+        """
+        count = len(employee_ids)
+        if latitudes is None:
+            latitudes = [""] * count
+        if longitudes is None:
+            longitudes = [""] * count
+        
+        return self._verify_chunk(employee_ids, date_strs, statuses, stored_hmacs, latitudes, longitudes)
+    
+    def verify_attendance_records(self, records) -> List[bool]:
+        """
+        Verify a list of Attendance rows (or row tuples with the same fields)
+        
+        Verdicts are served from the verdict cache when the row is unchanged;
+        only the misses are recomputed.
+        
+        Returns:
+            One verdict per record, in input order
+        """
+        verdicts = [None] * len(records)
+        misses = []
+        for index, record in enumerate(records):
+            date_str = record.date.strftime("%Y-%m-%d") if record.date else ""
+            latitude = record.latitude or ""
+            longitude = record.longitude or ""
+            message = f"{record.employee_id}|{date_str}|{record.status}|{latitude}|{longitude}"
+            cached = self.verdict_cache.get(record.id, record.hmac, message)
+            if cached is None:
+                misses.append((index, record, date_str, latitude, longitude, message))
+            else:
+                verdicts[index] = cached
+        
+        if misses:
+            computed = self.verify_many(
+                [record.employee_id for _, record, _, _, _, _ in misses],
+                [date_str for _, _, date_str, _, _, _ in misses],
+                [record.status for _, record, _, _, _, _ in misses],
+                [record.hmac for _, record, _, _, _, _ in misses],
+                [latitude for _, _, _, latitude, _, _ in misses],
+                [longitude for _, _, _, _, longitude, _ in misses]
+            )
+            for (index, record, _, _, _, message), verdict in zip(misses, computed):
+                self.verdict_cache.put(record.id, record.hmac, message, verdict)
+                verdicts[index] = verdict
+        
+        return verdicts
+    
+    def compute_month_digest(self, employee_id: int, month: str, records) -> str:
+        """
+        Compute HMAC-SHA256 over all attendance rows of one employee-month
+        
+        Covers the signed fields, the stored hmac and the row ids, so an edited,
+        inserted or deleted row changes the digest.
+        
+        Args:
+            employee_id: Employee ID
+            month: Month in YYYY-MM format
+            records: Every attendance row of that month
+        
+        Returns:
+            HMAC-SHA256 digest (hex format)
+        """
+        lines = [f"{employee_id}|{month}"]
+        for record in sorted(records, key=lambda r: r.id):
+            date_str = record.date.strftime("%Y-%m-%d") if record.date else ""
+            lines.append(f"{record.id}|{record.employee_id}|{date_str}|{record.status}|{record.latitude or ''}|{record.longitude or ''}|{record.hmac}")
+        return self._sign("\n".join(lines).encode())
+    
+    def invalidate(self, attendance_id: int):
+        """Drop the cached verdict of an attendance record after it is written"""
+        self.verdict_cache.invalidate(attendance_id)
+
 
 hmac_integrity = HMACIntegrity()
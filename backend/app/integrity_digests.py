@@ -0,0 +1,152 @@
+import calendar
+import hmac
+from collections import defaultdict
+from datetime import date
+from types import SimpleNamespace
+from typing import Dict, List, Tuple
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from app.models import Attendance, AttendanceArchive, AttendanceDigest
+from app.attendance_queries import attendance_tier
+from app.hmac_integrity import hmac_integrity
+from app.repository import repository
+
+def month_key(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+def month_bounds(month: str) -> Tuple[date, date]:
+    """First and last day of a YYYY-MM month"""
+    year, month_number = int(month[:4]), int(month[5:7])
+    return date(year, month_number, 1), date(year, month_number, calendar.monthrange(year, month_number)[1])
+
+SIGNED_FIELDS = ("employee_id", "date", "status", "latitude", "longitude", "hmac")
+
+def _pending_writes(db: Session):
+    """
+    Attendance rows this transaction inserts, and the signed fields of the
+    rows it updates (in either tier) as they were before the update. Read
+    before flushing, while the session still holds the change history.
+    """
+    inserted = [obj for obj in db.new if isinstance(obj, Attendance)]
+    previous = {}
+    for obj in db.dirty:
+        if not isinstance(obj, (Attendance, AttendanceArchive)) or obj.id is None:
+            continue
+        state = inspect(obj)
+        old_values = {
+            field: state.attrs[field].history.deleted[0]
+            for field in SIGNED_FIELDS
+            if state.attrs[field].history.deleted
+        }
+        if old_values:
+            previous[obj.id] = old_values
+    return inserted, previous
+
+def _before_write(record, previous: dict):
+    if record.id not in previous:
+        return record
+    values = {field: getattr(record, field) for field in SIGNED_FIELDS}
+    values.update(previous[record.id])
+    return SimpleNamespace(id=record.id, **values)
+
+def refresh_month_digest(db: Session, employee_id: int, day: date):
+    """
+    Recompute the digest of the employee-month containing `day`
+
+    Call it in the same transaction as the attendance write, instead of
+    flushing, and before commit. Only that month's rows are read (at most
+    one per day), from both tiers once the month has been archived, since
+    a late approval can add a hot row to an archived month.
+
+    The month is re-signed only if its rows were intact before this write:
+    they must match the stored digest or, for a month without one, their
+    row HMACs. Otherwise the old digest is kept (or none is written), so a
+    row edited or deleted in the database stays flagged instead of being
+    signed over by the next legitimate write.
+    """
+    inserted, previous = _pending_writes(db)
+    db.flush()
+    inserted_ids = {obj.id for obj in inserted}
+    month = month_key(day)
+    first_day, last_day = month_bounds(month)
+    
+    source = attendance_tier(db, first_day.isoformat())
+    records = db.query(
+        source.id, source.employee_id, source.date, source.status, source.latitude, source.longitude, source.hmac
+    ).filter(
+        source.employee_id == employee_id,
+        source.day >= first_day,
+        source.day <= last_day
+    ).all()
+    
+    before = [_before_write(record, previous) for record in records if record.id not in inserted_ids]
+    stored = db.query(AttendanceDigest.digest).filter(
+        AttendanceDigest.employee_id == employee_id,
+        AttendanceDigest.month == month
+    ).scalar()
+    if stored is not None:
+        intact = hmac.compare_digest(hmac_integrity.compute_month_digest(employee_id, month, before), stored)
+    else:
+        intact = all(hmac_integrity.verify_attendance_records(before))
+    if not intact:
+        print(f"[INTEGRITY] ⚠️ Attendance of employee {employee_id} for {month} was modified outside the app; "
+              f"its digest is left as is")
+        return
+    
+    digest = hmac_integrity.compute_month_digest(employee_id, month, records)
+    repository.upsert_month_digest(db, employee_id, month, digest, len(records))
+
+def verify_employee_range(db: Session, employee_id: int, records, start_date: str, end_date: str) -> Tuple[List[bool], List[str]]:
+    """
+    Verify an employee's attendance records for a date range month by month
+
+    Months fully inside the range are checked with one digest comparison.
+    Records are verified one by one only in months whose digest is missing
+    or mismatched, and in partially covered edge months.
+
+    Args:
+        records: All of the employee's attendance rows in the range
+
+    Returns:
+        (verdicts, tampered_months) - one verdict per record in input order,
+        and the months whose digest did not match (including months where
+        rows were deleted)
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    
+    by_month: Dict[str, list] = defaultdict(list)
+    for index, record in enumerate(records):
+        by_month[month_key(record.day or record.date.date())].append(index)
+    
+    stored = {
+        row.month: row.digest
+        for row in db.query(AttendanceDigest.month, AttendanceDigest.digest).filter(
+            AttendanceDigest.employee_id == employee_id,
+            AttendanceDigest.month >= month_key(start),
+            AttendanceDigest.month <= month_key(end)
+        )
+    }
+    
+    verdicts = [True] * len(records)
+    drill_down = []
+    tampered_months = []
+    for month in sorted(set(by_month) | set(stored)):
+        indexes = by_month.get(month, [])
+        first_day, last_day = month_bounds(month)
+        if first_day < start or last_day > end:
+            drill_down.extend(indexes)
+            continue
+        if month not in stored:
+            drill_down.extend(indexes)
+            continue
+        computed = hmac_integrity.compute_month_digest(employee_id, month, [records[i] for i in indexes])
+        if not hmac.compare_digest(computed, stored[month]):
+            tampered_months.append(month)
+            drill_down.extend(indexes)
+    
+    if drill_down:
+        drilled = hmac_integrity.verify_attendance_records([records[i] for i in drill_down])
+        for index, verdict in zip(drill_down, drilled):
+            verdicts[index] = verdict
+    
+    return verdicts, tampered_months
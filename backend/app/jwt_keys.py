@@ -0,0 +1,132 @@
+import json
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from app.config import settings
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+
+def load_public_key(algorithm: str, pem: str):
+    key = serialization.load_pem_public_key(pem.encode())
+    if algorithm == "EdDSA" and isinstance(key, ed25519.Ed25519PublicKey):
+        return key
+    if algorithm == "ES256" and isinstance(key, ec.EllipticCurvePublicKey) and isinstance(key.curve, ec.SECP256R1):
+        return key
+    raise ValueError(f"Public key does not match algorithm {algorithm}")
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """ISO 8601 timestamp from the key set as a Unix time, or None"""
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def read_keyset(path: str = settings.JWT_KEYSET_FILE) -> dict:
+    """
+    The key set file:
+
+        {"active_kid": "...", "keys": [{"kid": "...", "alg": "EdDSA",
+         "public_key": "-----BEGIN PUBLIC KEY-----...", "created_at": "...",
+         "not_after": null}]}
+
+    not_after is when tokens signed by that key stop being accepted.
+    """
+    if not os.path.exists(path):
+        return {"active_kid": None, "keys": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_keyset(keyset: dict, path: str = settings.JWT_KEYSET_FILE):
+    """Replace the key set file atomically so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(keyset, f, indent=2)
+    os.replace(temp_path, path)
+
+def private_key_path(kid: str, private_key_dir: str = settings.JWT_PRIVATE_KEY_DIR) -> str:
+    return os.path.join(private_key_dir, f"{kid}.pem")
+
+def load_private_key(kid: str, private_key_dir: str = settings.JWT_PRIVATE_KEY_DIR):
+    """The signing key for `kid`, or None on nodes that only validate tokens"""
+    path = private_key_path(kid, private_key_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return serialization.load_pem_private_key(f.read(), password=None)
+
+def generate_key(algorithm: str = settings.ALGORITHM, keyset_path: str = settings.JWT_KEYSET_FILE,
+                 private_key_dir: str = settings.JWT_PRIVATE_KEY_DIR) -> str:
+    """
+    Create a key pair and add its public key to the key set without
+    activating it, so every node can learn it before it signs anything
+
+    Returns:
+        The new key's kid
+    """
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"Key rotation needs JWT_ALGORITHM to be one of {', '.join(ASYMMETRIC_ALGORITHMS)}")
+    private_key = ed25519.Ed25519PrivateKey.generate() if algorithm == "EdDSA" else ec.generate_private_key(ec.SECP256R1())
+    now = datetime.now(timezone.utc)
+    kid = f"{now:%Y%m%d}-{secrets.token_hex(4)}"
+
+    os.makedirs(private_key_dir, mode=0o700, exist_ok=True)
+    path = private_key_path(kid, private_key_dir)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+
+    keyset = read_keyset(keyset_path)
+    keyset["keys"].append({
+        "kid": kid,
+        "alg": algorithm,
+        "public_key": private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode(),
+        "created_at": now.isoformat(),
+        "not_after": None
+    })
+    write_keyset(keyset, keyset_path)
+    return kid
+
+def activate_key(kid: str, keyset_path: str = settings.JWT_KEYSET_FILE,
+                 overlap: timedelta = timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)):
+    """
+    Sign new tokens with `kid`. The previously active key keeps validating
+    for `overlap` (one token lifetime by default) so nobody is logged out.
+    """
+    keyset = read_keyset(keyset_path)
+    if not any(key["kid"] == kid for key in keyset["keys"]):
+        raise ValueError(f"Unknown kid '{kid}'")
+    retire_at = (datetime.now(timezone.utc) + overlap).isoformat()
+    for key in keyset["keys"]:
+        if key["kid"] == kid:
+            key["not_after"] = None
+        elif key["kid"] == keyset.get("active_kid") and not key.get("not_after"):
+            key["not_after"] = retire_at
+    keyset["active_kid"] = kid
+    write_keyset(keyset, keyset_path)
+
+def prune_keys(keyset_path: str = settings.JWT_KEYSET_FILE, private_key_dir: str = settings.JWT_PRIVATE_KEY_DIR) -> list:
+    """Drop keys past their not_after, and their private key files; returns the removed kids"""
+    keyset = read_keyset(keyset_path)
+    now = datetime.now(timezone.utc).timestamp()
+    removed = [key["kid"] for key in keyset["keys"] if key.get("not_after") and parse_time(key["not_after"]) <= now]
+    if removed:
+        keyset["keys"] = [key for key in keyset["keys"] if key["kid"] not in removed]
+        write_keyset(keyset, keyset_path)
+        for kid in removed:
+            path = private_key_path(kid, private_key_dir)
+            if os.path.exists(path):
+                os.remove(path)
+    return removed
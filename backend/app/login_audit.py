@@ -0,0 +1,101 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import insert
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import LoginAttempt
+
+class LoginAttemptWriter:
+    """
+    Buffers LoginAttempt rows and inserts them in batches from a background task
+
+    record() only appends to memory, so an attempt costs no database write
+    on the request path. The buffer is flushed every `interval` seconds or
+    as soon as `batch_size` rows are waiting; if the database falls behind,
+    the oldest unwritten attempts are dropped beyond `max_pending`.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.LOGIN_AUDIT_BATCH_SIZE,
+        interval: float = settings.LOGIN_AUDIT_FLUSH_SECONDS,
+        max_pending: int = settings.LOGIN_AUDIT_MAX_PENDING
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = deque(maxlen=max_pending)
+        self._wakeup = None
+        self._task = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def record(self, user_id: Optional[int], email: str, success: bool):
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append({
+            "user_id": user_id,
+            "email": email,
+            "success": success,
+            "attempt_at": datetime.now(timezone.utc)
+        })
+        self.recorded += 1
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far in one transaction"""
+        rows = []
+        while self._pending:
+            rows.append(self._pending.popleft())
+        if not rows:
+            return 0
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(LoginAttempt), rows)
+                await db.commit()
+        except Exception as e:
+            print(f"[LOGIN AUDIT] ⚠️ Could not write {len(rows)} login attempts, will retry: {e}")
+            self._pending.extendleft(reversed(rows))
+            return 0
+        self.written += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+    async def _flush_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._flush_forever())
+
+    async def stop(self):
+        """Stop the background task and write what is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._wakeup = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "avg_batch": round(self.written / self.flushes, 1) if self.flushes else 0.0
+        }
+
+
+login_attempt_writer = LoginAttemptWriter()
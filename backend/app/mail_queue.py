@@ -0,0 +1,316 @@
+import asyncio
+import secrets
+from abc import ABC, abstractmethod
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import aiosmtplib
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+from app.aes_encryption import aes_encryption
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import OutboundEmail
+
+class MailTransport(ABC):
+    """Delivers rendered messages; the queue worker is its only caller"""
+
+    @abstractmethod
+    async def send(self, sender: str, recipient: str, message: bytes):
+        """Deliver one message; raises on failure so the queue can retry it"""
+
+    async def close(self):
+        pass
+
+class SMTPTransport(MailTransport):
+    """
+    One authenticated SMTP connection, opened on first use and reused
+
+    If the server has dropped the connection, the send is retried once on
+    a fresh one. Any other SMTP error closes the connection so the next
+    message starts clean; a refused recipient does not.
+    """
+
+    def __init__(
+        self,
+        hostname: str = settings.SMTP_SERVER,
+        port: int = settings.SMTP_PORT,
+        username: str = settings.SMTP_USERNAME,
+        password: str = settings.SMTP_PASSWORD,
+        start_tls: bool = settings.SMTP_STARTTLS,
+        timeout: float = settings.SMTP_TIMEOUT_SECONDS
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self._client = None
+        self.connections = 0
+
+    async def _connect(self):
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.port == 465,
+            start_tls=self.start_tls and self.port != 465,
+            timeout=self.timeout
+        )
+        await client.connect()
+        if self.username:
+            await client.login(self.username, self.password)
+        self._client = client
+        self.connections += 1
+        print(f"[MAIL] 🔌 Connected to {self.hostname}:{self.port}")
+
+    async def send(self, sender: str, recipient: str, message: bytes):
+        for attempt in range(2):
+            if self._client is None or not self._client.is_connected:
+                await self._connect()
+            try:
+                await self._client.sendmail(sender, [recipient], message)
+                return
+            except aiosmtplib.SMTPServerDisconnected:
+                self._client = None
+                if attempt:
+                    raise
+            except (aiosmtplib.SMTPRecipientsRefused, aiosmtplib.SMTPSenderRefused):
+                raise
+            except Exception:
+                await self.close()
+                raise
+
+    async def close(self):
+        client, self._client = self._client, None
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+class MemoryTransport(MailTransport):
+    """Keeps messages in a list instead of sending them, for tests and offline development"""
+
+    def __init__(self):
+        self.sent = []
+        self.connections = 0
+
+    async def send(self, sender: str, recipient: str, message: bytes):
+        self.sent.append((sender, recipient, message))
+        print(f"[MAIL] 📭 Captured {len(message)} byte message for {recipient}")
+
+MAIL_TRANSPORTS = {
+    "smtp": SMTPTransport,
+    "memory": MemoryTransport,
+}
+
+class MailQueue:
+    """
+    Outbound mail kept in the outbound_emails table and sent by one background worker
+
+    enqueue() adds a row to the caller's session, so a message is stored in
+    the same transaction as the change that caused it and is never lost to
+    a slow or unreachable SMTP server. After that session commits, the
+    worker is woken; it claims due rows in batches, sends them over the
+    transport's pooled connection, commits each outcome as soon as it is
+    known, and reschedules failures with exponential backoff until
+    MAIL_MAX_ATTEMPTS. Rows left 'sending' by a crashed worker are
+    released after MAIL_CLAIM_TIMEOUT_SECONDS.
+    """
+
+    def __init__(
+        self,
+        transport: MailTransport = None,
+        batch_size: int = settings.MAIL_BATCH_SIZE,
+        poll_interval: float = settings.MAIL_POLL_SECONDS,
+        max_attempts: int = settings.MAIL_MAX_ATTEMPTS,
+        retry_base: float = settings.MAIL_RETRY_BASE_SECONDS
+    ):
+        if transport is None:
+            if settings.MAIL_TRANSPORT not in MAIL_TRANSPORTS:
+                raise ValueError(f"Unknown MAIL_TRANSPORT '{settings.MAIL_TRANSPORT}', expected one of {', '.join(MAIL_TRANSPORTS)}")
+            transport = MAIL_TRANSPORTS[settings.MAIL_TRANSPORT]()
+        self.transport = transport
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.worker_id = secrets.token_hex(8)
+        self._loop = None
+        self._wakeup = None
+        self._task = None
+        self._last_sent = 0.0
+        self._last_purge = 0.0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.expired = 0
+
+    def enqueue(self, db: Session, to_email: str, subject: str, message: bytes, expires_at: Optional[datetime] = None):
+        """
+        Store a rendered message (see app.mail_templates) in the caller's
+        transaction; it is sent after the caller commits
+        """
+        now = datetime.now(timezone.utc)
+        db.add(OutboundEmail(
+            to_email=to_email,
+            subject=subject,
+            body=aes_encryption.encrypt_data(message.decode("ascii")),
+            status="pending",
+            attempts=0,
+            next_attempt_at=now,
+            expires_at=expires_at
+        ))
+        db.info["mail_queued"] = True
+
+    def notify(self):
+        """Wake the worker; safe to call from any thread"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _claim(self) -> List[OutboundEmail]:
+        """
+        Mark a batch of due rows as this worker's and return them
+
+        The session is closed before anything is sent, so no connection or
+        transaction is held during SMTP round trips.
+        """
+        now = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(OutboundEmail)
+                .where(OutboundEmail.status == "sending", OutboundEmail.claimed_at < now - timedelta(seconds=settings.MAIL_CLAIM_TIMEOUT_SECONDS))
+                .values(status="pending", claimed_by=None)
+            )
+            due = select(OutboundEmail.id).where(
+                OutboundEmail.status == "pending",
+                OutboundEmail.next_attempt_at <= now
+            ).order_by(OutboundEmail.next_attempt_at, OutboundEmail.id).limit(self.batch_size)
+            ids = (await db.execute(due)).scalars().all()
+            if not ids:
+                await db.commit()
+                return []
+            # The status condition makes the claim safe against other workers
+            await db.execute(
+                update(OutboundEmail)
+                .where(OutboundEmail.id.in_(ids), OutboundEmail.status == "pending")
+                .values(status="sending", claimed_by=self.worker_id, claimed_at=now)
+            )
+            await db.commit()
+            return (await db.execute(select(OutboundEmail).where(
+                OutboundEmail.id.in_(ids),
+                OutboundEmail.claimed_by == self.worker_id,
+                OutboundEmail.status == "sending"
+            ).order_by(OutboundEmail.id))).scalars().all()
+
+    async def _finish(self, record: OutboundEmail, status: str, error: Optional[str] = None, **values):
+        """
+        Commit one message's outcome on its own short transaction, so a
+        delivered message is marked sent before the next one is attempted
+        """
+        values.update(status=status, last_error=error[:255] if error else None, claimed_by=None)
+        if status != "pending":
+            values["body"] = None
+        async with AsyncSessionLocal() as db:
+            # A row reclaimed after MAIL_CLAIM_TIMEOUT_SECONDS belongs to another worker now
+            await db.execute(
+                update(OutboundEmail)
+                .where(OutboundEmail.id == record.id, OutboundEmail.claimed_by == self.worker_id)
+                .values(**values)
+            )
+            await db.commit()
+
+    async def deliver_due(self) -> int:
+        """Send one batch of due messages; returns how many were claimed"""
+        batch = await self._claim()
+        for record in batch:
+            now = datetime.now(timezone.utc)
+            expires_at = record.expires_at
+            if expires_at is not None and expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at is not None and expires_at <= now:
+                await self._finish(record, "expired")
+                self.expired += 1
+                continue
+            attempts = (record.attempts or 0) + 1
+            try:
+                message = aes_encryption.decrypt_data(record.body).encode("ascii")
+                await self.transport.send(settings.FROM_EMAIL, record.to_email, message)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempts >= self.max_attempts:
+                    await self._finish(record, "failed", error, attempts=attempts)
+                    self.failed += 1
+                    print(f"[MAIL] ❌ Giving up on \"{record.subject}\" to {record.to_email} after {attempts} attempts: {error}")
+                else:
+                    next_attempt_at = now + timedelta(seconds=min(3600, self.retry_base * 2 ** (attempts - 1)))
+                    await self._finish(record, "pending", error, attempts=attempts, next_attempt_at=next_attempt_at)
+                    self.retried += 1
+                    print(f"[MAIL] ⚠️ Send to {record.to_email} failed, retrying at {next_attempt_at:%H:%M:%S}: {error}")
+                continue
+            await self._finish(record, "sent", attempts=attempts, sent_at=now)
+            self.sent += 1
+            self._last_sent = time.monotonic()
+        return len(batch)
+
+    async def _purge_old(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.MAIL_KEEP_SENT_DAYS)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(OutboundEmail).where(
+                OutboundEmail.status.in_(("sent", "expired")),
+                OutboundEmail.created_at < cutoff
+            ))
+            await db.commit()
+
+    async def _run_forever(self, wakeup: asyncio.Event):
+        # Also ends if stop() replaced the event but the cancellation was swallowed mid-pass
+        while self._wakeup is wakeup:
+            try:
+                while await self.deliver_due() == self.batch_size:
+                    pass
+                if self._last_sent and time.monotonic() - self._last_sent > settings.SMTP_IDLE_SECONDS:
+                    await self.transport.close()
+                    self._last_sent = 0.0
+                if time.monotonic() - self._last_purge > 3600:
+                    await self._purge_old()
+                    self._last_purge = time.monotonic()
+            except Exception as e:
+                print(f"[MAIL] ⚠️ Delivery pass failed: {e}")
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = self._loop.create_task(self._run_forever(self._wakeup))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._loop = None
+        self._wakeup = None
+        await self.transport.close()
+
+    def metrics(self) -> dict:
+        return {
+            "transport": type(self.transport).__name__,
+            "connections_opened": self.transport.connections,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "expired": self.expired
+        }
+
+
+mail_queue = MailQueue()
+
+@event.listens_for(Session, "after_commit")
+def _wake_mail_worker(session):
+    if session.info.pop("mail_queued", False):
+        mail_queue.notify()
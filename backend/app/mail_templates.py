@@ -0,0 +1,91 @@
+import base64
+import html
+import re
+import secrets
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from app.config import settings
+
+TEMPLATE_DIR = Path(__file__).parent / "templates" / "email"
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# make_msgid() looks up the host's FQDN on every call unless given a domain
+MESSAGE_ID_DOMAIN = (settings.FROM_EMAIL or "").rpartition("@")[2] or "localhost"
+
+def _base64_lines(data: bytes) -> bytes:
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+class CompiledTemplate:
+    """
+    Template text split once into literal byte fragments around its
+    {{ name }} placeholders; rendering only encodes the values and joins
+    """
+
+    def __init__(self, source: str, escape: bool):
+        parts = PLACEHOLDER.split(source)
+        self.literals = [part.encode() for part in parts[0::2]]
+        self.fields = parts[1::2]
+        self.escape = escape
+
+    def render(self, values: dict) -> bytes:
+        chunks = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            value = str(values[field])
+            chunks.append((html.escape(value) if self.escape else value).encode())
+            chunks.append(literal)
+        return b"".join(chunks)
+
+class EmailTemplate:
+    """
+    A multipart/alternative email (plain text + HTML) loaded from
+    templates/email/<name>.txt and <name>.html
+
+    Everything but the addresses, Date, Message-ID and the two bodies is
+    pre-encoded at load time. Bodies are sent base64-encoded, so the
+    message is plain ASCII and the fixed boundary cannot clash with them.
+    """
+
+    def __init__(self, name: str, subject: str):
+        self.name = name
+        self.subject = subject
+        self.text = CompiledTemplate((TEMPLATE_DIR / f"{name}.txt").read_text(encoding="utf-8"), escape=False)
+        self.html = CompiledTemplate((TEMPLATE_DIR / f"{name}.html").read_text(encoding="utf-8"), escape=True)
+        boundary = f"=_{name}_{secrets.token_hex(12)}"
+        encoded_subject = subject if subject.isascii() else Header(subject, "utf-8").encode()
+        self._head = (
+            f"Subject: {encoded_subject}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f"Content-Type: multipart/alternative; boundary=\"{boundary}\"\r\n"
+            "\r\n"
+            f"--{boundary}\r\n"
+            "Content-Type: text/plain; charset=\"utf-8\"\r\n"
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode()
+        self._between = (
+            f"--{boundary}\r\n"
+            "Content-Type: text/html; charset=\"utf-8\"\r\n"
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode()
+        self._tail = f"--{boundary}--\r\n".encode()
+
+    def render(self, sender: str, to_email: str, **values) -> bytes:
+        """Return the complete RFC 5322 message, ready for SMTP DATA"""
+        if any(c in f"{sender}{to_email}" for c in "\r\n"):
+            raise ValueError("Email addresses must not contain line breaks")
+        return b"".join((
+            f"From: {sender}\r\nTo: {to_email}\r\nDate: {formatdate()}\r\n"
+            f"Message-ID: {make_msgid(domain=MESSAGE_ID_DOMAIN)}\r\n".encode(),
+            self._head,
+            _base64_lines(self.text.render(values)),
+            self._between,
+            _base64_lines(self.html.render(values)),
+            self._tail
+        ))
+
+# Parsed once at import, i.e. at application startup
+EMAIL_TEMPLATES = {
+    "otp": EmailTemplate("otp", "Your Employee Attendance System OTP"),
+    "approval": EmailTemplate("approval", "Your Employee Account Has Been Approved"),
+}
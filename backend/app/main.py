@@ -1,8 +1,10 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import case, func, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, date, timedelta, timezone
 import random
 import string
@@ -12,22 +14,79 @@ from typing import Optional
 import traceback
 import os
 
-from app.database import get_db, engine, Base
-from app.models import User, Employee, Attendance, OTP, LoginAttempt, BiometricRequest
-from app.encryption import verify_password, get_password_hash, get_deterministic_hash
+from app.database import get_db, get_async_db, release_connection, engine, async_engine, Base, database_status
+from app.migrations import run_migrations
+from app.models import User, Employee, Attendance, AttendanceArchive, BiometricRequest, OutboundEmail
+from app.encryption import get_deterministic_hash, password_hasher, PASSWORD_HASH_PROFILES
 from app.email_service import send_otp_email, send_approval_email
+from app.mail_queue import mail_queue
+from app.otp_service import otp_service
+from app.rate_limiter import login_rate_limiter
+from app.login_audit import login_attempt_writer
 from app.password_validator import password_validator
-from app.auth import create_access_token
+from app.auth import create_access_token, token_cache, token_service, require_user, require_hr, require_admin, require_kiosk
 from app.hmac_integrity import hmac_integrity
 from app.aes_encryption import aes_encryption
 from app.biometric import BiometricProcessor
+from app.face_templates import face_template_store, decode_template, normalize
+from app.face_index import face_index
+from app.face_thumbnails import make_thumbnail, thumbnail_url, face_image_url, image_media_type, thumbnail_cache, etag_matches
+from app.biometric_storage import biometric_storage, decode_image_data
+from app.config import settings
+from app.biometric_pool import biometric_pool
+from app.attendance_queries import fetch_attendance_range, day_range, attendance_tier
+from app.reporting import stream_employee_stats
+from app.integrity_digests import refresh_month_digest, verify_employee_range
+from app.repository import repository
+from app.pq_crypto import pq_crypto
 import re
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(title="Employee Attendance System")
 
+@app.on_event("startup")
+async def start_biometric_pool():
+    await biometric_pool.warm_up()
+
+@app.on_event("startup")
+async def start_otp_purger():
+    otp_service.start_purger()
+
+@app.on_event("shutdown")
+async def stop_otp_purger():
+    otp_service.stop_purger()
+
+@app.on_event("startup")
+async def start_mail_queue():
+    mail_queue.start()
+
+@app.on_event("shutdown")
+async def stop_mail_queue():
+    await mail_queue.stop()
+
+@app.on_event("startup")
+async def start_login_attempt_writer():
+    login_attempt_writer.start()
+
+@app.on_event("shutdown")
+async def stop_login_attempt_writer():
+    await login_attempt_writer.stop()
+
+@app.on_event("shutdown")
+async def stop_biometric_pool():
+    biometric_pool.shutdown()
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
 from fastapi.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
@@ -86,6 +145,9 @@ class HRApproval(BaseModel):
     department: str = "N/A"
     position: str = "N/A"
 
+class HRBulkApproval(BaseModel):
+    approvals: list[HRApproval] = Field(..., min_length=1, max_length=500)
+
 class MarkAttendanceRequest(BaseModel):
     employee_id: int
     latitude: float
@@ -102,6 +164,10 @@ class BiometricVerifyRequest(BaseModel):
     fingerprint_image: str = ""
     face_image: str = ""
 
+class BiometricIdentifyRequest(BaseModel):
+    face_image: str = Field(..., min_length=100, description="Base64 encoded face image")
+    top_k: int = Field(3, ge=1, le=20)
+
 class AttendanceApproval(BaseModel):
     attendance_id: int
     status: str = "present"
@@ -134,6 +200,33 @@ async def test_endpoint():
 async def options_handler(path: str):
     return {"message": "OK"}
 
+def open_client_payload(value: Optional[str]) -> Optional[str]:
+    """Decrypt an envelope sealed by frontend/js/encryption.js; plain values pass through"""
+    try:
+        return pq_crypto.open_payload(value)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid encrypted payload: {e}")
+
+def ensure_own_employee(owner_email: Optional[str], payload: dict):
+    """
+    Raises:
+        HTTPException: 403 unless the token was issued to the employee's
+        own user account (owner_email is None for an unknown employee)
+    """
+    if owner_email is None or owner_email != payload.get("sub"):
+        raise HTTPException(status_code=403, detail="Not allowed for this employee")
+
+@app.get("/api/security/public-key")
+async def get_public_key():
+    """Keys for sealing request payloads (see app.pq_crypto)"""
+    return {
+        "public_key": pq_crypto.get_public_key_pem(),
+        "x25519_public_key": pq_crypto.get_x25519_public_key(),
+        "algorithm": "RSA-OAEP-SHA256 or X25519 + AES-256-GCM",
+        "encryption_type": "hybrid envelope",
+        "key_size": "RSA-4096 / X25519, AES-256"
+    }
+
 @app.get("/api/security/info")
 async def get_security_info():
     """Return security implementation information"""
@@ -144,8 +237,11 @@ async def get_security_info():
             "status": "ACTIVE"
         },
         "password": {
-            "algorithm": "Argon2",
-            "parameters": "m=65540, t=2, p=4",
+            "algorithm": "Argon2id",
+            "profiles": {
+                name: f"m={profile['memory_cost']}, t={profile['rounds']}, p={profile['parallelism']}"
+                for name, profile in PASSWORD_HASH_PROFILES.items()
+            },
             "status": "ACTIVE"
         },
         "authentication": {
@@ -168,6 +264,7 @@ async def get_security_info():
 @app.post("/api/employee/signup")
 async def employee_signup(signup_data: EmployeeSignup, db: Session = Depends(get_db)):
     print(f"\n[SIGNUP] New employee registration: {signup_data.email}")
+    signup_data.face_image = open_client_payload(signup_data.face_image)
     print(f"[SIGNUP] 📊 Biometric data sizes:")
     print(f"[SIGNUP]   Face image: {len(signup_data.face_image) / 1024:.2f} KB")
     
@@ -200,38 +297,48 @@ async def employee_signup(signup_data: EmployeeSignup, db: Session = Depends(get
         print(f"[SIGNUP] ❌ CNIC already exists: {signup_data.cnic}")
         raise HTTPException(status_code=400, detail="CNIC already registered")
     
-    print(f"[SIGNUP] 🔨 Creating user record...")
-    user = User(
-        email=signup_data.email,
-        hashed_password=get_password_hash(signup_data.password),
-        role="employee",
-        is_active=False
-    )
-    db.add(user)
-    print(f"[SIGNUP] 📌 User added to session, committing...")
-    db.commit()
-    print(f"[SIGNUP] ✅ User committed to database")
-    db.refresh(user)
-    print(f"[SIGNUP] ✅ User created with ID: {user.id}")
+    # Nothing below needs the database until the records are written
+    release_connection(db)
+    
+    print(f"[SIGNUP] 🔨 Hashing password and security answer...")
+    hashed_password = await password_hasher.hash(signup_data.password, "employee")
+    hashed_security_question = await password_hasher.hash(signup_data.security_question, "secret")
+    hashed_security_answer = await password_hasher.hash(signup_data.security_answer, "secret")
     
     print(f"[SIGNUP] 🔨 Encrypting CNIC with AES-256...")
     encrypted_cnic = aes_encryption.encrypt_cnic(signup_data.cnic)
     
     print(f"[SIGNUP] 🔨 Processing biometric data...")
     try:
-        face_features = BiometricProcessor.process_face_image(signup_data.face_image)
+        face_features = await biometric_pool.run(BiometricProcessor.process_face_image, signup_data.face_image)
         
         if not face_features:
             raise HTTPException(status_code=400, detail="Failed to process face image. Please ensure good lighting and clear face visibility.")
         
+        face_image_bytes = decode_image_data(signup_data.face_image)
+        thumbnail, thumbnail_etag = await biometric_pool.run(make_thumbnail, face_image_bytes)
+        
         print(f"[SIGNUP] ✅ Biometric data processed successfully")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print(f"[SIGNUP] ❌ Biometric processing failed: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Biometric processing failed: {str(e)}")
     
     print(f"[SIGNUP] 🔨 Encrypting biometric data...")
-    encrypted_face_data = aes_encryption.encrypt_data(face_features)
-    encrypted_face_image = aes_encryption.encrypt_data(signup_data.face_image)
+    encrypted_face_data = biometric_storage.encrypt_face_template(decode_template(face_features))
+    encrypted_face_image = biometric_storage.encrypt_face_image(face_image_bytes)
+    
+    print(f"[SIGNUP] 🔨 Creating user record...")
+    user = User(
+        email=signup_data.email,
+        hashed_password=hashed_password,
+        role="employee",
+        is_active=False
+    )
+    db.add(user)
+    db.flush()
+    print(f"[SIGNUP] ✅ User created with ID: {user.id}")
     
     print(f"[SIGNUP] 🔨 Creating employee record...")
     employee = Employee(
@@ -239,18 +346,28 @@ async def employee_signup(signup_data: EmployeeSignup, db: Session = Depends(get
         full_name=signup_data.full_name,
         cnic=hashed_cnic,
         cnic_encrypted=encrypted_cnic,
-        security_question=get_password_hash(signup_data.security_question),
-        security_answer=get_password_hash(signup_data.security_answer),
+        security_question=hashed_security_question,
+        security_answer=hashed_security_answer,
         face_data=encrypted_face_data,
-        face_image=encrypted_face_image,  # Store encrypted base64 image
+        face_image=encrypted_face_image,  # Store encrypted image for HR approval
+        face_thumbnail=biometric_storage.encrypt_thumbnail(thumbnail),
+        face_thumbnail_etag=thumbnail_etag,
         is_approved=False
     )
     db.add(employee)
-    print(f"[SIGNUP] 📌 Employee added to session, committing...")
-    db.commit()
+    print(f"[SIGNUP] 📌 User and employee added to session, committing...")
+    try:
+        db.flush()
+        face_index.mark_changed(db, [employee.id])
+        db.commit()
+    except IntegrityError:
+        # Another signup took the email or CNIC while this one was hashing
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Email or CNIC already registered")
     print(f"[SIGNUP] ✅ Employee committed to database")
     db.refresh(employee)
     print(f"[SIGNUP] ✅ Employee record created with ID: {employee.id}, Status: pending approval")
+    face_index.upsert(employee.id, normalize(decode_template(face_features)), active=False)
     
     print(f"[SIGNUP] ✅ SIGNUP COMPLETE - Sending response...")
     return {
@@ -259,13 +376,12 @@ async def employee_signup(signup_data: EmployeeSignup, db: Session = Depends(get
     }
 
 @app.post("/api/auth/login")
-async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == login_data.email).first()
+async def login(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    login_rate_limiter.check(login_data.email, request.client.host if request.client else None)
+    user = (await db.execute(select(User).where(User.email == login_data.email))).scalars().first()
     
     if not user:
-        login_attempt = LoginAttempt(email=login_data.email, success=False)
-        db.add(login_attempt)
-        db.commit()
+        login_attempt_writer.record(None, login_data.email, False)
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
     now = datetime.now()
@@ -280,31 +396,38 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             user.is_locked = False
             user.locked_until = None
             user.failed_login_attempts = 0
-            db.commit()
+            await db.commit()
     
-    if not verify_password(login_data.password, user.hashed_password):
-        user.failed_login_attempts += 1
-        
-        if user.failed_login_attempts >= 5:
+    password_profile = user.role if user.role in PASSWORD_HASH_PROFILES else "employee"
+    password_ok, upgraded_hash = await password_hasher.verify_and_update(login_data.password, user.hashed_password, password_profile)
+    if not password_ok:
+        login_attempt_writer.record(user.id, login_data.email, False)
+        # Counted on the user row in one atomic statement, so every worker
+        # shares the count and a restart does not clear it; the rate limiter
+        # above keeps bursts from turning this into a write storm
+        window_start = now - timedelta(seconds=settings.LOGIN_FAILURE_WINDOW_SECONDS)
+        failures = (await db.execute(
+            update(User).where(User.id == user.id).values(
+                failed_login_attempts=case(
+                    (User.last_failed_login_at >= window_start, func.coalesce(User.failed_login_attempts, 0) + 1),
+                    else_=1
+                ),
+                last_failed_login_at=now
+            ).returning(User.failed_login_attempts).execution_options(synchronize_session=False)
+        )).scalar_one()
+        
+        if failures >= settings.LOGIN_MAX_FAILURES:
             user.is_locked = True
-            user.locked_until = now + timedelta(minutes=30)
-            db.commit()
-            
-            login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=False)
-            db.add(login_attempt)
-            db.commit()
+            user.locked_until = now + timedelta(minutes=settings.LOGIN_LOCKOUT_MINUTES)
+            await db.commit()
             
             raise HTTPException(
                 status_code=423,
-                detail="Account locked due to 5 failed login attempts. Try again after 30 minutes."
+                detail=f"Account locked due to {settings.LOGIN_MAX_FAILURES} failed login attempts. Try again after {settings.LOGIN_LOCKOUT_MINUTES} minutes."
             )
         
-        db.commit()
-        login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=False)
-        db.add(login_attempt)
-        db.commit()
-        
-        attempts_remaining = 5 - user.failed_login_attempts
+        await db.commit()
+        attempts_remaining = settings.LOGIN_MAX_FAILURES - failures
         raise HTTPException(
             status_code=400,
             detail=f"Invalid credentials. {attempts_remaining} attempts remaining before account lockout."
@@ -313,52 +436,25 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Account not approved yet")
     
-    user.failed_login_attempts = 0
-    db.commit()
+    if user.failed_login_attempts or upgraded_hash:
+        user.failed_login_attempts = 0
+        if upgraded_hash:
+            user.hashed_password = upgraded_hash
+        await db.commit()
     
     if user.role in ['hr', 'admin']:
-        if not user.security_answer or not verify_password(login_data.security_answer, user.security_answer):
-            login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=False)
-            db.add(login_attempt)
-            db.commit()
+        if not await password_hasher.verify(login_data.security_answer, user.security_answer):
+            login_attempt_writer.record(user.id, login_data.email, False)
             raise HTTPException(status_code=400, detail="Invalid security answer")
         
-        otp_records = db.query(OTP).filter(
-            OTP.email == login_data.email,
-            OTP.is_used == False
-        ).all()
-        
-        valid_otp_record = None
-        current_time = datetime.now(timezone.utc)
-        
-        for record in otp_records:
-            is_expired = False
-            if record.expires_at:
-                rec_expires = record.expires_at
-                if rec_expires.tzinfo and not current_time.tzinfo:
-                    rec_expires = rec_expires.replace(tzinfo=None)
-                elif not rec_expires.tzinfo and current_time.tzinfo:
-                    rec_expires = rec_expires.replace(tzinfo=timezone.utc)
-                
-                if rec_expires < current_time:
-                    is_expired = True
-            
-            if not is_expired and verify_password(login_data.otp, record.otp_code):
-                valid_otp_record = record
-                break
-        
-        if not valid_otp_record:
-            login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=False)
-            db.add(login_attempt)
-            db.commit()
+        # Marks the code used on success, counts the attempt otherwise
+        if not await db.run_sync(otp_service.verify, login_data.email, login_data.otp):
+            await db.commit()
+            login_attempt_writer.record(user.id, login_data.email, False)
             raise HTTPException(status_code=400, detail="Invalid or expired OTP")
         
-        valid_otp_record.is_used = True
-        db.commit()
-        
-        login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=True)
-        db.add(login_attempt)
-        db.commit()
+        await db.commit()
+        login_attempt_writer.record(user.id, login_data.email, True)
         
         access_token = create_access_token({"sub": user.email, "role": user.role})
         
@@ -369,62 +465,22 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             "employee_id": None
         }
     
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
+    employee = (await db.execute(select(Employee).where(Employee.user_id == user.id))).scalars().first()
     if not employee:
         raise HTTPException(status_code=400, detail="Employee record not found")
     
-    if not verify_password(login_data.security_answer, employee.security_answer):
-        login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=False)
-        db.add(login_attempt)
-        db.commit()
+    if not await password_hasher.verify(login_data.security_answer, employee.security_answer):
+        login_attempt_writer.record(user.id, login_data.email, False)
         raise HTTPException(status_code=400, detail="Invalid security answer")
     
-    otp_records = db.query(OTP).filter(
-        OTP.email == login_data.email,
-        OTP.is_used == False
-    ).all()
-    
-    print(f"[LOGIN DEBUG] Found {len(otp_records)} unused OTP records for {login_data.email}")
-    
-    valid_otp_record = None
-    current_time = datetime.now(timezone.utc)
-    
-    for record in otp_records:
-        # Check expiration manually to debug
-        is_expired = False
-        if record.expires_at:
-            # Handle timezone awareness mismatch if necessary
-            rec_expires = record.expires_at
-            if rec_expires.tzinfo and not current_time.tzinfo:
-                rec_expires = rec_expires.replace(tzinfo=None)
-            elif not rec_expires.tzinfo and current_time.tzinfo:
-                rec_expires = rec_expires.replace(tzinfo=timezone.utc) # Assume UTC if naive in DB but aware in app
-            
-            if rec_expires < current_time:
-                is_expired = True
-        
-        print(f"[LOGIN DEBUG] Checking OTP ID {record.id}: Expired={is_expired} (Expires: {record.expires_at}, Now: {current_time})")
-        
-        if not is_expired and verify_password(login_data.otp, record.otp_code):
-            valid_otp_record = record
-            print(f"[LOGIN DEBUG] ✅ Valid OTP found: ID {record.id}")
-            break
-        elif verify_password(login_data.otp, record.otp_code):
-             print(f"[LOGIN DEBUG] ❌ OTP matches but is expired")
-    
-    if not valid_otp_record:
-        print("[LOGIN DEBUG] ❌ No valid OTP record found")
-        login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=False)
-        db.add(login_attempt)
-        db.commit()
+    if not await db.run_sync(otp_service.verify, login_data.email, login_data.otp):
+        print(f"[LOGIN] ❌ Invalid or expired OTP for {login_data.email}")
+        await db.commit()
+        login_attempt_writer.record(user.id, login_data.email, False)
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
     
-    valid_otp_record.is_used = True
-    db.commit()
-    
-    login_attempt = LoginAttempt(user_id=user.id, email=login_data.email, success=True)
-    db.add(login_attempt)
-    db.commit()
+    await db.commit()
+    login_attempt_writer.record(user.id, login_data.email, True)
     
     access_token = create_access_token({"sub": user.email, "role": user.role})
     
@@ -436,8 +492,9 @@ async def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @app.post("/api/auth/request-otp")
-async def request_otp(email: str, db: Session = Depends(get_db)):
+async def request_otp(email: str, request: Request, db: Session = Depends(get_db)):
     print(f"\n[DEBUG] request_otp called with email: {email}")
+    login_rate_limiter.check(email, request.client.host if request.client else None)
     try:
         user = db.query(User).filter(User.email == email).first()
         print(f"[DEBUG] User found: {user is not None}")
@@ -455,13 +512,8 @@ async def request_otp(email: str, db: Session = Depends(get_db)):
         except Exception as email_error:
             print(f"[WARNING] Email sending failed: {email_error}")
             print(f"[INFO] Generating OTP without sending email (DEV MODE)")
-            from app.email_service import generate_otp
-            from datetime import timedelta
-            otp_code = generate_otp()
-            expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
-            otp = OTP(email=email, otp_code=get_password_hash(otp_code), expires_at=expires_at)
-            db.add(otp)
-            db.commit()
+            db.rollback()
+            otp_code = otp_service.issue(db, email)
             print(f"[DEV] Generated OTP: {otp_code}")
             success = True
         
@@ -474,7 +526,7 @@ async def request_otp(email: str, db: Session = Depends(get_db)):
         print(traceback.format_exc())
         raise
 
-@app.get("/api/hr/pending-approvals")
+@app.get("/api/hr/pending-approvals", dependencies=[Depends(require_hr)])
 async def get_pending_approvals(db: Session = Depends(get_db)):
     pending_employees = db.query(Employee).filter(
         (Employee.is_approved == False) & (Employee.is_disapproved == False)
@@ -495,10 +547,6 @@ async def get_pending_approvals(db: Session = Depends(get_db)):
             except Exception as e:
                 print(f"[WARNING] Failed to decrypt CNIC for {emp.full_name}: {e}")
             
-            decrypted_face_image = None
-            if emp.face_image:
-                decrypted_face_image = aes_encryption.decrypt_data(emp.face_image)
-
             emp_data = {
                 "id": emp.id,
                 "full_name": emp.full_name,
@@ -506,7 +554,9 @@ async def get_pending_approvals(db: Session = Depends(get_db)):
                 "cnic": decrypted_cnic,
                 "department": emp.department or "N/A",
                 "position": emp.position or "N/A",
-                "face_image": decrypted_face_image,  # Include the decrypted face image
+                "face_thumbnail_url": thumbnail_url(emp.id) if emp.has_face_image else None,
+                "face_thumbnail_etag": emp.face_thumbnail_etag,
+                "face_image_url": face_image_url(emp.id) if emp.has_face_image else None,
                 "security_question": emp.security_question,
                 "created_at": emp.created_at.replace(tzinfo=timezone.utc).isoformat() if emp.created_at else None
             }
@@ -519,12 +569,7 @@ async def get_pending_approvals(db: Session = Depends(get_db)):
         "pending_count": len(result)
     }
 
-@app.post("/api/hr/approve-employee")
-async def approve_employee(approval_data: HRApproval, db: Session = Depends(get_db)):
-    employee = db.query(Employee).filter(Employee.id == approval_data.employee_id).first()
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    
+async def _approve(db: Session, employee: Employee, approval_data: HRApproval):
     # Generate employee ID
     employee_id = f"EMP{employee.id:04d}"
     
@@ -539,14 +584,41 @@ async def approve_employee(approval_data: HRApproval, db: Session = Depends(get_
     user = db.query(User).filter(User.id == employee.user_id).first()
     user.is_active = True
     
-    db.commit()
+    # Queue approval email (committed together with the approval)
+    await send_approval_email(db, user.email, employee.full_name, employee_id)
+
+@app.post("/api/hr/approve-employee", dependencies=[Depends(require_hr)])
+async def approve_employee(approval_data: HRApproval, db: Session = Depends(get_db)):
+    employee = db.query(Employee).filter(Employee.id == approval_data.employee_id).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
     
-    # Send approval email
-    await send_approval_email(user.email, employee.full_name, employee_id)
+    await _approve(db, employee, approval_data)
+    face_index.mark_changed(db, [employee.id])
+    db.commit()
+    face_index.set_active(employee.id, True)
     
     return {"message": "Employee approved successfully"}
 
-@app.post("/api/hr/disapprove-employee")
+@app.post("/api/hr/approve-employees", dependencies=[Depends(require_hr)])
+async def approve_employees(data: HRBulkApproval, db: Session = Depends(get_db)):
+    """Approve several employees in one transaction; their emails go out as one batch"""
+    ids = [approval.employee_id for approval in data.approvals]
+    employees = {employee.id: employee for employee in db.query(Employee).filter(Employee.id.in_(ids)).all()}
+    missing = [employee_id for employee_id in ids if employee_id not in employees]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Employees not found: {', '.join(map(str, missing))}")
+    
+    for approval in data.approvals:
+        await _approve(db, employees[approval.employee_id], approval)
+    face_index.mark_changed(db, employees)
+    db.commit()
+    for employee_id in employees:
+        face_index.set_active(employee_id, True)
+    
+    return {"message": f"{len(employees)} employees approved successfully", "approved": len(employees)}
+
+@app.post("/api/hr/disapprove-employee", dependencies=[Depends(require_hr)])
 async def disapprove_employee(data: dict, db: Session = Depends(get_db)):
     employee_id = data.get('employee_id')
     employee = db.query(Employee).filter(Employee.id == employee_id).first()
@@ -554,19 +626,24 @@ async def disapprove_employee(data: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Employee not found")
     
     employee.is_disapproved = True
+    face_index.mark_changed(db, [employee.id])
     db.commit()
+    face_index.set_active(employee.id, False)
     
     print(f"[HR DISAPPROVAL] Employee {employee.full_name} (ID: {employee.id}) has been disapproved")
     
     return {"message": "Employee disapproved successfully"}
 
 @app.post("/api/employee/mark-attendance")
-async def mark_attendance(request: MarkAttendanceRequest, db: Session = Depends(get_db)):
-    today = date.today()
-
+async def mark_attendance(request: MarkAttendanceRequest, db: AsyncSession = Depends(get_async_db), token: dict = Depends(require_user)):
     dev_mode = os.getenv("DEV_MODE", "false").lower() == "true"
     
     print(f"\n[MARK ATTENDANCE] Employee ID: {request.employee_id} | Type: {type(request.employee_id)}")
+    row = (await db.execute(
+        select(Employee, User.email).join(User, User.id == Employee.user_id).where(Employee.id == request.employee_id)
+    )).first()
+    ensure_own_employee(row.email if row else None, token)
+    employee = row.Employee
     
     now = datetime.now()
     current_hour = now.hour
@@ -591,16 +668,7 @@ async def mark_attendance(request: MarkAttendanceRequest, db: Session = Depends(
     if dev_mode:
         print("[DEV MODE] Location validation skipped")
 
-    existing_attendance = db.query(Attendance).filter(
-        Attendance.employee_id == request.employee_id,
-        func.date(Attendance.date) == today
-    ).first()
-
-    if existing_attendance:
-        raise HTTPException(status_code=400, detail="Attendance already marked for today")
-
     # Check if employee has recently verified biometrics (within last 10 minutes)
-    employee = db.query(Employee).filter(Employee.id == request.employee_id).first()
     status = "pending_approval"
     
     if employee and employee.last_biometric_success:
@@ -630,6 +698,7 @@ async def mark_attendance(request: MarkAttendanceRequest, db: Session = Depends(
     attendance = Attendance(
         employee_id=request.employee_id,
         date=now,
+        day=now.date(),
         status=status,
         marked_at=now,
         latitude=str(request.latitude),
@@ -639,7 +708,15 @@ async def mark_attendance(request: MarkAttendanceRequest, db: Session = Depends(
     )
 
     db.add(attendance)
-    db.commit()
+    try:
+        # uq_attendance_employee_day rejects a second record for the same day
+        # when refresh_month_digest flushes
+        await db.run_sync(refresh_month_digest, attendance.employee_id, attendance.day)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Attendance already marked for today")
+    hmac_integrity.invalidate(attendance.id)
     
     print(f"[MARK ATTENDANCE] ✅ Saved attendance record: ID={attendance.id}, Employee={attendance.employee_id}, Status={attendance.status}")
     print(f"[MARK ATTENDANCE] 🔐 HMAC Signature: {hmac_signature[:16]}...")
@@ -650,10 +727,13 @@ async def mark_attendance(request: MarkAttendanceRequest, db: Session = Depends(
         return {"message": "Attendance request submitted. Waiting for admin approval."}
 
 
-@app.post("/api/admin/approve-attendance")
+@app.post("/api/admin/approve-attendance", dependencies=[Depends(require_admin)])
 async def approve_attendance(approval: AttendanceApproval, db: Session = Depends(get_db)):
     print(f"[APPROVE] Request to approve attendance ID: {approval.attendance_id} to status: {approval.status}")
     attendance = db.query(Attendance).filter(Attendance.id == approval.attendance_id).first()
+    if not attendance:
+        # Records of archived months keep their id in attendance_archive
+        attendance = db.query(AttendanceArchive).filter(AttendanceArchive.id == approval.attendance_id).first()
     if not attendance:
         print(f"[APPROVE] ❌ Attendance record not found: {approval.attendance_id}")
         raise HTTPException(status_code=404, detail="Attendance record not found")
@@ -677,7 +757,9 @@ async def approve_attendance(approval: AttendanceApproval, db: Session = Depends
         print(f"[APPROVE] ❌ HMAC computation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Integrity check failed: {str(e)}")
     
+    refresh_month_digest(db, attendance.employee_id, attendance.day or attendance.date.date())
     db.commit()
+    hmac_integrity.invalidate(attendance.id)
     db.refresh(attendance)
     print(f"[APPROVE] ✅ Attendance approved successfully. New status in DB: {attendance.status}")
     
@@ -687,10 +769,13 @@ async def approve_attendance(approval: AttendanceApproval, db: Session = Depends
         from sqlalchemy import text
         try:
             db.execute(
-                text("UPDATE attendance SET status = :status, hmac = :hmac WHERE id = :id"),
+                text(f"UPDATE {attendance.__tablename__} SET status = :status, hmac = :hmac WHERE id = :id"),
                 {"status": approval.status, "hmac": hmac_signature, "id": approval.attendance_id}
             )
+            db.expire_all()
+            refresh_month_digest(db, attendance.employee_id, attendance.day or attendance.date.date())
             db.commit()
+            hmac_integrity.invalidate(approval.attendance_id)
             print(f"[APPROVE] ✅ Raw SQL update executed")
         except Exception as e:
             print(f"[APPROVE] ❌ Raw SQL update failed: {e}")
@@ -698,33 +783,41 @@ async def approve_attendance(approval: AttendanceApproval, db: Session = Depends
     return {"message": f"Attendance marked as {approval.status}"}
 
 
+@app.get("/api/employee/me")
+async def get_me(db: Session = Depends(get_db), token: dict = Depends(require_user)):
+    """The signed-in employee's own profile"""
+    employee = db.query(Employee).join(User, User.id == Employee.user_id).filter(User.email == token.get("sub")).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee record not found")
+    return {
+        "id": employee.id,
+        "full_name": employee.full_name,
+        "email": token["sub"],
+        "employee_id": employee.employee_id,
+        "department": employee.department,
+        "position": employee.position,
+        "face_thumbnail_url": thumbnail_url(employee.id) if employee.has_face_image else None,
+        "face_thumbnail_etag": employee.face_thumbnail_etag
+    }
+
 @app.get("/api/employee/my-attendance")
-async def get_my_attendance(employee_id: int, db: Session = Depends(get_db)):
+async def get_my_attendance(employee_id: int, db: Session = Depends(get_db), token: dict = Depends(require_user)):
+    owner_email = db.query(User.email).join(Employee, Employee.user_id == User.id).filter(Employee.id == employee_id).scalar()
+    ensure_own_employee(owner_email, token)
     try:
         print(f"[ATTENDANCE] Fetching attendance for employee_id: {employee_id}")
-        attendance_records = db.query(Attendance).filter(
-            Attendance.employee_id == employee_id
-        ).order_by(Attendance.date.desc()).all()
+        attendance = attendance_tier(db)
+        attendance_records = db.query(attendance).filter(
+            attendance.employee_id == employee_id
+        ).order_by(attendance.date.desc()).all()
         
         print(f"[ATTENDANCE] Found {len(attendance_records)} records")
         
+        verdicts = hmac_integrity.verify_attendance_records(attendance_records)
+        
         result = []
-        for record in attendance_records:
+        for record, is_valid in zip(attendance_records, verdicts):
             print(f"[ATTENDANCE] Record ID: {record.id}, Date: {record.date}, Status: {record.status}")
-            date_str = record.date.strftime("%Y-%m-%d") if record.date else ""
-            
-            try:
-                is_valid = hmac_integrity.verify_attendance_hmac(
-                    employee_id=record.employee_id,
-                    date_str=date_str,
-                    status=record.status,
-                    stored_hmac=record.hmac,
-                    latitude=record.latitude or "",
-                    longitude=record.longitude or ""
-                )
-            except Exception as e:
-                print(f"[ERROR] HMAC verification failed: {e}")
-                is_valid = False
             
             result.append({
                 "id": record.id,
@@ -746,19 +839,20 @@ async def get_my_attendance(employee_id: int, db: Session = Depends(get_db)):
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/admin/all-attendance")
+@app.get("/api/admin/all-attendance", dependencies=[Depends(require_admin)])
 async def get_all_attendance(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     start_date: str = None,
-    end_date: str = None
+    end_date: str = None,
+    department: str = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    cursor: str = None,
+    limit: int = None
 ):
     try:
         print("[*] Loading attendance records...")
         
-        result = []
-        approved_employees = db.query(Employee).filter(Employee.is_approved == True).all()
-        print("[INFO] Found {} approved employees".format(len(approved_employees)))
-        
         if not start_date:
             start_date = str(date.today())
         if not end_date:
@@ -766,50 +860,52 @@ async def get_all_attendance(
         
         print(f"[ADMIN] Date range: {start_date} to {end_date}")
         
-        for employee in approved_employees:
-            user = db.query(User).filter(User.id == employee.user_id).first()
-            attendance_records = db.query(Attendance).filter(
-                Attendance.employee_id == employee.id,
-                func.date(Attendance.date) >= start_date,
-                func.date(Attendance.date) <= end_date
-            ).order_by(Attendance.date.desc()).all()
-            
-            for attendance_record in attendance_records:
-                date_str = attendance_record.date.strftime("%Y-%m-%d") if attendance_record.date else ""
-                
-                is_valid = hmac_integrity.verify_attendance_hmac(
-                    employee_id=attendance_record.employee_id,
-                    date_str=date_str,
-                    status=attendance_record.status,
-                    stored_hmac=attendance_record.hmac,
-                    latitude=attendance_record.latitude or "",
-                    longitude=attendance_record.longitude or ""
-                )
-                
-                result.append({
-                    "id": attendance_record.id,
-                    "date": attendance_record.date.replace(tzinfo=timezone.utc).isoformat() if attendance_record.date else None,
-                    "employee_name": employee.full_name or "Unknown",
-                    "employee_id": employee.employee_id or "PENDING",
-                    "email": user.email if user else "N/A",
-                    "department": employee.department or "N/A",
-                    "position": employee.position or "N/A",
-                    "status": attendance_record.status,
-                    "marked_at": attendance_record.marked_at.replace(tzinfo=timezone.utc).isoformat() if attendance_record.marked_at else None,
-                    "latitude": attendance_record.latitude,
-                    "longitude": attendance_record.longitude,
-                    "location_name": attendance_record.location_name or "N/A",
-                    "integrity_verified": is_valid,
-                    "tampered": not is_valid
-                })
+        try:
+            attendance_rows, next_cursor = await db.run_sync(
+                fetch_attendance_range,
+                start_date,
+                end_date,
+                department=department,
+                status=status_filter,
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        
+        verdicts = hmac_integrity.verify_attendance_records(attendance_rows)
+        
+        result = []
+        for attendance_record, is_valid in zip(attendance_rows, verdicts):
+            result.append({
+                "id": attendance_record.id,
+                "date": attendance_record.date.replace(tzinfo=timezone.utc).isoformat() if attendance_record.date else None,
+                "employee_name": attendance_record.full_name or "Unknown",
+                "employee_id": attendance_record.employee_code or "PENDING",
+                "email": attendance_record.email or "N/A",
+                "department": attendance_record.department or "N/A",
+                "position": attendance_record.position or "N/A",
+                "status": attendance_record.status,
+                "marked_at": attendance_record.marked_at.replace(tzinfo=timezone.utc).isoformat() if attendance_record.marked_at else None,
+                "latitude": attendance_record.latitude,
+                "longitude": attendance_record.longitude,
+                "location_name": attendance_record.location_name or "N/A",
+                "integrity_verified": is_valid,
+                "tampered": not is_valid
+            })
         
-        print("[SUCCESS] Returning {} employee records".format(len(result)))
+        print("[SUCCESS] Returning {} attendance records".format(len(result)))
         return result
+    except HTTPException as e:
+        raise e
     except Exception as e:
         print("[ERROR] Fatal error in get_all_attendance: {}".format(str(e)))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/admin/employee-report/{employee_id}")
+@app.get("/api/admin/employee-report/{employee_id}", dependencies=[Depends(require_admin)])
 async def get_employee_report(
     employee_id: int,
     db: Session = Depends(get_db),
@@ -828,27 +924,20 @@ async def get_employee_report(
         
         user = db.query(User).filter(User.id == employee.user_id).first()
         
-        attendance_records = db.query(Attendance).filter(
-            Attendance.employee_id == employee_id,
-            func.date(Attendance.date) >= start_date,
-            func.date(Attendance.date) <= end_date
-        ).order_by(Attendance.date.desc()).all()
+        attendance = attendance_tier(db, start_date)
+        attendance_records = db.query(attendance).filter(
+            attendance.employee_id == employee_id,
+            *day_range(start_date, end_date, attendance)
+        ).order_by(attendance.date.desc()).all()
         
         total_days = len(attendance_records)
         present_days = len([a for a in attendance_records if a.status == 'present'])
         absent_days = len([a for a in attendance_records if a.status == 'absent'])
         
+        verdicts = hmac_integrity.verify_attendance_records(attendance_records)
+        
         attendance_data = []
-        for a in attendance_records:
-            date_str = a.date.strftime("%Y-%m-%d") if a.date else ""
-            is_valid = hmac_integrity.verify_attendance_hmac(
-                employee_id=a.employee_id,
-                date_str=date_str,
-                status=a.status,
-                stored_hmac=a.hmac,
-                latitude=a.latitude or "",
-                longitude=a.longitude or ""
-            )
+        for a, is_valid in zip(attendance_records, verdicts):
             attendance_data.append({
                 "date": str(a.date),
                 "status": a.status,
@@ -875,7 +964,7 @@ async def get_employee_report(
         print("[ERROR] Error in get_employee_report: {}".format(str(e)))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/hr/employee-stats")
+@app.get("/api/hr/employee-stats", dependencies=[Depends(require_hr)])
 async def get_employee_stats(db: Session = Depends(get_db)):
     total_employees = db.query(Employee).filter(Employee.is_approved == True).count()
     pending_approvals = db.query(Employee).filter(Employee.is_approved == False).count()
@@ -885,7 +974,70 @@ async def get_employee_stats(db: Session = Depends(get_db)):
         "pending_approvals": pending_approvals
     }
 
-@app.get("/api/debug/all-employees")
+@app.get("/api/employee/face-thumbnail/{employee_id}")
+async def get_face_thumbnail(employee_id: int, request: Request, db: Session = Depends(get_db), token: dict = Depends(require_user)):
+    """
+    Serve an employee's face thumbnail as a small JPEG, to HR or to the
+    employee themself
+
+    Clients revalidate with If-None-Match and get a 304 without any image
+    being loaded or decrypted; thumbnails are generated lazily for
+    employees who signed up before thumbnails existed.
+    """
+    try:
+        employee = db.query(Employee.id, Employee.face_thumbnail_etag, User.email).outerjoin(
+            User, User.id == Employee.user_id
+        ).filter(Employee.id == employee_id).first()
+        if token.get("role") not in require_hr.roles:
+            ensure_own_employee(employee.email if employee else None, token)
+        if not employee:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        
+        headers = {"Cache-Control": f"private, max-age={settings.FACE_THUMBNAIL_MAX_AGE}"}
+        etag = employee.face_thumbnail_etag
+        if etag:
+            headers["ETag"] = f'"{etag}"'
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+            
+            jpeg = thumbnail_cache.get(employee_id, etag)
+            if jpeg is None:
+                encrypted_thumbnail = db.query(Employee.face_thumbnail).filter(Employee.id == employee_id).scalar()
+                jpeg = biometric_storage.decrypt_thumbnail(encrypted_thumbnail)
+                thumbnail_cache.put(employee_id, etag, jpeg)
+            return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+        
+        record = db.query(Employee).filter(Employee.id == employee_id).first()
+        if not record.face_image:
+            raise HTTPException(status_code=404, detail="No face image on file")
+        
+        face_image = biometric_storage.decrypt_face_image(record.face_image)
+        release_connection(db)
+        jpeg, etag = await biometric_pool.run(make_thumbnail, face_image)
+        record.face_thumbnail = biometric_storage.encrypt_thumbnail(jpeg)
+        record.face_thumbnail_etag = etag
+        db.commit()
+        thumbnail_cache.put(employee_id, etag, jpeg)
+        print(f"[THUMBNAIL] ✅ Generated face thumbnail for employee {employee_id}")
+        
+        headers["ETag"] = f'"{etag}"'
+        return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"[ERROR] Face thumbnail error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/employee/face-image/{employee_id}", dependencies=[Depends(require_hr)])
+async def get_face_image(employee_id: int, db: Session = Depends(get_db)):
+    """The full face image as captured, for checking identity before approval"""
+    encrypted_image = db.query(Employee.face_image).filter(Employee.id == employee_id).scalar()
+    if not encrypted_image:
+        raise HTTPException(status_code=404, detail="No face image on file")
+    image = biometric_storage.decrypt_face_image(encrypted_image)
+    return Response(content=image, media_type=image_media_type(image), headers={"Cache-Control": "no-store"})
+
+@app.get("/api/debug/all-employees", dependencies=[Depends(require_hr)])
 async def get_all_employees(db: Session = Depends(get_db)):
     try:
         employees = db.query(Employee).all()
@@ -894,37 +1046,40 @@ async def get_all_employees(db: Session = Depends(get_db)):
         for emp in employees:
             user = db.query(User).filter(User.id == emp.user_id).first()
             if user:
-                has_image = bool(emp.face_image)
-                image_len = len(emp.face_image) if emp.face_image else 0
-                print(f"[DEBUG] Processing {emp.full_name} (ID: {emp.id}). Has image: {has_image}, Len: {image_len}")
-                
-                decrypted_face_image = aes_encryption.decrypt_data(emp.face_image) if emp.face_image else None
-                
                 result.append({
                     "id": emp.id,
                     "full_name": emp.full_name,
                     "email": user.email,
                     "cnic": emp.cnic,
-                    "face_image": decrypted_face_image  # Include decrypted face image
+                    "face_thumbnail_url": thumbnail_url(emp.id) if emp.has_face_image else None,
+                    "face_thumbnail_etag": emp.face_thumbnail_etag
                 })
         return result
     except Exception as e:
         print("[ERROR] Debug all-employees error: {}".format(str(e)))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/admin/employees-list")
-async def get_employees_list(db: Session = Depends(get_db)):
+@app.get("/api/admin/employees-list", dependencies=[Depends(require_admin)])
+async def get_employees_list(db: AsyncSession = Depends(get_async_db)):
     """Get list of all approved employees for admin"""
     try:
-        employees = db.query(Employee).filter(Employee.is_approved == True).all()
+        employees = (await db.execute(
+            select(
+                Employee.id,
+                Employee.employee_id,
+                Employee.full_name,
+                Employee.department,
+                Employee.position,
+                User.email
+            ).outerjoin(User, User.id == Employee.user_id).where(Employee.is_approved == True)
+        )).all()
         result = []
         for emp in employees:
-            user = db.query(User).filter(User.id == emp.user_id).first()
             result.append({
                 "id": emp.id,
                 "employee_id": emp.employee_id,
                 "full_name": emp.full_name,
-                "email": user.email if user else "N/A",
+                "email": emp.email or "N/A",
                 "department": emp.department or "N/A",
                 "position": emp.position or "N/A"
             })
@@ -933,51 +1088,28 @@ async def get_employees_list(db: Session = Depends(get_db)):
         print("[ERROR] Error in get_employees_list: {}".format(str(e)))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/admin/all-employees-stats")
+@app.get("/api/admin/all-employees-stats", dependencies=[Depends(require_hr)])
 async def get_all_employees_stats(db: Session = Depends(get_db)):
     """Get all employees with their attendance statistics"""
+    # Aggregated in SQL and streamed, so memory is O(employees) not O(attendance rows)
+    return StreamingResponse(stream_employee_stats(db), media_type="application/json")
+
+@app.get("/api/admin/export-attendance", dependencies=[Depends(require_admin)])
+async def export_attendance(start_date: str, end_date: str, db: Session = Depends(get_db)):
+    """Attendance of all employees in a date range as CSV"""
     try:
-        employees = db.query(Employee).filter(Employee.is_approved == True).order_by(Employee.full_name).all()
-        result = []
-        
-        for emp in employees:
-            user = db.query(User).filter(User.id == emp.user_id).first()
-            
-            attendance_records = db.query(Attendance).filter(
-                Attendance.employee_id == emp.id
-            ).all()
-            
-            total_attendance = len(attendance_records)
-            present_count = len([a for a in attendance_records if a.status == 'present'])
-            absent_count = len([a for a in attendance_records if a.status == 'absent'])
-            attendance_rate = round((present_count / total_attendance * 100) if total_attendance > 0 else 0, 2)
-            
-            last_attendance = db.query(Attendance).filter(
-                Attendance.employee_id == emp.id
-            ).order_by(Attendance.date.desc()).first()
-            
-            result.append({
-                "id": emp.id,
-                "employee_id": emp.employee_id,
-                "full_name": emp.full_name,
-                "email": user.email if user else "N/A",
-                "department": emp.department or "N/A",
-                "position": emp.position or "N/A",
-                "cnic": emp.cnic or "N/A",
-                "total_attendance": total_attendance,
-                "present_count": present_count,
-                "absent_count": absent_count,
-                "attendance_rate": attendance_rate,
-                "last_attendance": str(last_attendance.date) if last_attendance else "No record",
-                "joined_at": str(emp.created_at.date()) if emp.created_at else "N/A"
-            })
-        
-        return result
-    except Exception as e:
-        print("[ERROR] Error in get_all_employees_stats: {}".format(str(e)))
-        raise HTTPException(status_code=500, detail=str(e))
+        day_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # COPY on PostgreSQL, batched rows elsewhere; either way the body is streamed
+    return StreamingResponse(
+        repository.export_attendance_csv(db, start_date, end_date),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="attendance_{start_date}_{end_date}.csv"'}
+    )
 
-@app.get("/api/admin/employee-attendance-history/{employee_id}")
+@app.get("/api/admin/employee-attendance-history/{employee_id}", dependencies=[Depends(require_admin)])
 async def get_employee_attendance_history(
     employee_id: int,
     db: Session = Depends(get_db),
@@ -997,27 +1129,20 @@ async def get_employee_attendance_history(
         
         user = db.query(User).filter(User.id == employee.user_id).first()
         
-        attendance_records = db.query(Attendance).filter(
-            Attendance.employee_id == employee_id,
-            func.date(Attendance.date) >= start_date,
-            func.date(Attendance.date) <= end_date
-        ).order_by(Attendance.date.desc()).all()
+        attendance = attendance_tier(db, start_date)
+        attendance_records = db.query(attendance).filter(
+            attendance.employee_id == employee_id,
+            *day_range(start_date, end_date, attendance)
+        ).order_by(attendance.date.desc()).all()
         
         total_days = len(attendance_records)
         present_days = len([a for a in attendance_records if a.status == 'present'])
         absent_days = len([a for a in attendance_records if a.status == 'absent'])
         
+        verdicts, tampered_months = verify_employee_range(db, employee_id, attendance_records, start_date, end_date)
+        
         attendance_data = []
-        for a in attendance_records:
-            date_str = a.date.strftime("%Y-%m-%d") if a.date else ""
-            is_valid = hmac_integrity.verify_attendance_hmac(
-                employee_id=a.employee_id,
-                date_str=date_str,
-                status=a.status,
-                stored_hmac=a.hmac,
-                latitude=a.latitude or "",
-                longitude=a.longitude or ""
-            )
+        for a, is_valid in zip(attendance_records, verdicts):
             attendance_data.append({
                 "date": str(a.date.date()) if a.date else "N/A",
                 "status": a.status,
@@ -1041,13 +1166,14 @@ async def get_employee_attendance_history(
             "present_days": present_days,
             "absent_days": absent_days,
             "attendance_rate": round((present_days / total_days * 100) if total_days > 0 else 0, 2),
-            "attendance_records": attendance_data
+            "attendance_records": attendance_data,
+            "tampered_months": tampered_months
         }
     except Exception as e:
         print("[ERROR] Error in get_employee_attendance_history: {}".format(str(e)))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/admin/generate-report/{employee_id}")
+@app.get("/api/admin/generate-report/{employee_id}", dependencies=[Depends(require_admin)])
 async def generate_report(
     employee_id: int,
     db: Session = Depends(get_db),
@@ -1067,11 +1193,11 @@ async def generate_report(
         
         user = db.query(User).filter(User.id == employee.user_id).first()
         
-        attendance_records = db.query(Attendance).filter(
-            Attendance.employee_id == employee_id,
-            func.date(Attendance.date) >= start_date,
-            func.date(Attendance.date) <= end_date
-        ).order_by(Attendance.date.asc()).all()
+        attendance = attendance_tier(db, start_date)
+        attendance_records = db.query(attendance).filter(
+            attendance.employee_id == employee_id,
+            *day_range(start_date, end_date, attendance)
+        ).order_by(attendance.date.asc()).all()
         
         total_days = len(attendance_records)
         present_days = len([a for a in attendance_records if a.status == 'present'])
@@ -1108,22 +1234,14 @@ async def generate_report(
         report_lines.append("Date          | Status   | Time              | Location")
         report_lines.append("-" * 80)
         
-        for record in attendance_records:
+        verdicts, tampered_months = verify_employee_range(db, employee_id, attendance_records, start_date, end_date)
+        
+        for record, is_valid in zip(attendance_records, verdicts):
             date_str = str(record.date.date()) if record.date else "N/A"
             status_str = record.status.upper()
             time_str = record.marked_at.strftime("%H:%M:%S") if record.marked_at else "N/A"
             location_str = record.location_name or "N/A"
             
-            date_only = record.date.strftime("%Y-%m-%d") if record.date else ""
-            is_valid = hmac_integrity.verify_attendance_hmac(
-                employee_id=record.employee_id,
-                date_str=date_only,
-                status=record.status,
-                stored_hmac=record.hmac,
-                latitude=record.latitude or "",
-                longitude=record.longitude or ""
-            )
-            
             tamper_flag = " [TAMPERED]" if not is_valid else ""
             report_lines.append("{} | {} | {} | {}{}".format(
                 date_str.ljust(13),
@@ -1134,6 +1252,9 @@ async def generate_report(
             ))
         
         report_lines.append("-" * 80)
+        if tampered_months:
+            report_lines.append("INTEGRITY WARNING: records changed or removed in {}".format(", ".join(tampered_months)))
+            report_lines.append("-" * 80)
         report_lines.append("Generated on: {}".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
         report_lines.append("=" * 80)
         
@@ -1151,10 +1272,52 @@ async def generate_report(
         print("[ERROR] Error in generate_report: {}".format(str(e)))
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/debug/status")
+@app.get("/api/debug/biometric-pool", dependencies=[Depends(require_admin)])
+async def biometric_pool_status():
+    """Queue depth and worker utilization of the biometric worker pool"""
+    return biometric_pool.metrics()
+
+@app.get("/api/debug/password-hasher", dependencies=[Depends(require_admin)])
+async def password_hasher_status():
+    """Argon2 concurrency, queue wait times and hash profiles"""
+    return password_hasher.metrics()
+
+@app.get("/api/debug/login-limiter", dependencies=[Depends(require_admin)])
+async def login_limiter_status():
+    """Rate limiter state and the buffered login attempt writer"""
+    return {
+        "backend": settings.RATE_LIMIT_BACKEND,
+        "tracked_keys": len(login_rate_limiter.backend),
+        "rate_limited": login_rate_limiter.limited,
+        "attempt_writer": login_attempt_writer.metrics()
+    }
+
+@app.get("/api/debug/mail-queue", dependencies=[Depends(require_admin)])
+async def mail_queue_status(db: AsyncSession = Depends(get_async_db)):
+    """Outbound email counts by status and the SMTP worker's counters"""
+    counts = (await db.execute(select(OutboundEmail.status, func.count()).group_by(OutboundEmail.status))).all()
+    return {**mail_queue.metrics(), "queue": {status: count for status, count in counts}}
+
+@app.get("/api/debug/auth-cache", dependencies=[Depends(require_admin)])
+async def auth_cache_status():
+    """Hit rate and size of the decoded JWT cache, and the token signing keys"""
+    return {**token_cache.metrics(), "tokens": token_service.metrics()}
+
+@app.get("/api/debug/envelope-crypto", dependencies=[Depends(require_admin)])
+async def envelope_crypto_status():
+    """Session key cache of the payload envelope decryption"""
+    return pq_crypto.metrics()
+
+@app.get("/api/debug/db-pool", dependencies=[Depends(require_admin)])
+async def db_pool_status():
+    """Connection pool usage and effective SQLite PRAGMAs"""
+    return database_status(engine)
+
+@app.get("/api/debug/status", dependencies=[Depends(require_admin)])
 async def debug_status(db: Session = Depends(get_db)):
     try:
         attendance_count = db.query(Attendance).count()
+        archived_attendance_count = db.query(AttendanceArchive).count()
         employee_count = db.query(Employee).count()
         user_count = db.query(User).count()
         
@@ -1162,6 +1325,7 @@ async def debug_status(db: Session = Depends(get_db)):
             "backend": "OK",
             "database": "OK",
             "total_attendance": attendance_count,
+            "archived_attendance": archived_attendance_count,
             "total_employees": employee_count,
             "total_users": user_count
         }
@@ -1170,24 +1334,32 @@ async def debug_status(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/biometric/enroll")
-async def enroll_biometric(request: BiometricEnrollRequest, db: Session = Depends(get_db)):
+async def enroll_biometric(request: BiometricEnrollRequest, db: Session = Depends(get_db), token: dict = Depends(require_user)):
+    """Enroll biometrics for the signed-in employee, or for any employee as HR"""
+    row = db.query(Employee, User.email).outerjoin(User, User.id == Employee.user_id).filter(Employee.id == request.employee_id).first()
+    if token.get("role") not in require_hr.roles:
+        ensure_own_employee(row.email if row else None, token)
+    request.face_image = open_client_payload(request.face_image)
     try:
-        employee = db.query(Employee).filter(Employee.id == request.employee_id).first()
-        if not employee:
+        if not row:
             raise HTTPException(status_code=404, detail="Employee not found")
+        employee = row.Employee
+        
+        release_connection(db)
         
         fingerprint_processed = None
         face_processed = None
         
         if request.fingerprint_image:
-            fingerprint_processed = BiometricProcessor.process_fingerprint_image(request.fingerprint_image)
+            fingerprint_processed = await biometric_pool.run(BiometricProcessor.process_fingerprint_image, request.fingerprint_image)
             if not fingerprint_processed:
                 raise HTTPException(status_code=400, detail="Failed to process fingerprint image. Ensure image is clear.")
         
         if request.face_image:
-            face_processed = BiometricProcessor.process_face_image(request.face_image)
+            face_processed = await biometric_pool.run(BiometricProcessor.process_face_image, request.face_image)
             if not face_processed:
                 raise HTTPException(status_code=400, detail="Failed to process face image. Ensure face is clearly visible.")
+            thumbnail, thumbnail_etag = await biometric_pool.run(make_thumbnail, decode_image_data(request.face_image))
         
         if not fingerprint_processed and not face_processed:
             raise HTTPException(status_code=400, detail="At least one biometric (fingerprint or face) is required")
@@ -1198,10 +1370,18 @@ async def enroll_biometric(request: BiometricEnrollRequest, db: Session = Depend
             pass # Fingerprint column not in models.py yet
             
         if face_processed:
-            employee.face_data = aes_encryption.encrypt_data(face_processed)
+            employee.face_data = biometric_storage.encrypt_face_template(decode_template(face_processed))
+            employee.face_thumbnail = biometric_storage.encrypt_thumbnail(thumbnail)
+            employee.face_thumbnail_etag = thumbnail_etag
             
         employee.biometric_enrolled = True
+        if face_processed:
+            face_index.mark_changed(db, [employee.id])
         db.commit()
+        face_template_store.invalidate(employee.id)
+        thumbnail_cache.invalidate(employee.id)
+        if face_processed:
+            face_index.upsert(employee.id, normalize(decode_template(face_processed)), active=bool(employee.is_approved))
         
         return {
             "message": "Biometric enrollment successful",
@@ -1215,15 +1395,16 @@ async def enroll_biometric(request: BiometricEnrollRequest, db: Session = Depend
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/biometric/verify")
-async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depends(get_db)):
+async def verify_biometric(request: BiometricVerifyRequest, db: AsyncSession = Depends(get_async_db)):
     print(f"\n[VERIFY] Received verification request for {request.email}")
+    request.face_image = open_client_payload(request.face_image)
     try:
-        user = db.query(User).filter(User.email == request.email).first()
+        user = (await db.execute(select(User).where(User.email == request.email))).scalars().first()
         if not user:
             print("[VERIFY] User not found")
             raise HTTPException(status_code=400, detail="User not found")
         
-        employee = db.query(Employee).filter(Employee.user_id == user.id).first()
+        employee = (await db.execute(select(Employee).where(Employee.user_id == user.id))).scalars().first()
         if not employee:
             print("[VERIFY] Employee not found")
             raise HTTPException(status_code=400, detail="Employee record not found")
@@ -1240,7 +1421,7 @@ async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depend
         
         if request.fingerprint_image and employee.fingerprint_data:
             try:
-                captured_fingerprint = BiometricProcessor.process_fingerprint_image(request.fingerprint_image)
+                captured_fingerprint = await biometric_pool.run(BiometricProcessor.process_fingerprint_image, request.fingerprint_image)
                 if captured_fingerprint:
                     fingerprint_score, fingerprint_match = BiometricProcessor.compare_fingerprints(
                         employee.fingerprint_data, captured_fingerprint
@@ -1248,6 +1429,8 @@ async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depend
                     debug_info.append(f"Fingerprint score: {fingerprint_score:.2f}")
                 else:
                     debug_info.append("Fingerprint processing failed (no features extracted)")
+            except HTTPException as e:
+                raise e
             except Exception as e:
                 print(f"[ERROR] Fingerprint comparison error: {str(e)}")
                 debug_info.append(f"Fingerprint error: {str(e)}")
@@ -1255,15 +1438,15 @@ async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depend
         if request.face_image and employee.face_data:
             print("[VERIFY] Processing face image...")
             try:
-                captured_face = BiometricProcessor.process_face_image(request.face_image)
+                captured_face = await biometric_pool.run(BiometricProcessor.process_face_image, request.face_image)
                 if captured_face:
                     print("[VERIFY] Face processed successfully, comparing...")
                     
-                    # Decrypt stored face data
-                    decrypted_face_data = aes_encryption.decrypt_data(employee.face_data)
+                    # Decrypted, normalized stored template (cached per employee)
+                    stored_vector = face_template_store.get(employee.id, employee.face_data)
                     
-                    face_score, face_match = BiometricProcessor.compare_faces(
-                        decrypted_face_data, captured_face
+                    face_score, face_match = BiometricProcessor.match_face_vectors(
+                        stored_vector, normalize(decode_template(captured_face))
                     )
                     print(f"[VERIFY] Face match result: {face_match}, Score: {face_score}")
                     
@@ -1274,6 +1457,8 @@ async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depend
                 else:
                     print("[VERIFY] Failed to process captured face image (no face detected?)")
                     debug_info.append("No face detected. Please ensure good lighting and face the camera directly.")
+            except HTTPException as e:
+                raise e
             except Exception as e:
                 print(f"[ERROR] Face comparison error: {str(e)}")
                 print(traceback.format_exc())
@@ -1284,7 +1469,7 @@ async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depend
             
             # Update last successful biometric verification timestamp
             employee.last_biometric_success = datetime.now()
-            db.commit()
+            await db.commit()
             
             return {
                 "status": "authenticated",
@@ -1318,10 +1503,81 @@ async def verify_biometric(request: BiometricVerifyRequest, db: Session = Depend
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/biometric/identify", dependencies=[Depends(require_kiosk)])
+async def identify_biometric(request: BiometricIdentifyRequest, db: Session = Depends(get_db)):
+    """
+    Identify an employee from a face image alone (1:N search over all enrolled employees)
+
+    Only enrolled kiosks may call it, since a match lets that employee mark
+    attendance as present. Candidates are returned only with a match.
+    """
+    print("\n[IDENTIFY] Received identification request")
+    request.face_image = open_client_payload(request.face_image)
+    try:
+        face_index.ensure_current(db)
+        release_connection(db)
+        
+        captured_face = await biometric_pool.run(BiometricProcessor.process_face_image, request.face_image)
+        if not captured_face:
+            raise HTTPException(status_code=400, detail="No face detected. Please ensure good lighting and face the camera directly.")
+        
+        matches = face_index.search(normalize(decode_template(captured_face)), request.top_k)
+        
+        employees = {}
+        if matches:
+            employees = {
+                emp.id: emp for emp in db.query(Employee).filter(
+                    Employee.id.in_([employee_id for employee_id, _ in matches])
+                ).all()
+            }
+        
+        candidates = [
+            {
+                "id": employee_id,
+                "employee_id": employees[employee_id].employee_id,
+                "full_name": employees[employee_id].full_name,
+                "score": score
+            }
+            for employee_id, score in matches if employee_id in employees
+        ]
+        
+        if candidates and candidates[0]["score"] >= BiometricProcessor.FACE_THRESHOLD:
+            employee = employees[candidates[0]["id"]]
+            employee.last_biometric_success = datetime.now()
+            db.commit()
+            print(f"[IDENTIFY] ✅ Identified employee {employee.id} (Score: {candidates[0]['score']:.2f})")
+            
+            return {
+                "status": "identified",
+                "match": True,
+                "employee_id": employee.id,
+                "full_name": employee.full_name,
+                "face_score": candidates[0]["score"],
+                "candidates": candidates,
+                "message": "Face identified. Please mark attendance now."
+            }
+        
+        print("[IDENTIFY] No candidate above threshold")
+        return {
+            "status": "failed",
+            "match": False,
+            "employee_id": None,
+            "face_score": candidates[0]["score"] if candidates else 0.0,
+            "candidates": [],
+            "message": f"No enrolled employee matched above the required threshold ({BiometricProcessor.FACE_THRESHOLD})"
+        }
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"[ERROR] Biometric identification error: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/biometric/request-approval")
-async def request_biometric_approval(request: BiometricVerifyRequest, db: Session = Depends(get_db)):
+async def request_biometric_approval(request: BiometricVerifyRequest, db: Session = Depends(get_db), token: dict = Depends(require_user)):
     try:
         user = db.query(User).filter(User.email == request.email).first()
+        ensure_own_employee(user.email if user else None, token)
         if not user:
             raise HTTPException(status_code=400, detail="User not found")
         
@@ -1364,20 +1620,19 @@ async def request_biometric_approval(request: BiometricVerifyRequest, db: Sessio
         print(f"[ERROR] Admin approval request error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/admin/biometric-requests")
-async def get_biometric_requests(db: Session = Depends(get_db)):
+@app.get("/api/admin/biometric-requests", dependencies=[Depends(require_admin)])
+async def get_biometric_requests(db: AsyncSession = Depends(get_async_db)):
     try:
-        requests = db.query(BiometricRequest).filter(
-            BiometricRequest.status == "pending"
-        ).order_by(BiometricRequest.requested_at.desc()).all()
+        rows = (await db.execute(
+            select(BiometricRequest, Employee).outerjoin(
+                Employee, Employee.id == BiometricRequest.employee_id
+            ).where(
+                BiometricRequest.status == "pending"
+            ).order_by(BiometricRequest.requested_at.desc())
+        )).all()
         
         result = []
-        for req in requests:
-            employee = db.query(Employee).filter(Employee.id == req.employee_id).first()
-            user = db.query(User).filter(User.id == req.user_id).first()
-            
-            decrypted_face_image = aes_encryption.decrypt_data(employee.face_image) if (employee and employee.face_image) else None
-            
+        for req, employee in rows:
             result.append({
                 "request_id": req.id,
                 "employee_name": employee.full_name if employee else "Unknown",
@@ -1387,7 +1642,8 @@ async def get_biometric_requests(db: Session = Depends(get_db)):
                 "face_score": 0.0,
                 "requested_at": req.requested_at.replace(tzinfo=timezone.utc).isoformat() if req.requested_at else None,
                 "status": req.status,
-                "face_image": decrypted_face_image
+                "face_thumbnail_url": thumbnail_url(employee.id) if (employee and employee.has_face_image) else None,
+                "face_thumbnail_etag": employee.face_thumbnail_etag if employee else None
             })
         
         return {"requests": result}
@@ -1395,7 +1651,7 @@ async def get_biometric_requests(db: Session = Depends(get_db)):
         print(f"[ERROR] Get biometric requests error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/admin/biometric-request/{request_id}/approve")
+@app.post("/api/admin/biometric-request/{request_id}/approve", dependencies=[Depends(require_admin)])
 async def approve_biometric_request(request_id: int, db: Session = Depends(get_db)):
     try:
         biometric_request = db.query(BiometricRequest).filter(BiometricRequest.id == request_id).first()
@@ -1410,8 +1666,14 @@ async def approve_biometric_request(request_id: int, db: Session = Depends(get_d
         
         existing_attendance = db.query(Attendance).filter(
             Attendance.employee_id == biometric_request.employee_id,
-            func.date(Attendance.date) == request_date
+            Attendance.day == request_date
         ).first()
+        if not existing_attendance:
+            # A late approval can fall in a month that has already been archived
+            existing_attendance = db.query(AttendanceArchive).filter(
+                AttendanceArchive.employee_id == biometric_request.employee_id,
+                AttendanceArchive.day == request_date
+            ).first()
         
         if not existing_attendance:
             print(f"[APPROVE BIO] Creating attendance record for employee {biometric_request.employee_id}")
@@ -1429,6 +1691,7 @@ async def approve_biometric_request(request_id: int, db: Session = Depends(get_d
             attendance = Attendance(
                 employee_id=biometric_request.employee_id,
                 date=biometric_request.requested_at,
+                day=request_date,
                 status="present",
                 marked_at=datetime.now(),
                 latitude="0.0",
@@ -1454,7 +1717,9 @@ async def approve_biometric_request(request_id: int, db: Session = Depends(get_d
             )
             existing_attendance.hmac = hmac_signature
 
+        refresh_month_digest(db, biometric_request.employee_id, request_date)
         db.commit()
+        hmac_integrity.invalidate(existing_attendance.id if existing_attendance else attendance.id)
         
         return {"message": "Biometric request approved and attendance marked"}
     except HTTPException as e:
@@ -1463,7 +1728,7 @@ async def approve_biometric_request(request_id: int, db: Session = Depends(get_d
         print(f"[ERROR] Approve biometric request error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/admin/biometric-request/{request_id}/deny")
+@app.post("/api/admin/biometric-request/{request_id}/deny", dependencies=[Depends(require_admin)])
 async def deny_biometric_request(request_id: int, db: Session = Depends(get_db)):
     try:
         biometric_request = db.query(BiometricRequest).filter(BiometricRequest.id == request_id).first()
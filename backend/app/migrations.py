@@ -0,0 +1,134 @@
+from collections import defaultdict
+from sqlalchemy import inspect, insert, select, text, update, LargeBinary
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app.models import User, Employee, Attendance, AttendanceDigest, BiometricRequest, OTP, FaceIndexState
+from app.hmac_integrity import hmac_integrity
+from app.repository import calendar_day
+
+def add_attendance_day_column(engine):
+    """Add and backfill attendance.day on databases created before it existed"""
+    columns = {column["name"] for column in inspect(engine).get_columns("attendance")}
+    if "day" in columns:
+        return
+    
+    print("[MIGRATION] Adding attendance.day column...")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE attendance ADD COLUMN day DATE"))
+        conn.execute(update(Attendance.__table__).values(day=calendar_day(Attendance.__table__.c.date)))
+    print("[MIGRATION] ✅ attendance.day backfilled")
+
+def add_employee_thumbnail_columns(engine):
+    """Add the face thumbnail columns; existing employees get thumbnails lazily on first request"""
+    columns = {column["name"] for column in inspect(engine).get_columns("employees")}
+    missing = [name for name in ("face_thumbnail", "face_thumbnail_etag") if name not in columns]
+    if not missing:
+        return
+    
+    print("[MIGRATION] Adding employee face thumbnail columns...")
+    binary_type = LargeBinary().compile(dialect=engine.dialect)  # BLOB on SQLite, BYTEA on PostgreSQL
+    with engine.begin() as conn:
+        if "face_thumbnail" in missing:
+            conn.execute(text(f"ALTER TABLE employees ADD COLUMN face_thumbnail {binary_type}"))
+        if "face_thumbnail_etag" in missing:
+            conn.execute(text("ALTER TABLE employees ADD COLUMN face_thumbnail_etag VARCHAR(32)"))
+    print("[MIGRATION] ✅ Face thumbnail columns added")
+
+def add_otp_attempts_column(engine):
+    """
+    Add otps.attempts; codes are now HMACs, so Argon2 codes issued before
+    this change are dropped (they would have expired within minutes)
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("otps")}
+    if "attempts" in columns:
+        return
+    
+    print("[MIGRATION] Adding otps.attempts column...")
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE otps ADD COLUMN attempts INTEGER DEFAULT 0"))
+        conn.execute(OTP.__table__.delete())
+    print("[MIGRATION] ✅ OTP attempts column added")
+
+def add_user_last_failed_login_column(engine):
+    """Add users.last_failed_login_at, which dates the wrong-password count for the lockout window"""
+    columns = {column["name"] for column in inspect(engine).get_columns("users")}
+    if "last_failed_login_at" in columns:
+        return
+    
+    print("[MIGRATION] Adding users.last_failed_login_at column...")
+    datetime_type = User.__table__.c.last_failed_login_at.type.compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE users ADD COLUMN last_failed_login_at {datetime_type}"))
+    print("[MIGRATION] ✅ users.last_failed_login_at column added")
+
+def add_employee_face_index_version_column(engine):
+    """
+    Add employees.face_index_version and the face_index_state row; existing
+    templates are loaded by every worker's first full index build
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("employees")}
+    if "face_index_version" not in columns:
+        print("[MIGRATION] Adding employees.face_index_version column...")
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE employees ADD COLUMN face_index_version INTEGER"))
+        print("[MIGRATION] ✅ employees.face_index_version column added")
+    for index in Employee.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        if conn.execute(select(FaceIndexState.id).where(FaceIndexState.id == 1)).first() is None:
+            conn.execute(insert(FaceIndexState).values(id=1, version=0))
+
+def create_attendance_indexes(engine):
+    """Create the attendance, biometric request and OTP indexes declared on the models if they are missing"""
+    for index in [*Attendance.__table__.indexes, *BiometricRequest.__table__.indexes, *OTP.__table__.indexes]:
+        try:
+            index.create(bind=engine, checkfirst=True)
+        except IntegrityError:
+            print(f"[MIGRATION] ❌ Could not create {index.name}: duplicate attendance rows exist for the same employee and day.")
+            print("[MIGRATION]    Remove the duplicates and restart to enforce one attendance per day.")
+
+def backfill_attendance_digests(engine):
+    """
+    Build per-employee monthly digests for attendance recorded before they existed
+
+    A month only gets a digest if every row in it passes its own HMAC check,
+    so already-tampered data is never signed off.
+    """
+    db = sessionmaker(bind=engine)()
+    try:
+        if db.query(AttendanceDigest.id).first() is not None:
+            return
+        
+        months = defaultdict(list)
+        for record in db.query(Attendance).filter(Attendance.day != None).all():
+            months[(record.employee_id, record.day.strftime("%Y-%m"))].append(record)
+        if not months:
+            return
+        
+        print(f"[MIGRATION] Building attendance digests for {len(months)} employee-months...")
+        skipped = 0
+        for (employee_id, month), records in months.items():
+            if not all(hmac_integrity.verify_attendance_records(records)):
+                skipped += 1
+                continue
+            db.add(AttendanceDigest(
+                employee_id=employee_id,
+                month=month,
+                digest=hmac_integrity.compute_month_digest(employee_id, month, records),
+                record_count=len(records)
+            ))
+        db.commit()
+        if skipped:
+            print(f"[MIGRATION] ⚠️ {skipped} employee-months contain tampered records and were left without a digest")
+        print("[MIGRATION] ✅ Attendance digests built")
+    finally:
+        db.close()
+
+def run_migrations(engine):
+    add_attendance_day_column(engine)
+    add_employee_thumbnail_columns(engine)
+    add_otp_attempts_column(engine)
+    add_user_last_failed_login_column(engine)
+    add_employee_face_index_version_column(engine)
+    create_attendance_indexes(engine)
+    backfill_attendance_digests(engine)
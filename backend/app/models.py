@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Text, LargeBinary, ForeignKey, Index, text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, column_property
 from app.database import Base
 
 class User(Base):
@@ -15,6 +15,7 @@ class User(Base):
     security_answer = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     failed_login_attempts = Column(Integer, default=0)
+    last_failed_login_at = Column(DateTime(timezone=True), nullable=True)  # failures older than LOGIN_FAILURE_WINDOW_SECONDS start a new count
     is_locked = Column(Boolean, default=False)
     locked_until = Column(DateTime(timezone=True), nullable=True)
 
@@ -36,17 +37,32 @@ class Employee(Base):
     approved_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     approved_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    face_data = Column(Text, nullable=False)
-    face_image = Column(Text, nullable=True)  # Store base64 image for HR approval
+    # Biometric columns hold biometric_storage BLOBs (legacy rows: Fernet text);
+    # the image columns are only loaded when accessed
+    face_data = Column(LargeBinary, nullable=False)
+    face_image = deferred(Column(LargeBinary, nullable=True))  # Encrypted image for HR approval
+    face_thumbnail = deferred(Column(LargeBinary, nullable=True))  # Encrypted small JPEG served by the thumbnail endpoint
+    has_face_image = column_property(face_image.expression.isnot(None))
+    face_thumbnail_etag = Column(String(32), nullable=True)
     biometric_enrolled = Column(Boolean, default=True)
     last_biometric_success = Column(DateTime(timezone=True), nullable=True)
+    face_index_version = Column(Integer, nullable=True, index=True)  # FaceIndexState.version of the last template or approval change
 
 class Attendance(Base):
     __tablename__ = "attendance"
+    __table_args__ = (
+        # One attendance per employee per day; also serves per-employee range scans
+        Index("uq_attendance_employee_day", "employee_id", "day", unique=True),
+        Index("ix_attendance_day", "day"),
+        # Partial: only the few records still awaiting admin approval
+        Index("ix_attendance_pending", "day",
+              postgresql_where=text("status = 'pending_approval'"), sqlite_where=text("status = 'pending_approval'")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"))
     date = Column(DateTime(timezone=True), server_default=func.now())
+    day = Column(Date, nullable=True)  # Calendar day of `date`, indexed for range queries
     status = Column(String(20))  # present, absent
     marked_at = Column(DateTime(timezone=True), server_default=func.now())
     latitude = Column(String(50), nullable=True)
@@ -54,15 +70,65 @@ class Attendance(Base):
     location_name = Column(String(255), nullable=True)
     hmac = Column(String(64), nullable=False)  # HMAC-SHA256 signature for integrity
 
+class AttendanceDigest(Base):
+    __tablename__ = "attendance_digests"
+    __table_args__ = (
+        Index("uq_attendance_digest_employee_month", "employee_id", "month", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"))
+    month = Column(String(7))  # YYYY-MM
+    digest = Column(String(64), nullable=False)  # HMAC-SHA256 over the month's attendance rows
+    record_count = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AttendanceArchive(Base):
+    # Attendance of archived months, moved out of `attendance` by app.attendance_archive
+    __tablename__ = "attendance_archive"
+    __table_args__ = (
+        Index("uq_attendance_archive_employee_day", "employee_id", "day", unique=True),
+        Index("ix_attendance_archive_day", "day"),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Same id as in attendance
+    employee_id = Column(Integer, ForeignKey("employees.id"))
+    date = Column(DateTime(timezone=True))
+    day = Column(Date, nullable=True)
+    status = Column(String(20))
+    marked_at = Column(DateTime(timezone=True))
+    latitude = Column(String(50), nullable=True)
+    longitude = Column(String(50), nullable=True)
+    location_name = Column(String(255), nullable=True)
+    hmac = Column(String(64), nullable=False)
+
+class FaceIndexState(Base):
+    # Single row (id 1) whose version is bumped with every change that app.face_index must pick up
+    __tablename__ = "face_index_state"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class ArchivedMonth(Base):
+    __tablename__ = "archived_months"
+    
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    record_count = Column(Integer, default=0)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class OTP(Base):
     __tablename__ = "otps"
+    __table_args__ = (
+        Index("ix_otps_email_active", "email", "is_used", "expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(100))
-    otp_code = Column(String(255))
+    otp_code = Column(String(255))  # HMAC-SHA256 of (email, code), see app.otp_service
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True))
     is_used = Column(Boolean, default=False)
+    attempts = Column(Integer, default=0)  # Failed guesses against this code
 
 class LoginAttempt(Base):
     __tablename__ = "login_attempts"
@@ -73,8 +139,32 @@ class LoginAttempt(Base):
     success = Column(Boolean, default=False)
     attempt_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class OutboundEmail(Base):
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        Index("ix_outbound_emails_due", "status", "next_attempt_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(100), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(Text, nullable=True)  # Fernet-encrypted MIME message, cleared once the message is done
+    status = Column(String(20), default="pending")  # pending, sending, sent, failed, expired
+    attempts = Column(Integer, default=0)
+    last_error = Column(String(255), nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=True)  # OTP mails are useless after the code expires
+    claimed_by = Column(String(32), nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
 class BiometricRequest(Base):
     __tablename__ = "biometric_requests"
+    __table_args__ = (
+        Index("ix_biometric_requests_pending", "requested_at",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"))
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta, timezone
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from sqlalchemy import delete, or_
+from sqlalchemy.orm import Session
+from app.aes_encryption import aes_encryption
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models import OTP
+
+OTP_DIGITS = 6
+
+class OTPService:
+    """
+    One-time login codes stored as HMAC-SHA256 over (email, code)
+
+    A 6-digit code has a million values, so a slow hash cannot protect it;
+    expiry and the per-code attempt limit do. Checking a code is one HMAC
+    and a constant-time comparison against the email's active code, found
+    through the (email, is_used, expires_at) index.
+    """
+
+    def __init__(
+        self,
+        key_material: bytes = None,
+        ttl_minutes: int = settings.OTP_TTL_MINUTES,
+        max_attempts: int = settings.OTP_MAX_ATTEMPTS,
+        purge_interval: float = settings.OTP_PURGE_INTERVAL_SECONDS
+    ):
+        # Derived from AES_KEY so no extra secret has to be configured
+        self.key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"otp-hmac-v1"
+        ).derive(key_material or aes_encryption.key)
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.max_attempts = max_attempts
+        self.purge_interval = purge_interval
+        self._purger = None
+
+    def digest(self, email: str, code: str) -> str:
+        message = f"{email.strip().lower()}|{code.strip()}".encode()
+        return hmac.new(self.key, message, hashlib.sha256).hexdigest()
+
+    def issue(self, db: Session, email: str) -> str:
+        """Replace the email's codes with a new one, commit, and return the code to send"""
+        code = f"{secrets.randbelow(10 ** OTP_DIGITS):0{OTP_DIGITS}d}"
+        db.query(OTP).filter(OTP.email == email).delete()
+        db.add(OTP(
+            email=email,
+            otp_code=self.digest(email, code),
+            expires_at=datetime.now(timezone.utc) + self.ttl,
+            attempts=0
+        ))
+        db.commit()
+        return code
+
+    def verify(self, db: Session, email: str, code: str) -> bool:
+        """
+        Consume the email's active code if `code` matches it
+
+        A wrong code counts against every active code of the email, and a
+        code is revoked after max_attempts failures. Changes are flushed;
+        the caller commits.
+        """
+        records = db.query(OTP).filter(
+            OTP.email == email,
+            OTP.is_used == False,
+            OTP.expires_at > datetime.now(timezone.utc)
+        ).all()
+        candidate = self.digest(email, code or "")
+
+        for record in records:
+            if hmac.compare_digest(candidate, record.otp_code or ""):
+                record.is_used = True
+                db.flush()
+                return True
+
+        for record in records:
+            record.attempts = (record.attempts or 0) + 1
+            if record.attempts >= self.max_attempts:
+                record.is_used = True
+        db.flush()
+        return False
+
+    def purge(self, db: Session) -> int:
+        """Delete used and expired codes; returns the number of rows removed"""
+        result = db.execute(delete(OTP).where(or_(
+            OTP.is_used == True,
+            OTP.expires_at <= datetime.now(timezone.utc)
+        )))
+        return result.rowcount
+
+    async def _purge_forever(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    removed = await db.run_sync(self.purge)
+                    await db.commit()
+                if removed:
+                    print(f"[OTP] 🧹 Purged {removed} used or expired codes")
+            except Exception as e:
+                print(f"[OTP] ⚠️ Purge failed: {e}")
+
+    def start_purger(self):
+        """Purge expired codes every purge_interval seconds on the running event loop"""
+        if self._purger is None or self._purger.done():
+            self._purger = asyncio.get_running_loop().create_task(self._purge_forever())
+
+    def stop_purger(self):
+        if self._purger is not None:
+            self._purger.cancel()
+            self._purger = None
+
+
+otp_service = OTPService()
@@ -1,99 +1,288 @@
 import os
 import base64
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+import binascii
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+from cryptography.hazmat.primitives.asymmetric import rsa, padding, x25519
 from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.backends import default_backend
+from app.config import settings
+
+# Serialized envelope: "env1.<kem>.<encapsulated key>.<nonce>.<ciphertext>", standard base64
+# fields ("." is not in the alphabet; the standard codec is the fastest for multi-MB payloads)
+ENVELOPE_PREFIX = "env1."
+KEM_RSA = "rsa"        # RSA-OAEP-SHA256 wraps a random AES-256 key
+KEM_X25519 = "x25519"  # client's X25519 public key; AES-256 key = HKDF(ECDH shared secret)
+NONCE_SIZE = 12
+
+def _b64encode(data: bytes) -> str:
+    return binascii.b2a_base64(data, newline=False).decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return binascii.a2b_base64(data)
+
+def _aad(kem: str, encapsulated_key: bytes) -> bytes:
+    # Binds the ciphertext to the key it was sealed under
+    return f"{ENVELOPE_PREFIX}{kem}.".encode() + encapsulated_key
+
+OAEP = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+class SessionKeyCache:
+    """
+    Decapsulated AES keys by SHA-256 of the encapsulated key, LRU with a TTL
+
+    A client seals every message of its session under the same
+    encapsulated key, so the server pays for one RSA or X25519 operation
+    per session instead of one per message.
+    """
+
+    def __init__(self, max_entries: int = settings.PQ_SESSION_CACHE_SIZE, ttl: float = settings.PQ_SESSION_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (expires_at, AESGCM)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes) -> Optional[AESGCM]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(digest, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, digest: bytes, aead: AESGCM):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (time.monotonic() + self.ttl, aead)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def metrics(self) -> dict:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+class EnvelopeSession:
+    """
+    The sending side of the envelope format: one encapsulated AES-256 key
+    per session, a fresh nonce per message
+
+    This is what frontend/js/encryption.js does in the browser; the Python
+    class serves tests, benchmarks and server-to-server callers.
+    """
+
+    def __init__(self, kem: str, rsa_public_key=None, x25519_public_key: x25519.X25519PublicKey = None):
+        self.kem = kem
+        if kem == KEM_RSA:
+            key = AESGCM.generate_key(bit_length=256)
+            self.encapsulated_key = rsa_public_key.encrypt(key, OAEP)
+        elif kem == KEM_X25519:
+            ephemeral = x25519.X25519PrivateKey.generate()
+            self.encapsulated_key = ephemeral.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+            key = _derive_x25519_key(ephemeral.exchange(x25519_public_key), self.encapsulated_key, x25519_public_key)
+        else:
+            raise ValueError(f"Unknown key encapsulation '{kem}'")
+        self._aead = AESGCM(key)
+        self._aad = _aad(kem, self.encapsulated_key)
+        self._header = f"{ENVELOPE_PREFIX}{kem}.{_b64encode(self.encapsulated_key)}."
+
+    def seal(self, data: Union[str, bytes]) -> str:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        return f"{self._header}{_b64encode(nonce)}.{_b64encode(self._aead.encrypt(nonce, data, self._aad))}"
+
+def _derive_x25519_key(shared_secret: bytes, client_public: bytes, server_public_key: x25519.X25519PublicKey) -> bytes:
+    server_public = server_public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"pq-envelope-v1" + client_public + server_public
+    ).derive(shared_secret)
 
 class PostQuantumCrypto:
+    """
+    Hybrid envelope encryption for client payloads
+
+    Payloads are sealed with AES-256-GCM, so their size is unlimited and
+    opening a 5 MB biometric image is bounded by base64 decoding, not by
+    public-key work. Only the
+    session's AES key goes through RSA-OAEP (4096-bit) or X25519, once per
+    session thanks to SessionKeyCache. Keys are loaded, or generated, on
+    first use rather than at import.
+    """
+
     def __init__(self, key_dir="certs"):
         self.key_dir = key_dir
-        self.private_key = None
-        self.public_key = None
-        self._load_or_generate_keys()
+        self._private_key = None
+        self._public_key = None
+        self._x25519_private_key = None
+        self._key_lock = threading.Lock()
+        self.session_keys = SessionKeyCache()
+
+    @property
+    def private_key(self):
+        if self._private_key is None:
+            self._load_or_generate_keys()
+        return self._private_key
+
+    @property
+    def public_key(self):
+        if self._public_key is None:
+            self._load_or_generate_keys()
+        return self._public_key
+
+    @property
+    def x25519_private_key(self) -> x25519.X25519PrivateKey:
+        if self._x25519_private_key is None:
+            self._load_or_generate_keys()
+        return self._x25519_private_key
 
     def _load_or_generate_keys(self):
-        """Load RSA keys for encryption (RSA-4096 implementation)"""
-        private_key_path = os.path.join(self.key_dir, "rsa_private.pem")
-        public_key_path = os.path.join(self.key_dir, "rsa_public.pem")
-        
-        if os.path.exists(private_key_path) and os.path.exists(public_key_path):
-            with open(private_key_path, "rb") as f:
-                self.private_key = serialization.load_pem_private_key(
-                    f.read(),
-                    password=None,
-                    backend=default_backend()
-                )
-            with open(public_key_path, "rb") as f:
-                self.public_key = serialization.load_pem_public_key(
-                    f.read(),
-                    backend=default_backend()
-                )
-        else:
-            self._generate_keys()
-    
+        """Load the RSA-4096 and X25519 key pairs, generating any that are missing"""
+        with self._key_lock:
+            if self._private_key is not None and self._x25519_private_key is not None:
+                return
+            private_key_path = os.path.join(self.key_dir, "rsa_private.pem")
+            public_key_path = os.path.join(self.key_dir, "rsa_public.pem")
+
+            if os.path.exists(private_key_path) and os.path.exists(public_key_path):
+                with open(private_key_path, "rb") as f:
+                    self._private_key = serialization.load_pem_private_key(
+                        f.read(),
+                        password=None,
+                        backend=default_backend()
+                    )
+                with open(public_key_path, "rb") as f:
+                    self._public_key = serialization.load_pem_public_key(
+                        f.read(),
+                        backend=default_backend()
+                    )
+            else:
+                self._generate_keys()
+
+            x25519_key_path = os.path.join(self.key_dir, "x25519_private.pem")
+            if os.path.exists(x25519_key_path):
+                with open(x25519_key_path, "rb") as f:
+                    self._x25519_private_key = serialization.load_pem_private_key(f.read(), password=None)
+            else:
+                self._x25519_private_key = x25519.X25519PrivateKey.generate()
+                self._write(x25519_key_path, self._x25519_private_key.private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.PKCS8,
+                    encryption_algorithm=serialization.NoEncryption()
+                ))
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(self.key_dir, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
     def _generate_keys(self):
         """Generate RSA 4096-bit key pair for encryption"""
-        os.makedirs(self.key_dir, exist_ok=True)
-        
-        self.private_key = rsa.generate_private_key(
+        self._private_key = rsa.generate_private_key(
             public_exponent=65537,
             key_size=4096,
             backend=default_backend()
         )
-        self.public_key = self.private_key.public_key()
-        
-        private_pem = self.private_key.private_bytes(
+        self._public_key = self._private_key.public_key()
+
+        private_pem = self._private_key.private_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PrivateFormat.TraditionalOpenSSL,
             encryption_algorithm=serialization.NoEncryption()
         )
-        
-        public_pem = self.public_key.public_bytes(
+
+        public_pem = self._public_key.public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
-        
-        with open(os.path.join(self.key_dir, "rsa_private.pem"), "wb") as f:
-            f.write(private_pem)
-        
-        with open(os.path.join(self.key_dir, "rsa_public.pem"), "wb") as f:
-            f.write(public_pem)
-    
+
+        self._write(os.path.join(self.key_dir, "rsa_private.pem"), private_pem)
+        self._write(os.path.join(self.key_dir, "rsa_public.pem"), public_pem)
+
     def get_public_key_pem(self):
         """Return public key in PEM format for client"""
         return self.public_key.public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         ).decode('utf-8')
-    
+
+    def get_x25519_public_key(self) -> str:
+        """Return the raw X25519 public key, base64 encoded"""
+        return _b64encode(self.x25519_private_key.public_key().public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw))
+
+    def new_session(self, kem: str = KEM_X25519) -> EnvelopeSession:
+        """Start a sending session against this server's public keys"""
+        if kem == KEM_RSA:
+            return EnvelopeSession(kem, rsa_public_key=self.public_key)
+        return EnvelopeSession(kem, x25519_public_key=self.x25519_private_key.public_key())
+
+    def _session_aead(self, kem: str, encapsulated_key: bytes) -> AESGCM:
+        digest = hashlib.sha256(kem.encode() + b"." + encapsulated_key).digest()
+        aead = self.session_keys.get(digest)
+        if aead is None:
+            if kem == KEM_RSA:
+                key = self.private_key.decrypt(encapsulated_key, OAEP)
+            elif kem == KEM_X25519:
+                client_public_key = x25519.X25519PublicKey.from_public_bytes(encapsulated_key)
+                key = _derive_x25519_key(self.x25519_private_key.exchange(client_public_key), encapsulated_key, self.x25519_private_key.public_key())
+            else:
+                raise ValueError(f"Unknown key encapsulation '{kem}'")
+            aead = AESGCM(key)
+            self.session_keys.put(digest, aead)
+        return aead
+
+    def open_envelope(self, envelope: str) -> bytes:
+        """
+        Decrypt a serialized envelope
+
+        Raises:
+            ValueError: malformed envelope, unknown key, or failed authentication
+        """
+        try:
+            kem, key_segment, nonce_segment, ciphertext_segment = envelope[len(ENVELOPE_PREFIX):].split(".")
+            encapsulated_key = _b64decode(key_segment)
+            aead = self._session_aead(kem, encapsulated_key)
+            return aead.decrypt(_b64decode(nonce_segment), _b64decode(ciphertext_segment), _aad(kem, encapsulated_key))
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Could not open envelope: {type(e).__name__}")
+
+    def open_payload(self, value: Optional[str]) -> Optional[str]:
+        """Decrypt `value` if it is an envelope; anything else is returned unchanged"""
+        if value and value.startswith(ENVELOPE_PREFIX):
+            return self.open_envelope(value).decode("utf-8")
+        return value
+
     def encrypt_data(self, data: str) -> str:
-        """Encrypt data using RSA-4096 (public key)"""
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        
-        encrypted = self.public_key.encrypt(
-            data,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
-        return base64.b64encode(encrypted).decode('utf-8')
-    
+        """Seal data in an envelope under a one-off X25519 session"""
+        return self.new_session(KEM_X25519).seal(data)
+
     def decrypt_data(self, encrypted_data: str) -> str:
-        """Decrypt data using RSA-4096 (private key)"""
+        """Decrypt an envelope, or a legacy value RSA-OAEP-encrypted directly with the RSA-4096 key"""
+        if isinstance(encrypted_data, str) and encrypted_data.startswith(ENVELOPE_PREFIX):
+            return self.open_envelope(encrypted_data).decode('utf-8')
         if isinstance(encrypted_data, str):
             encrypted_data = base64.b64decode(encrypted_data.encode('utf-8'))
-        
-        decrypted = self.private_key.decrypt(
-            encrypted_data,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
+
+        decrypted = self.private_key.decrypt(encrypted_data, OAEP)
         return decrypted.decode('utf-8')
 
+    def metrics(self) -> dict:
+        return {"session_keys": self.session_keys.metrics()}
+
 pq_crypto = PostQuantumCrypto()
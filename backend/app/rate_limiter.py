@@ -0,0 +1,128 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from fastapi import HTTPException, status
+from app.config import settings
+
+class RateLimitBackend(ABC):
+    """
+    Storage for rate limit buckets
+
+    The in-memory backend keeps state per process, so each worker applies
+    the limits separately. A shared backend (e.g. Redis) implements the
+    same two methods and is registered in RATE_LIMIT_BACKENDS to make the
+    limits cluster-wide.
+    """
+
+    @abstractmethod
+    def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        """Take one token from the bucket; returns 0 if allowed, else seconds until a token is available"""
+
+    @abstractmethod
+    def reset(self, key: str):
+        """Forget the bucket"""
+
+class MemoryBackend(RateLimitBackend):
+    """
+    Token buckets in a bounded in-process map
+
+    Entries expire once they no longer affect a decision (a bucket that has
+    refilled) and are swept every
+    SWEEP_INTERVAL operations; past max_entries the least recently used are dropped.
+    """
+
+    SWEEP_INTERVAL = 1000
+
+    def __init__(self, max_entries: int = settings.RATE_LIMIT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> [expires_at, state]
+        self._lock = threading.Lock()
+        self._operations = 0
+
+    def _touch(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= now:
+            del self._entries[key]
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        self._operations += 1
+        if self._operations % self.SWEEP_INTERVAL == 0 or len(self._entries) >= self.max_entries:
+            self._sweep(now)
+        return entry
+
+    def _sweep(self, now: float):
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+
+    def take(self, key: str, capacity: int, refill_per_second: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._touch(key, now)
+            if entry is None:
+                tokens = float(capacity)
+            else:
+                tokens, updated_at = entry[1]
+                tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            if tokens < 1:
+                self._entries[key] = [now + (capacity - tokens) / refill_per_second, (tokens, now)]
+                return (1 - tokens) / refill_per_second
+            tokens -= 1
+            self._entries[key] = [now + (capacity - tokens) / refill_per_second, (tokens, now)]
+            return 0.0
+
+    def reset(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+RATE_LIMIT_BACKENDS = {
+    "memory": MemoryBackend,
+}
+
+class LoginRateLimiter:
+    """
+    Per-email and per-IP token buckets for sign-in endpoints
+
+    The check runs before any database work, so a credential-stuffing
+    burst is turned away with 429 without touching the database. Wrong
+    passwords that get through are counted on the users row instead (see
+    login in app.main), so the lockout holds across workers and restarts.
+    """
+
+    def __init__(self, backend: RateLimitBackend = None):
+        if backend is None:
+            if settings.RATE_LIMIT_BACKEND not in RATE_LIMIT_BACKENDS:
+                raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{settings.RATE_LIMIT_BACKEND}', expected one of {', '.join(RATE_LIMIT_BACKENDS)}")
+            backend = RATE_LIMIT_BACKENDS[settings.RATE_LIMIT_BACKEND]()
+        self.backend = backend
+        self.limited = 0
+
+    def check(self, email: str, ip: Optional[str]):
+        """
+        Raises:
+            HTTPException: 429 with Retry-After if the email or IP is over its rate
+        """
+        retry_after = self.backend.take(
+            f"email:{email.strip().lower()}",
+            settings.LOGIN_RATE_EMAIL_BURST,
+            settings.LOGIN_RATE_EMAIL_PER_MINUTE / 60
+        )
+        if not retry_after and ip:
+            retry_after = self.backend.take(f"ip:{ip}", settings.LOGIN_RATE_IP_BURST, settings.LOGIN_RATE_IP_PER_MINUTE / 60)
+        if retry_after:
+            self.limited += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many sign-in attempts. Please wait and try again.",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+            )
+
+
+login_rate_limiter = LoginRateLimiter()
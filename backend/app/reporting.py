@@ -0,0 +1,96 @@
+import json
+from typing import Iterator
+from sqlalchemy import func, case, select, union_all
+from sqlalchemy.orm import Session
+from app.models import User, Employee, Attendance, AttendanceArchive
+from app.attendance_queries import archive_horizon
+
+STREAM_BATCH_SIZE = 500
+
+def attendance_totals(table):
+    """Per-employee attendance totals of one attendance table"""
+    return select(
+        table.c.employee_id,
+        func.count(table.c.id).label("total_attendance"),
+        func.sum(case((table.c.status == "present", 1), else_=0)).label("present_count"),
+        func.sum(case((table.c.status == "absent", 1), else_=0)).label("absent_count"),
+        func.max(table.c.date).label("last_attendance")
+    ).group_by(table.c.employee_id)
+
+def employee_stats_query(db: Session):
+    """
+    Per-employee attendance totals in one grouped pass
+
+    Every approved employee is left-joined to their attendance totals, so
+    employees without any attendance still appear with zero counts.
+    Archived attendance is totalled separately and added in, instead of
+    grouping the union of both tables row by row.
+    """
+    tiers = [Attendance.__table__]
+    if archive_horizon(db) is not None:
+        tiers.append(AttendanceArchive.__table__)
+    totals = union_all(*(attendance_totals(table) for table in tiers)).subquery("attendance_totals")
+    
+    return db.query(
+        Employee.id,
+        Employee.employee_id,
+        Employee.full_name,
+        Employee.department,
+        Employee.position,
+        Employee.cnic,
+        Employee.created_at,
+        User.email,
+        func.coalesce(func.sum(totals.c.total_attendance), 0).label("total_attendance"),
+        func.coalesce(func.sum(totals.c.present_count), 0).label("present_count"),
+        func.coalesce(func.sum(totals.c.absent_count), 0).label("absent_count"),
+        func.max(totals.c.last_attendance).label("last_attendance")
+    ).outerjoin(
+        User, User.id == Employee.user_id
+    ).outerjoin(
+        totals, totals.c.employee_id == Employee.id
+    ).filter(
+        Employee.is_approved == True
+    ).group_by(
+        Employee.id, User.email
+    ).order_by(
+        Employee.full_name
+    )
+
+def serialize_employee_stats(row) -> dict:
+    """Convert one aggregated row into the all-employees-stats JSON shape"""
+    total_attendance = int(row.total_attendance)
+    present_count = int(row.present_count)
+    absent_count = int(row.absent_count)
+    attendance_rate = round((present_count / total_attendance * 100) if total_attendance > 0 else 0, 2)
+
+    return {
+        "id": row.id,
+        "employee_id": row.employee_id,
+        "full_name": row.full_name,
+        "email": row.email or "N/A",
+        "department": row.department or "N/A",
+        "position": row.position or "N/A",
+        "cnic": row.cnic or "N/A",
+        "total_attendance": total_attendance,
+        "present_count": present_count,
+        "absent_count": absent_count,
+        "attendance_rate": attendance_rate,
+        "last_attendance": str(row.last_attendance) if row.last_attendance else "No record",
+        "joined_at": str(row.created_at.date()) if row.created_at else "N/A"
+    }
+
+def stream_employee_stats(db: Session) -> Iterator[bytes]:
+    """
+    Yield the employee stats as a JSON array, one employee at a time
+
+    Rows are fetched in batches of STREAM_BATCH_SIZE, so memory stays
+    proportional to a batch rather than to the attendance table.
+    """
+    yield b"["
+    first = True
+    for row in employee_stats_query(db).yield_per(STREAM_BATCH_SIZE):
+        if not first:
+            yield b","
+        first = False
+        yield json.dumps(serialize_employee_stats(row)).encode()
+    yield b"]"
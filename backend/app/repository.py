@@ -0,0 +1,174 @@
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import Date, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+from app.config import settings
+from app.database import engine
+from app.models import User, Employee, Attendance, AttendanceDigest
+from app.attendance_queries import day_range, attendance_tier
+
+EXPORT_BATCH_SIZE = 1000
+COPY_CHUNK_SIZE = 64 * 1024
+COPY_SPOOL_SIZE = 8 * 1024 * 1024  # COPY output above this goes to a temp file
+
+class calendar_day(FunctionElement):
+    """Calendar day of a timestamp: date(x) on SQLite, CAST(x AS DATE) elsewhere"""
+    type = Date()
+    name = "calendar_day"
+    inherit_cache = True
+
+@compiles(calendar_day)
+def _calendar_day(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS DATE)"
+
+@compiles(calendar_day, "sqlite")
+def _calendar_day_sqlite(element, compiler, **kw):
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+def attendance_export_query(start_date: str, end_date: str, source=Attendance):
+    """
+    Attendance rows in an inclusive ISO date range, oldest first, labelled
+    with the CSV column names
+
+    Args:
+        source: Attendance or the entity returned by attendance_tier
+
+    Raises:
+        ValueError: If either date is not in ISO format
+    """
+    return select(
+        source.id.label("attendance_id"),
+        Employee.employee_id.label("employee_code"),
+        Employee.full_name.label("employee_name"),
+        Employee.department.label("department"),
+        User.email.label("email"),
+        source.day.label("day"),
+        source.status.label("status"),
+        source.marked_at.label("marked_at"),
+        source.latitude.label("latitude"),
+        source.longitude.label("longitude"),
+        source.location_name.label("location_name"),
+        source.hmac.label("hmac")
+    ).join(
+        Employee, Employee.id == source.employee_id
+    ).outerjoin(
+        User, User.id == Employee.user_id
+    ).where(
+        *day_range(start_date, end_date, source)
+    ).order_by(
+        source.day, source.id
+    )
+
+class Repository:
+    """
+    Database operations whose best implementation depends on the dialect
+
+    Only those operations live here: the month digest upsert and the CSV
+    export. The methods are portable; subclasses swap in the dialect's
+    statements. Every other query is plain SQLAlchemy that runs unchanged
+    on SQLite and PostgreSQL, so endpoints keep issuing it directly.
+    """
+
+    dialect = None
+    insert = None  # dialect insert() with on_conflict_do_update
+
+    def upsert_month_digest(self, db: Session, employee_id: int, month: str, digest: str, record_count: int):
+        """Insert or replace an employee-month digest in one statement"""
+        statement = self.insert(AttendanceDigest).values(
+            employee_id=employee_id,
+            month=month,
+            digest=digest,
+            record_count=record_count,
+            updated_at=datetime.now()
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[AttendanceDigest.employee_id, AttendanceDigest.month],
+            set_={
+                "digest": statement.excluded.digest,
+                "record_count": statement.excluded.record_count,
+                "updated_at": statement.excluded.updated_at
+            }
+        ))
+
+    def export_attendance_csv(self, db: Session, start_date: str, end_date: str) -> Iterator[bytes]:
+        """
+        Yield attendance in a date range as CSV with a header row, in the
+        format of PostgreSQL's COPY ... WITH CSV HEADER (NULL is an empty field)
+
+        Rows are fetched EXPORT_BATCH_SIZE at a time and written out per batch.
+        """
+        query = attendance_export_query(start_date, end_date, attendance_tier(db, start_date))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        writer.writerow(result.keys())
+        for rows in result.partitions():
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+class SQLiteRepository(Repository):
+    dialect = "sqlite"
+    insert = staticmethod(sqlite.insert)
+
+class PostgresRepository(Repository):
+    dialect = "postgresql"
+    insert = staticmethod(postgresql.insert)
+
+    def export_attendance_csv(self, db: Session, start_date: str, end_date: str) -> Iterator[bytes]:
+        """
+        Stream the export with COPY (SELECT ...) TO STDOUT, which formats the
+        rows inside the server instead of building Python objects per row
+
+        When emulated on SQLite (DB_EMULATE_DIALECT) the portable writer
+        produces the same CSV.
+        """
+        connection = db.connection()
+        if connection.dialect.name != "postgresql":
+            yield from super().export_attendance_csv(db, start_date, end_date)
+            return
+
+        query = attendance_export_query(start_date, end_date, attendance_tier(db, start_date))
+        compiled = query.compile(dialect=connection.dialect)
+        with tempfile.SpooledTemporaryFile(max_size=COPY_SPOOL_SIZE) as spool:
+            cursor = connection.connection.cursor()
+            try:
+                # COPY takes no bind parameters, so psycopg2 inlines them safely
+                sql = cursor.mogrify(str(compiled), compiled.params).decode()
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH CSV HEADER", spool)
+            finally:
+                cursor.close()
+            spool.seek(0)
+            while chunk := spool.read(COPY_CHUNK_SIZE):
+                yield chunk
+
+REPOSITORIES = {
+    "sqlite": SQLiteRepository,
+    "postgresql": PostgresRepository,
+}
+
+def get_repository(bind=None) -> Repository:
+    """
+    The repository for a bind's dialect, or for DB_EMULATE_DIALECT if set
+
+    Emulation runs the PostgreSQL repository against SQLite. That executes
+    its upsert statement, but not COPY, which needs a real PostgreSQL
+    connection; the export falls back to the portable writer.
+    """
+    dialect = settings.DB_EMULATE_DIALECT or (bind or engine).dialect.name
+    if dialect not in REPOSITORIES:
+        raise ValueError(f"No repository for '{dialect}' databases, expected one of {', '.join(REPOSITORIES)}")
+    return REPOSITORIES[dialect]()
+
+
+repository = get_repository()
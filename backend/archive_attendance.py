@@ -0,0 +1,42 @@
+"""
+Move closed months of attendance into the archive table.
+
+Keeps the current month and the ATTENDANCE_HOT_MONTHS closed months before
+it in `attendance`; older months are moved to `attendance_archive`, one
+transaction per month. Reports and listings include archived rows only
+when their date range reaches back that far. Safe to run repeatedly, e.g.
+from cron at the start of each month.
+
+Usage:
+    python archive_attendance.py [keep_months] [--vacuum]
+"""
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from app.config import settings
+from app.database import engine, Base
+from app.migrations import run_migrations
+from app.attendance_archive import archive_closed_months
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    keep_months = int(args[0]) if args else settings.ATTENDANCE_HOT_MONTHS
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    print(f"[ARCHIVE] Archiving attendance older than {keep_months} closed months...")
+    stats = archive_closed_months(engine, keep_months)
+    print(f"[ARCHIVE] ✅ {stats['rows']} rows in {stats['months']} months archived")
+
+    if "--vacuum" in sys.argv and engine.dialect.name == "sqlite" and stats["rows"]:
+        print("[ARCHIVE] Running VACUUM to compact the attendance table...")
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        print("[ARCHIVE] ✅ VACUUM complete")
+
+if __name__ == "__main__":
+    main()
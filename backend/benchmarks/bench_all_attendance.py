@@ -0,0 +1,106 @@
+"""
+Benchmark /api/admin/all-attendance query strategies.
+
+Compares the legacy per-employee N+1 loop against the single joined query in
+app.attendance_queries for a growing number of employees.
+
+Usage:
+    python benchmarks/bench_all_attendance.py [employee_counts...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import func
+from app.database import engine, Base, SessionLocal
+from app.models import User, Employee, Attendance
+from app.attendance_queries import fetch_attendance_range
+
+DAYS = 5
+REPEAT = 5
+
+def seed(db, employee_count):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    
+    today = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
+    for i in range(employee_count):
+        user = User(email=f"employee{i}@example.com", hashed_password="x", role="employee", is_active=True)
+        db.add(user)
+        db.flush()
+        employee = Employee(
+            user_id=user.id,
+            full_name=f"Employee {i}",
+            cnic=f"cnic-{i}",
+            employee_id=f"EMP{i:05d}",
+            department=["Engineering", "HR", "Finance"][i % 3],
+            position="Staff",
+            is_approved=True,
+            face_data=b"x"
+        )
+        db.add(employee)
+        db.flush()
+        for day in range(DAYS):
+            db.add(Attendance(
+                employee_id=employee.id,
+                date=today - timedelta(days=day),
+                day=(today - timedelta(days=day)).date(),
+                status="present",
+                marked_at=today - timedelta(days=day),
+                hmac="0" * 64
+            ))
+    db.commit()
+
+def legacy_query(db, start_date, end_date):
+    rows = []
+    for employee in db.query(Employee).filter(Employee.is_approved == True).all():
+        user = db.query(User).filter(User.id == employee.user_id).first()
+        records = db.query(Attendance).filter(
+            Attendance.employee_id == employee.id,
+            func.date(Attendance.date) >= start_date,
+            func.date(Attendance.date) <= end_date
+        ).order_by(Attendance.date.desc()).all()
+        rows.extend((record, employee, user) for record in records)
+    return rows
+
+def joined_query(db, start_date, end_date):
+    rows, _ = fetch_attendance_range(db, start_date, end_date)
+    return rows
+
+def measure(fn, db, start_date, end_date):
+    best = float("inf")
+    count = 0
+    for _ in range(REPEAT):
+        db.expire_all()
+        started = time.perf_counter()
+        count = len(fn(db, start_date, end_date))
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, count
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 500, 1000, 2000]
+    end_date = str(datetime.now().date())
+    start_date = str(datetime.now().date() - timedelta(days=DAYS - 1))
+    
+    print(f"{'employees':>10} {'rows':>8} {'legacy ms':>12} {'joined ms':>12} {'speedup':>8}")
+    for employee_count in counts:
+        db = SessionLocal()
+        try:
+            seed(db, employee_count)
+            legacy_ms, legacy_rows = measure(legacy_query, db, start_date, end_date)
+            joined_ms, joined_rows = measure(joined_query, db, start_date, end_date)
+            assert legacy_rows == joined_rows
+            print(f"{employee_count:>10} {joined_rows:>8} {legacy_ms:>12.1f} {joined_ms:>12.1f} {legacy_ms / joined_ms:>7.1f}x")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    main()
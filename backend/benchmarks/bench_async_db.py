@@ -0,0 +1,185 @@
+"""
+Benchmark sync vs async database sessions under concurrent clients.
+
+Starts the API under uvicorn and drives it with N concurrent HTTP clients.
+The same listings are requested through the async endpoints and through
+copies that use the old pattern (a synchronous Session inside an async
+endpoint, which blocks the event loop for every query). Meanwhile a probe
+keeps requesting a route that does not touch the database, to show how
+long unrelated requests wait behind blocked queries.
+
+Usage:
+    python benchmarks/bench_async_db.py [clients] [requests_per_client]
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The server process inherits this, so both sides use the same database file
+if "BENCH_ASYNC_DB" not in os.environ:
+    os.environ["BENCH_ASYNC_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['BENCH_ASYNC_DB']}"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("BIOMETRIC_POOL_MODE", "thread")
+
+import httpx
+
+EMPLOYEES = 200
+DAYS = 5
+ENDPOINTS = {
+    "all-attendance": ("/api/admin/all-attendance?limit=50", "/bench/sync/all-attendance?limit=50"),
+    "employees-list": ("/api/admin/employees-list", "/bench/sync/employees-list"),
+}
+
+def seed():
+    from app.database import engine, Base
+    from app.models import User, Employee, Attendance
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    today = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"email": f"employee{i}@example.com", "hashed_password": "x", "role": "employee", "is_active": True}
+            for i in range(EMPLOYEES)
+        ])
+        conn.execute(Employee.__table__.insert(), [
+            {"user_id": i + 1, "full_name": f"Employee {i}", "cnic": f"cnic-{i}", "employee_id": f"EMP{i:05d}",
+             "department": "Engineering", "position": "Staff", "is_approved": True, "face_data": b"x"}
+            for i in range(EMPLOYEES)
+        ])
+        conn.execute(Attendance.__table__.insert(), [
+            {"employee_id": i + 1, "date": today - timedelta(days=day), "day": (today - timedelta(days=day)).date(),
+             "status": "present", "marked_at": today - timedelta(days=day), "hmac": "0" * 64}
+            for i in range(EMPLOYEES) for day in range(DAYS)
+        ])
+
+def serve(port):
+    import uvicorn
+    from fastapi import Depends
+    from sqlalchemy.orm import Session
+    from app.main import app, hmac_integrity
+    from app.database import get_db
+    from app.models import User, Employee
+    from app.attendance_queries import fetch_attendance_range
+
+    # The pre-async implementations, kept here for comparison only
+    @app.get("/bench/sync/all-attendance")
+    async def sync_all_attendance(limit: int = 50, db: Session = Depends(get_db)):
+        rows, _ = fetch_attendance_range(db, str(datetime.now().date() - timedelta(days=DAYS)), str(datetime.now().date()), limit=limit)
+        verdicts = hmac_integrity.verify_attendance_records(rows)
+        return [{"id": row.id, "employee_name": row.full_name, "tampered": not ok} for row, ok in zip(rows, verdicts)]
+
+    @app.get("/bench/sync/employees-list")
+    async def sync_employees_list(db: Session = Depends(get_db)):
+        result = []
+        for emp in db.query(Employee).filter(Employee.is_approved == True).all():
+            user = db.query(User).filter(User.id == emp.user_id).first()
+            result.append({"id": emp.id, "full_name": emp.full_name, "email": user.email if user else "N/A"})
+        return result
+
+    @app.get("/bench/ping")
+    async def ping():
+        return {"ok": True}
+
+    sys.stdout = open(os.devnull, "w")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", timeout_keep_alive=300)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def drive(base_url, path, clients, requests_per_client):
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        latencies, probe_latencies, failures = [], [], 0
+        done = asyncio.Event()
+
+        async def worker():
+            nonlocal failures
+            for _ in range(requests_per_client):
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                except httpx.TransportError:
+                    failures += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+                failures += response.status_code != 200
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/bench/ping")
+                probe_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    latencies.sort()
+    probe_latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+        "probe_p99": percentile(probe_latencies, 0.99) if probe_latencies else 0.0,
+        "failures": failures,
+    }
+
+async def wait_until_up(base_url):
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(300):
+            try:
+                await client.get("/bench/ping")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests_per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    # Room for every client: with a smaller pool the sync endpoints stall for
+    # pool_timeout, because the blocked event loop cannot run the session
+    # teardown that would return a connection
+    os.environ.setdefault("DB_POOL_SIZE", "10")
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(clients))
+
+    seed()
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.get_context("spawn").Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    try:
+        asyncio.run(wait_until_up(base_url))
+        print(f"{clients} concurrent clients x {requests_per_client} requests, {EMPLOYEES} employees")
+        print(f"{'endpoint':<16}{'session':<8}{'req/s':>8}{'p50 ms':>10}{'p99 ms':>10}{'ping p99 ms':>13}{'errors':>8}")
+        for name, (async_path, sync_path) in ENDPOINTS.items():
+            for session, path in (("sync", sync_path), ("async", async_path)):
+                stats = asyncio.run(drive(base_url, path, clients, requests_per_client))
+                print(f"{name:<16}{session:<8}{stats['rps']:>8.1f}{stats['p50']:>10.1f}{stats['p99']:>10.1f}"
+                      f"{stats['probe_p99']:>13.1f}{stats['failures']:>8}")
+    finally:
+        server.terminate()
+        server.join()
+
+if __name__ == "__main__":
+    main()
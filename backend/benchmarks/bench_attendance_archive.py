@@ -0,0 +1,125 @@
+"""
+Benchmark attendance queries before and after archiving closed months.
+
+Seeds two years of workday attendance, times the listing and report
+queries, archives everything but the last ATTENDANCE_HOT_MONTHS closed
+months with app.attendance_archive, and times the same queries again.
+Recent ranges then only read the small hot table; a range a year back
+reads the union of both tiers.
+
+Usage:
+    python benchmarks/bench_attendance_archive.py [employee_count] [keep_months]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import text
+from app.database import engine, Base, SessionLocal
+from app.models import User, Employee, Attendance
+from app.attendance_queries import fetch_attendance_range, attendance_tier, day_range
+from app.attendance_archive import archive_closed_months
+from app.reporting import employee_stats_query
+
+YEARS = 2
+REPEAT = 5
+
+def seed(employee_count):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in range(YEARS * 365, -1, -1)]
+    workdays = [day for day in days if day.weekday() < 5]
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"email": f"employee{i}@example.com", "hashed_password": "x", "role": "employee", "is_active": True}
+            for i in range(employee_count)
+        ])
+        conn.execute(Employee.__table__.insert(), [
+            {"user_id": i + 1, "full_name": f"Employee {i}", "cnic": f"cnic-{i}", "employee_id": f"EMP{i:05d}",
+             "department": "Engineering", "position": "Staff", "is_approved": True, "face_data": b"x"}
+            for i in range(employee_count)
+        ])
+        for day in workdays:
+            marked_at = datetime.combine(day, datetime.min.time()).replace(hour=9, minute=15)
+            conn.execute(Attendance.__table__.insert(), [
+                {"employee_id": i + 1, "date": marked_at, "day": day, "status": "present",
+                 "marked_at": marked_at, "latitude": "33.64", "longitude": "72.99",
+                 "location_name": "NUST H-12 Islamabad", "hmac": "0" * 64}
+                for i in range(employee_count)
+            ])
+
+def table_size(table):
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        try:
+            size = conn.execute(text(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = :name)"
+            ), {"name": table}).scalar() or 0
+        except Exception:
+            size = 0
+    return rows, size
+
+def employee_history(db, start_date, end_date):
+    attendance = attendance_tier(db, start_date)
+    return db.query(attendance).filter(attendance.employee_id == 1, *day_range(start_date, end_date, attendance)).all()
+
+def measure(fn):
+    best = float("inf")
+    count = 0
+    for _ in range(REPEAT):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            count = len(fn(db))
+            best = min(best, time.perf_counter() - started)
+        finally:
+            db.close()
+    return best * 1000, count
+
+def main():
+    employee_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    keep_months = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    today = date.today()
+    week = (str(today - timedelta(days=6)), str(today))
+    quarter = (str(today - timedelta(days=90)), str(today))
+    last_year = (str(today.replace(day=1) - timedelta(days=365)), str(today.replace(day=1) - timedelta(days=335)))
+    queries = {
+        "all-attendance, last 7 days": lambda db: fetch_attendance_range(db, *week, limit=50)[0],
+        "history, last 90 days": lambda db: employee_history(db, *quarter),
+        "history, a month last year": lambda db: employee_history(db, *last_year),
+        "all-employees-stats": lambda db: employee_stats_query(db).all(),
+    }
+
+    seed(employee_count)
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    print(f"{employee_count} employees, {YEARS} years of workdays, keeping {keep_months} closed months hot")
+    before = {name: measure(query) for name, query in queries.items()}
+    hot_before = table_size("attendance")
+
+    started = time.perf_counter()
+    stats = archive_closed_months(engine, keep_months)
+    archive_seconds = time.perf_counter() - started
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    after = {name: measure(query) for name, query in queries.items()}
+    hot_after = table_size("attendance")
+
+    print(f"archived {stats['rows']} rows in {stats['months']} months in {archive_seconds:.1f} s")
+    print(f"hot table: {hot_before[0]} rows / {hot_before[1] / 1e6:.1f} MB -> {hot_after[0]} rows / {hot_after[1] / 1e6:.1f} MB")
+    print(f"{'query':<30}{'rows':>8}{'before ms':>12}{'after ms':>12}")
+    for name in queries:
+        assert before[name][1] == after[name][1], name
+        print(f"{name:<30}{after[name][1]:>8}{before[name][0]:>12.1f}{after[name][0]:>12.1f}")
+
+if __name__ == "__main__":
+    main()
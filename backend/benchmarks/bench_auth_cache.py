@@ -0,0 +1,81 @@
+"""
+Benchmark JWT validation with and without app.auth.token_cache.
+
+Signs a pool of access tokens like /api/auth/login does, then validates
+them in random order: uncached with jose every time, through the cache,
+and through the full RequireRole dependency that protected routes use.
+A second table compares uncached signing and validation for HS256 and
+the asymmetric EdDSA and ES256 modes, using a throwaway key set.
+
+Usage:
+    python benchmarks/bench_auth_cache.py [validations] [distinct_tokens]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+def main():
+    validations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    from fastapi.security import HTTPAuthorizationCredentials
+    from app.auth import create_access_token, decode_token, verify_token, token_cache, require_hr
+
+    tokens = [create_access_token({"sub": f"user{i}@example.com", "role": "hr"}) for i in range(distinct)]
+    order = [random.choice(tokens) for _ in range(validations)]
+    credentials = {token: HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) for token in tokens}
+
+    def uncached():
+        for token in order:
+            decode_token(token)
+
+    def cached():
+        for token in order:
+            verify_token(token)
+
+    def dependency():
+        async def run():
+            for token in order:
+                await require_hr(credentials[token])
+        asyncio.run(run())
+
+    print(f"{validations} validations over {distinct} distinct tokens ({token_cache.max_entries} cache entries)")
+    print(f"{'mode':<12}{'us/request':>12}{'requests/s':>14}")
+    for name, run in (("uncached", uncached), ("cached", cached), ("dependency", dependency)):
+        token_cache.clear()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<12}{elapsed / validations * 1e6:>12.2f}{validations / elapsed:>14.0f}")
+    print(f"cache: {token_cache.metrics()}")
+
+    from app.auth import TokenService
+    from app.jwt_keys import generate_key, activate_key
+    keys_dir = tempfile.mkdtemp()
+    rounds = max(1, validations // 10)
+    print(f"\n{rounds} uncached sign + validate per algorithm")
+    print(f"{'algorithm':<12}{'sign us':>10}{'validate us':>13}{'token bytes':>13}")
+    for algorithm in ("HS256", "EdDSA", "ES256"):
+        keyset = os.path.join(keys_dir, f"{algorithm}.json")
+        if algorithm != "HS256":
+            activate_key(generate_key(algorithm, keyset, keys_dir), keyset)
+        service = TokenService(algorithm, os.environ["SECRET_KEY"], keyset, keys_dir)
+        claims = {"sub": "user@example.com", "role": "hr", "exp": datetime.utcnow() + timedelta(hours=1)}
+        started = time.perf_counter()
+        signed = [service.sign(claims) for _ in range(rounds)]
+        sign_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        for token in signed:
+            service.validate(token)
+        validate_seconds = time.perf_counter() - started
+        print(f"{algorithm:<12}{sign_seconds / rounds * 1e6:>10.1f}{validate_seconds / rounds * 1e6:>13.1f}{len(signed[0]):>13}")
+
+if __name__ == "__main__":
+    main()
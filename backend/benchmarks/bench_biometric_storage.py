@@ -0,0 +1,99 @@
+"""
+Benchmark biometric column storage formats.
+
+Compares Fernet text (a base64 data URL / JSON float list inside a Fernet
+token) with the binary AES-GCM format from app.biometric_storage: stored
+bytes per employee, decode time, and the time to fetch a page of employees
+from SQLite.
+
+Usage:
+    python benchmarks/bench_biometric_storage.py [employee_count]
+"""
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+import numpy as np
+from PIL import Image
+from sqlalchemy import text
+from app.database import engine, Base, SessionLocal
+from app.models import User, Employee
+from app.aes_encryption import aes_encryption
+from app.biometric_storage import biometric_storage
+
+REPEAT = 20
+
+def sample_image() -> bytes:
+    rng = np.random.default_rng(7)
+    pixels = (rng.random((480, 640, 3)) * 64 + 96).astype(np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="JPEG", quality=85)
+    return output.getvalue()
+
+def timed(fn, repeat=REPEAT):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+def seed(employee_count, face_data, face_image):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    for i in range(employee_count):
+        user = User(email=f"employee{i}@example.com", hashed_password="x", role="employee", is_active=True)
+        db.add(user)
+        db.flush()
+        db.add(Employee(user_id=user.id, full_name=f"Employee {i}", cnic=f"cnic-{i}", employee_id=f"EMP{i:05d}", is_approved=True, face_data=b""))
+    db.commit()
+    db.close()
+    # Raw SQL so legacy text values are stored exactly as the old code did
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE employees SET face_data = :face_data, face_image = :face_image"),
+                     {"face_data": face_data, "face_image": face_image})
+
+def fetch_page(db):
+    db.expunge_all()
+    return [(e.id, e.full_name, e.face_data) for e in db.query(Employee).filter(Employee.is_approved == True).limit(100)]
+
+def main():
+    employee_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    image = sample_image()
+    template = np.random.default_rng(42).standard_normal(128 * 128).astype(np.float32)
+
+    legacy_image = aes_encryption.encrypt_data("data:image/jpeg;base64," + base64.b64encode(image).decode())
+    legacy_template = aes_encryption.encrypt_data(json.dumps(template.astype(float).tolist()))
+    binary_image = biometric_storage.encrypt_face_image(image)
+    binary_template = biometric_storage.encrypt_face_template(template)
+
+    print(f"raw image {len(image) / 1024:.0f} KB, raw template {template.nbytes / 1024:.0f} KB")
+    print(f"{'format':<10}{'image KB':>10}{'template KB':>13}{'decode image':>15}{'decode tmpl':>14}{'DB MB':>8}{'fetch 100':>11}")
+    for name, stored_image, stored_template in (
+        ("fernet", legacy_image, legacy_template),
+        ("binary", binary_image, binary_template),
+    ):
+        image_ms = timed(lambda: biometric_storage.decrypt_face_image(stored_image))
+        template_ms = timed(lambda: biometric_storage.decrypt_face_template(stored_template))
+
+        seed(employee_count, stored_template, stored_image)
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        db = SessionLocal()
+        fetch_ms = timed(lambda: fetch_page(db), 5)
+        db.close()
+
+        print(f"{name:<10}{len(stored_image) / 1024:>10.0f}{len(stored_template) / 1024:>13.0f}"
+              f"{image_ms:>12.2f} ms{template_ms:>11.2f} ms{os.path.getsize(DB_PATH) / 1e6:>8.1f}{fetch_ms:>8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark server-side decryption of client payloads in app.pq_crypto.
+
+The original code RSA-OAEP-encrypted a payload directly with the 4096-bit
+key, which caps payloads at 446 bytes. The envelope modes seal any size
+with AES-256-GCM and encapsulate the session key with RSA-OAEP or X25519:
+
+    rsa_legacy     direct RSA-OAEP, 400-byte payload only
+    rsa_new        envelope, new session per message (RSA decapsulation each time)
+    rsa_session    envelope, one session reused (key served from the cache)
+    x25519_new     envelope, new X25519 session per message
+    x25519_session envelope, one X25519 session reused
+
+Usage:
+    python benchmarks/bench_envelope_crypto.py [seconds_per_case]
+"""
+import base64
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+SIZES = [("1 KB", 1024), ("64 KB", 64 * 1024), ("1 MB", 1024 * 1024), ("5 MB", 5 * 1024 * 1024)]
+
+def timed(fn, budget):
+    """Run fn repeatedly for about `budget` seconds; returns seconds per call"""
+    calls, started = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget and calls >= 3:
+            return elapsed / calls
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 0.5
+    from app.pq_crypto import PostQuantumCrypto, KEM_RSA, KEM_X25519, OAEP
+
+    key_dir = tempfile.mkdtemp()
+    started = time.perf_counter()
+    crypto = PostQuantumCrypto(key_dir)
+    construct_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    crypto.get_public_key_pem()
+    generate_ms = (time.perf_counter() - started) * 1000
+    print(f"PostQuantumCrypto(): {construct_ms:.2f} ms (keys are loaded lazily); generating RSA-4096 + X25519 on first use: {generate_ms:.0f} ms")
+
+    legacy = base64.b64encode(crypto.public_key.encrypt(b"x" * 400, OAEP)).decode()
+    seconds = timed(lambda: crypto.decrypt_data(legacy), budget)
+    print(f"\nrsa_legacy  400 B: {seconds * 1e6:.0f} us/message, {400 / seconds / 1e6:.3f} MB/s (payloads over 446 B impossible)")
+
+    print(f"\n{'mode':<16}" + "".join(f"{label:>20}" for label, _ in SIZES))
+    print(f"{'':<16}" + "".join(f"{'us/msg    MB/s':>20}" for _ in SIZES))
+    for mode, kem, reuse in (("rsa_new", KEM_RSA, False), ("rsa_session", KEM_RSA, True),
+                             ("x25519_new", KEM_X25519, False), ("x25519_session", KEM_X25519, True)):
+        cells = []
+        for _, size in SIZES:
+            payload = os.urandom(size)
+            session = crypto.new_session(kem)
+            if reuse:
+                envelope = session.seal(payload)
+                crypto.open_envelope(envelope)
+                seconds = timed(lambda: crypto.open_envelope(envelope), budget)
+            else:
+                # A pool of distinct sessions, so every open misses the key cache
+                envelopes = [crypto.new_session(kem).seal(payload) for _ in range(8 if size > 1024 * 1024 else 32)]
+                crypto.session_keys.max_entries = 0
+                position = [0]
+
+                def open_next():
+                    crypto.open_envelope(envelopes[position[0] % len(envelopes)])
+                    position[0] += 1
+                seconds = timed(open_next, budget)
+                crypto.session_keys.max_entries = 4096
+            cells.append(f"{seconds * 1e6:>11.0f}{size / seconds / 1e6:>9.1f}")
+        print(f"{mode:<16}" + "".join(cells))
+
+if __name__ == "__main__":
+    main()
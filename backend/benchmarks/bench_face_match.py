@@ -0,0 +1,66 @@
+"""
+Benchmark 1:1 face verification against a stored template.
+
+Compares the original JSON path (Fernet decrypt, json.loads, np.array,
+sklearn cosine_similarity) with float32 templates, both cold (decrypt and
+decode) and warm (served from the template cache, dot product only).
+
+Usage:
+    python benchmarks/bench_face_match.py [iterations]
+"""
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from app.aes_encryption import aes_encryption
+from app.biometric import BiometricProcessor
+from app.face_templates import FaceTemplateStore, encode_template, decode_template, normalize
+
+def legacy_verify(encrypted_json, captured_json):
+    stored = np.array(json.loads(aes_encryption.decrypt_data(encrypted_json))).reshape(1, -1)
+    captured = np.array(json.loads(captured_json)).reshape(1, -1)
+    return float(cosine_similarity(stored, captured)[0][0])
+
+def template_verify(store, encrypted_template, captured_template):
+    stored = store.get(1, encrypted_template)
+    score, _ = BiometricProcessor.match_face_vectors(stored, normalize(decode_template(captured_template)))
+    return score
+
+def timed(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(42)
+    stored = rng.standard_normal(128 * 128).astype(np.float32)
+    captured = stored + rng.standard_normal(128 * 128).astype(np.float32) * 0.3
+    
+    encrypted_json = aes_encryption.encrypt_data(json.dumps(stored.astype(float).tolist()))
+    captured_json = json.dumps(captured.astype(float).tolist())
+    encrypted_template = aes_encryption.encrypt_data(encode_template(stored))
+    captured_template = encode_template(captured)
+    
+    cold_store = FaceTemplateStore(max_size=0)
+    warm_store = FaceTemplateStore()
+    
+    legacy_ms = timed(lambda: legacy_verify(encrypted_json, captured_json), iterations)
+    cold_ms = timed(lambda: template_verify(cold_store, encrypted_template, captured_template), iterations)
+    warm_ms = timed(lambda: template_verify(warm_store, encrypted_template, captured_template), iterations)
+    
+    print(f"stored ciphertext: json {len(encrypted_json) / 1024:.0f} KB, float32 {len(encrypted_template) / 1024:.0f} KB")
+    print(f"cached vector:     {warm_store.get(1, encrypted_template).nbytes / 1024:.0f} KB (legacy float64 array {stored.astype(float).nbytes / 1024:.0f} KB)")
+    print(f"legacy json path:  {legacy_ms:.2f} ms/verify")
+    print(f"float32 cold:      {cold_ms:.2f} ms/verify")
+    print(f"float32 cached:    {warm_ms:.2f} ms/verify")
+
+if __name__ == "__main__":
+    main()
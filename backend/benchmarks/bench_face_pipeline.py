@@ -0,0 +1,132 @@
+"""
+Accuracy and latency of the face preprocessing pipeline.
+
+Builds a synthetic corpus by pasting the scikit-image astronaut portrait
+(face at a known position) onto noisy backgrounds at several frame sizes
+and face scales, encoded as JPEG and PNG data URLs. Each image goes through
+the original pipeline (full-resolution RGB decode, RGB->BGR->GRAY, detect
+on the full frame) and the current one (bounded grayscale decode,
+pyramid-reduced detection).
+
+Reported per frame size:
+    hit rate   first detected face overlaps the true face (IoU >= 0.5)
+    template   mean cosine similarity of the template with one cut from the
+               true face box of the full-resolution frame
+    ms         mean end-to-end latency
+
+Usage:
+    python benchmarks/bench_face_pipeline.py
+"""
+import base64
+import io
+import os
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+from PIL import Image
+from skimage import data
+from app.biometric import BiometricProcessor, HaarFaceDetector
+from app.face_templates import decode_template, normalize
+
+FRAME_SIZES = [(640, 480), (1280, 720), (1920, 1080), (4032, 3024)]
+FACE_FRACTIONS = [0.35, 0.6]
+FORMATS = ["JPEG", "PNG"]
+PORTRAIT_FACE_BOX = (176, 66, 95, 95)  # astronaut face in the 512x512 portrait
+
+def legacy_pipeline(image_data, cascade):
+    image_bytes = base64.b64decode(image_data.split(',')[1])
+    img_array = np.array(Image.open(io.BytesIO(image_bytes)))
+    if len(img_array.shape) == 3 and img_array.shape[2] == 3:
+        img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
+    faces = cascade.detectMultiScale(gray, 1.3, 5)
+    if len(faces) == 0:
+        return None, None
+    x, y, w, h = faces[0]
+    return (x, y, w, h), BiometricProcessor._extract_face_features(img_array[y:y+h, x:x+w])
+
+def current_box(image_data, frame_width):
+    gray = BiometricProcessor._load_grayscale(image_data)
+    face = BiometricProcessor._detect_face(gray)
+    if face is None:
+        return None
+    scale = frame_width / gray.shape[1]
+    return tuple(int(value * scale) for value in face)
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    overlap_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    overlap_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    overlap = overlap_w * overlap_h
+    return overlap / float(aw * ah + bw * bh - overlap)
+
+def build_corpus(rng):
+    portrait = Image.fromarray(data.astronaut())
+    corpus = []
+    for width, height in FRAME_SIZES:
+        for fraction in FACE_FRACTIONS:
+            for image_format in FORMATS:
+                background = rng.integers(60, 200, (height, width, 3), dtype=np.uint8)
+                frame = Image.fromarray(background)
+                side = int(min(width, height) * fraction)
+                left, top = (width - side) // 2, (height - side) // 2
+                frame.paste(portrait.resize((side, side)), (left, top))
+                
+                ratio = side / 512.0
+                fx, fy, fw, fh = PORTRAIT_FACE_BOX
+                truth = (left + int(fx * ratio), top + int(fy * ratio), int(fw * ratio), int(fh * ratio))
+                gray = np.asarray(frame.convert("L"))
+                reference = BiometricProcessor._extract_face_features(gray[truth[1]:truth[1] + truth[3], truth[0]:truth[0] + truth[2]])
+                
+                buffer = io.BytesIO()
+                frame.save(buffer, image_format, **({"quality": 90} if image_format == "JPEG" else {}))
+                mime = "jpeg" if image_format == "JPEG" else "png"
+                image_data = f"data:image/{mime};base64," + base64.b64encode(buffer.getvalue()).decode()
+                corpus.append(((width, height), image_data, truth, normalize(reference)))
+    return corpus
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+def main():
+    rng = np.random.default_rng(3)
+    corpus = build_corpus(rng)
+    cascade = HaarFaceDetector().classifier
+    BiometricProcessor.process_face_image(corpus[0][1])  # load the detector
+    
+    stats = defaultdict(lambda: defaultdict(list))
+    for size, image_data, truth, reference in corpus:
+        (legacy_face, legacy_features), legacy_ms = timed(lambda: legacy_pipeline(image_data, cascade))
+        current, current_ms = timed(lambda: BiometricProcessor.process_face_image(image_data))
+        current_face = current_box(image_data, size[0])
+        
+        row = stats[size]
+        row["legacy_ms"].append(legacy_ms)
+        row["current_ms"].append(current_ms)
+        row["legacy_hit"].append(legacy_face is not None and iou(legacy_face, truth) >= 0.5)
+        row["current_hit"].append(current_face is not None and iou(current_face, truth) >= 0.5)
+        row["legacy_cos"].append(float(np.dot(reference, normalize(legacy_features))) if legacy_features is not None else 0.0)
+        row["current_cos"].append(float(np.dot(reference, normalize(decode_template(current)))) if current else 0.0)
+    
+    print(f"{'frame':>11} | {'hit rate':>15} | {'template cos':>15} | {'ms':>17}")
+    print(f"{'':>11} | {'legacy':>7} {'new':>7} | {'legacy':>7} {'new':>7} | {'legacy':>8} {'new':>8}")
+    for size in FRAME_SIZES:
+        row = stats[size]
+        print(
+            f"{size[0]:>5}x{size[1]:<5} | "
+            f"{np.mean(row['legacy_hit']):>7.0%} {np.mean(row['current_hit']):>7.0%} | "
+            f"{np.mean(row['legacy_cos']):>7.3f} {np.mean(row['current_cos']):>7.3f} | "
+            f"{np.mean(row['legacy_ms']):>8.1f} {np.mean(row['current_ms']):>8.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark attendance HMAC verification.
+
+Compares re-keying hmac.new per row (the original implementation) with
+verify_many, which copies one pre-keyed HMAC state per row.
+
+Usage:
+    python benchmarks/bench_hmac_verify.py [row_counts...]
+"""
+import hashlib
+import hmac
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.hmac_integrity import HMACIntegrity
+
+def build_columns(integrity, count):
+    employee_ids = [i % 5000 for i in range(count)]
+    date_strs = [f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}" for i in range(count)]
+    statuses = ["present" if i % 7 else "absent" for i in range(count)]
+    latitudes = ["33.6425"] * count
+    longitudes = ["72.9930"] * count
+    stored_hmacs = [
+        integrity.compute_attendance_hmac(e, d, s, la, lo)
+        for e, d, s, la, lo in zip(employee_ids, date_strs, statuses, latitudes, longitudes)
+    ]
+    return employee_ids, date_strs, statuses, stored_hmacs, latitudes, longitudes
+
+def per_row(integrity, columns):
+    employee_ids, date_strs, statuses, stored_hmacs, latitudes, longitudes = columns
+    return [
+        hmac.compare_digest(
+            hmac.new(integrity.secret_key, f"{e}|{d}|{s}|{la}|{lo}".encode(), hashlib.sha256).hexdigest(),
+            h
+        )
+        for e, d, s, h, la, lo in zip(employee_ids, date_strs, statuses, stored_hmacs, latitudes, longitudes)
+    ]
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    
+    integrity = HMACIntegrity()
+    
+    print(f"{'rows':>9} {'per-row ms':>12} {'many ms':>10}")
+    for count in counts:
+        columns = build_columns(integrity, count)
+        per_row_ms, expected = timed(lambda: per_row(integrity, columns))
+        many_ms, many = timed(lambda: integrity.verify_many(*columns))
+        assert expected == many and all(expected)
+        print(f"{count:>9} {per_row_ms:>12.1f} {many_ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
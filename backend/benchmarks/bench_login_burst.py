@@ -0,0 +1,64 @@
+"""
+Benchmark a credential-stuffing burst against /api/auth/login.
+
+One client IP tries wrong passwords against a real account and a list of
+unknown emails. The run counts the database commits the burst causes and
+the login_attempts rows written after the buffered writer flushes. It
+also reports how many requests were turned away with 429 before reaching
+the database.
+
+Usage:
+    python benchmarks/bench_login_burst.py [attempts]
+"""
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+os.environ.setdefault("AES_KEY", "L2c-m5L9Dl7sRaRIMDzv3mS1mb6NaUfSj1TMSJETcfI=")
+
+def main():
+    attempts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    from sqlalchemy import event
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import SessionLocal, engine, async_engine
+    from app.models import User, LoginAttempt
+    from app.encryption import get_password_hash
+    from app.login_audit import login_attempt_writer
+
+    db = SessionLocal()
+    db.add(User(email="victim@example.com", hashed_password=get_password_hash("Correct-Horse-42!", "employee"), role="employee", is_active=True))
+    db.commit()
+
+    commits = []
+    for bind in (engine, async_engine.sync_engine):
+        event.listen(bind, "commit", lambda connection: commits.append(1))
+
+    statuses = {}
+    latencies = []
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        for i in range(attempts):
+            email = "victim@example.com" if i % 4 == 0 else f"user{i}@example.com"
+            request_started = time.perf_counter()
+            response = client.post("/api/auth/login", json={"email": email, "password": f"guess-{i}"})
+            latencies.append(time.perf_counter() - request_started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+        burst_commits = len(commits)
+    rows = db.query(LoginAttempt).count()
+    db.close()
+
+    latencies.sort()
+    print(f"{attempts} login attempts from one IP in {elapsed:.2f}s ({attempts / elapsed:.0f} req/s)")
+    print(f"latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"responses: {', '.join(f'{code} x{count}' for code, count in sorted(statuses.items()))}")
+    print(f"database commits during burst: {burst_commits}")
+    print(f"login_attempts rows written: {rows} in {login_attempt_writer.flushes} batches")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark approval emails sent inline vs through app.mail_queue.
+
+A local aiosmtpd server stands in for the SMTP provider. It adds
+HANDSHAKE_DELAY to every EHLO, which stands in for the TLS and login
+round trips of a real provider, and DATA_DELAY to every message. Two
+modes are compared:
+
+    inline  a blocking smtplib connection per message, opened on the
+            event loop (what approve_employee used to do)
+    queue   enqueue + commit per approval; the background worker sends
+            them over one pooled aiosmtplib connection
+
+A probe coroutine measures how late the event loop wakes it up, which is
+how long every other request would wait.
+
+Requires aiosmtpd (pip install aiosmtpd).
+
+Usage:
+    python benchmarks/bench_mail_queue.py [approvals]
+"""
+import asyncio
+import os
+import smtplib
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_mail.db")
+os.environ.setdefault("AES_KEY", "L2c-m5L9Dl7sRaRIMDzv3mS1mb6NaUfSj1TMSJETcfI=")
+os.environ.update({
+    "MAIL_TRANSPORT": "smtp",
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_PORT": "8025",
+    "SMTP_USERNAME": "",
+    "SMTP_STARTTLS": "false",
+    "FROM_EMAIL": "hr@example.com",
+})
+
+HANDSHAKE_DELAY = 0.15
+DATA_DELAY = 0.01
+PROBE_INTERVAL = 0.01
+
+class SlowHandler:
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE_DELAY)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(DATA_DELAY)
+        self.messages += 1
+        return "250 OK"
+
+async def measure(run):
+    lags = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    request_seconds, delivered_seconds = await run()
+    done.set()
+    await probe_task
+    lags.sort()
+    return request_seconds, delivered_seconds, lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+
+def main():
+    approvals = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    from aiosmtpd.controller import Controller
+    from app.database import SessionLocal, engine, Base
+    from app.mail_queue import mail_queue
+    from app.mail_templates import EMAIL_TEMPLATES
+    Base.metadata.create_all(bind=engine)
+
+    handler = SlowHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=8025)
+    controller.start()
+    template = EMAIL_TEMPLATES["approval"]
+
+    def render(i):
+        return template.render("hr@example.com", f"employee{i}@example.com", employee_name=f"Employee {i}", employee_id=f"EMP{i:04d}")
+
+    async def inline():
+        started = time.perf_counter()
+        for i in range(approvals):
+            server = smtplib.SMTP("127.0.0.1", 8025)
+            server.sendmail("hr@example.com", [f"employee{i}@example.com"], render(i))
+            server.quit()
+        elapsed = time.perf_counter() - started
+        return elapsed, elapsed
+
+    async def queued():
+        mail_queue.start()
+        db = SessionLocal()
+        started = time.perf_counter()
+        for i in range(approvals):
+            mail_queue.enqueue(db, f"employee{i}@example.com", template.subject, render(i))
+            db.commit()
+            await asyncio.sleep(0)
+        request_seconds = time.perf_counter() - started
+        while mail_queue.sent < approvals:
+            await asyncio.sleep(0.005)
+        delivered_seconds = time.perf_counter() - started
+        db.close()
+        await mail_queue.stop()
+        return request_seconds, delivered_seconds
+
+    print(f"{approvals} approval emails, {HANDSHAKE_DELAY * 1000:.0f} ms handshake, {DATA_DELAY * 1000:.0f} ms per message")
+    print(f"{'mode':<8}{'request ms/approval':>21}{'all delivered s':>17}{'connections':>13}{'loop lag p99 ms':>17}")
+    for mode, run in (("inline", inline), ("queue", queued)):
+        connections_before = handler.connections
+        request_seconds, delivered_seconds, lag = asyncio.run(measure(run))
+        print(f"{mode:<8}{request_seconds / approvals * 1000:>21.2f}{delivered_seconds:>17.2f}"
+              f"{handler.connections - connections_before:>13}{lag * 1000:>17.1f}")
+    controller.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark Argon2 verification during a burst of concurrent logins.
+
+Each simulated login verifies a password, a security answer and an OTP
+against hashes made with the original parameters (64 MiB, t=3, p=4), like
+/api/auth/login does. Three strategies are compared, each in a fresh
+process so peak RSS is measured separately:
+
+    inline     verify on the event loop (the original code)
+    to_thread  asyncio.to_thread with the default, unbounded-ish executor
+    hasher     app.encryption.password_hasher (bounded pool + semaphore)
+
+A probe coroutine measures how late the event loop wakes it up, which is
+how long any other request would wait.
+
+Usage:
+    python benchmarks/bench_password_hashing.py [logins]
+"""
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+VERIFICATIONS_PER_LOGIN = 3
+PROBE_INTERVAL = 0.01
+
+def run_mode(mode, logins, hashes, queue):
+    from app.encryption import pwd_context, password_hasher
+
+    async def verify(secret, hashed):
+        if mode == "inline":
+            return pwd_context.verify(secret, hashed)
+        if mode == "to_thread":
+            return await asyncio.to_thread(pwd_context.verify, secret, hashed)
+        return await password_hasher.verify(secret, hashed, "admin")
+
+    async def login(index):
+        started = time.perf_counter()
+        for secret, hashed in hashes:
+            assert await verify(secret, hashed)
+        return time.perf_counter() - started
+
+    async def main():
+        lags = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(PROBE_INTERVAL)
+                lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+        probe_task = asyncio.create_task(probe())
+        await asyncio.sleep(PROBE_INTERVAL * 2)
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(login(i) for i in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+        return elapsed, sorted(latencies), sorted(lags)
+
+    elapsed, latencies, lags = asyncio.run(main())
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put((elapsed, latencies, lags, peak_rss_mb, password_hasher.metrics()))
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    from app.encryption import pwd_context
+    hashes = [(secret, pwd_context.hash(secret)) for secret in ("Password123!", "blue", "482913")][:VERIFICATIONS_PER_LOGIN]
+
+    print(f"{logins} concurrent logins x {VERIFICATIONS_PER_LOGIN} Argon2 verifications, {os.cpu_count()} CPUs")
+    print(f"{'mode':<11}{'total s':>9}{'login p50 s':>13}{'login p99 s':>13}{'loop lag p99 ms':>17}{'peak RSS MB':>13}")
+    context = multiprocessing.get_context("spawn")
+    for mode in ("inline", "to_thread", "hasher"):
+        queue = context.Queue()
+        process = context.Process(target=run_mode, args=(mode, logins, hashes, queue))
+        process.start()
+        elapsed, latencies, lags, peak_rss_mb, metrics = queue.get()
+        process.join()
+        print(f"{mode:<11}{elapsed:>9.2f}{latencies[len(latencies) // 2]:>13.2f}"
+              f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:>13.2f}"
+              f"{lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000:>17.1f}{peak_rss_mb:>13.0f}")
+        if mode == "hasher":
+            print(f"hasher: {metrics['max_concurrent']} concurrent, avg queue wait {metrics['avg_queue_wait_ms']:.0f} ms, "
+                  f"max {metrics['max_queue_wait_ms']:.0f} ms, avg hash {metrics['avg_hash_ms']:.0f} ms")
+
+if __name__ == "__main__":
+    main()
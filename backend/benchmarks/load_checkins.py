@@ -0,0 +1,127 @@
+"""
+Load test concurrent attendance check-ins against SQLite.
+
+Simulates the morning burst: several worker processes (like uvicorn
+workers), each with a thread pool, mark attendance for distinct employees
+with the same write path as /api/employee/mark-attendance (insert, month
+digest refresh, commit). Runs once with the original engine (default
+pool, rollback journal) and once with app.database.create_database_engine
+for the given environment.
+
+Usage:
+    python benchmarks/load_checkins.py [check_ins] [processes] [threads] [environment]
+"""
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Worker processes inherit this, so they all open the same database file
+if "LOAD_TEST_DB" not in os.environ:
+    os.environ["LOAD_TEST_DB"] = os.path.join(tempfile.mkdtemp(), "load.db")
+DB_PATH = os.environ["LOAD_TEST_DB"]
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, create_database_engine
+from app.models import User, Employee, Attendance
+from app.hmac_integrity import hmac_integrity
+from app.integrity_digests import refresh_month_digest
+
+def legacy_engine():
+    return create_engine(os.environ["DATABASE_URL"], connect_args={"check_same_thread": False})
+
+def reset_database(employee_count):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    engine = legacy_engine()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=DELETE"))
+        conn.execute(User.__table__.insert(), [
+            {"email": f"employee{i}@example.com", "hashed_password": "x", "role": "employee", "is_active": True}
+            for i in range(employee_count)
+        ])
+        conn.execute(Employee.__table__.insert(), [
+            {"user_id": i + 1, "full_name": f"Employee {i}", "cnic": f"cnic-{i}", "employee_id": f"EMP{i:05d}",
+             "is_approved": True, "face_data": b"x"}
+            for i in range(employee_count)
+        ])
+    engine.dispose()
+
+def check_in(SessionMaker, employee_id):
+    started = time.perf_counter()
+    db = SessionMaker()
+    try:
+        db.query(Employee).filter(Employee.id == employee_id).first()
+        now = datetime.now()
+        attendance = Attendance(
+            employee_id=employee_id,
+            date=now,
+            day=now.date(),
+            status="present",
+            marked_at=now,
+            latitude="33.64",
+            longitude="72.99",
+            hmac=hmac_integrity.compute_attendance_hmac(employee_id, now.strftime("%Y-%m-%d"), "present", "33.64", "72.99")
+        )
+        db.add(attendance)
+        refresh_month_digest(db, employee_id, attendance.day)
+        db.commit()
+        return time.perf_counter() - started, None
+    except Exception as e:
+        db.rollback()
+        return time.perf_counter() - started, type(e).__name__ + ": " + str(e).split("\n")[0]
+    finally:
+        db.close()
+
+def run_worker(mode, environment, employee_ids, threads):
+    engine = legacy_engine() if mode == "legacy" else create_database_engine(environment=environment)
+    SessionMaker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda employee_id: check_in(SessionMaker, employee_id), employee_ids))
+    finished = time.time()
+    engine.dispose()
+    return started, finished, results
+
+def run(mode, check_ins, processes, threads, environment):
+    reset_database(check_ins)
+    slices = [list(range(worker + 1, check_ins + 1, processes)) for worker in range(processes)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+        outcomes = list(executor.map(run_worker, [mode] * processes, [environment] * processes, slices, [threads] * processes))
+
+    elapsed = max(outcome[1] for outcome in outcomes) - min(outcome[0] for outcome in outcomes)
+    results = [result for outcome in outcomes for result in outcome[2]]
+    latencies = sorted(latency * 1000 for latency, error in results if error is None)
+    errors = [error for _, error in results if error is not None]
+
+    print(f"{mode:<8}{len(latencies):>8}{len(errors):>8}{len(latencies) / elapsed:>12.1f}"
+          f"{statistics.median(latencies) if latencies else 0:>10.1f}"
+          f"{latencies[int(len(latencies) * 0.95)] if latencies else 0:>10.1f}")
+    if errors:
+        print(f"        e.g. {errors[0][:100]}")
+
+def main():
+    check_ins = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    environment = sys.argv[4] if len(sys.argv) > 4 else "production"
+
+    print(f"{check_ins} check-ins, {processes} processes x {threads} threads, tuned profile: {environment}")
+    print(f"{'engine':<8}{'ok':>8}{'failed':>8}{'writes/s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    run("legacy", check_ins, processes, threads, environment)
+    run("tuned", check_ins, processes, threads, environment)
+
+if __name__ == "__main__":
+    main()
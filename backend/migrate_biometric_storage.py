@@ -0,0 +1,100 @@
+"""
+Convert employee biometric columns from Fernet text to binary storage.
+
+Rows are read and rewritten in batches ordered by id, so memory stays
+bounded by the batch size and the tool can be stopped and re-run at any
+time: already converted values are skipped. The API reads both formats,
+so it does not need to be stopped while this runs.
+
+Usage:
+    python migrate_biometric_storage.py [batch_size] [--vacuum]
+"""
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, update, text
+from app.database import engine
+from app.migrations import run_migrations
+from app.models import Employee
+from app.biometric_storage import biometric_storage
+
+DEFAULT_BATCH_SIZE = 200
+
+employees = Employee.__table__
+
+CONVERTERS = {
+    "face_data": lambda value: biometric_storage.encrypt_face_template(biometric_storage.decrypt_face_template(value)),
+    "face_image": lambda value: biometric_storage.encrypt_face_image(biometric_storage.decrypt_face_image(value)),
+    "face_thumbnail": lambda value: biometric_storage.encrypt_thumbnail(biometric_storage.decrypt_thumbnail(value)),
+}
+
+def convert_row(row) -> dict:
+    """Return the new values for the legacy columns of one employee row"""
+    values = {}
+    for column, convert in CONVERTERS.items():
+        value = getattr(row, column)
+        if value and biometric_storage.is_legacy(value):
+            values[column] = convert(value)
+    return values
+
+def migrate(batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    stats = {"rows": 0, "converted": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+    columns = [employees.c[name] for name in CONVERTERS]
+    last_id = 0
+
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(employees.c.id, *columns)
+                .where(employees.c.id > last_id)
+                .order_by(employees.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            for row in rows:
+                stats["rows"] += 1
+                try:
+                    values = convert_row(row)
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"[MIGRATION] ⚠️ Employee {row.id} left unchanged: {e}")
+                    continue
+                if not values:
+                    continue
+
+                stats["bytes_before"] += sum(len(getattr(row, column)) for column in values)
+                stats["bytes_after"] += sum(len(value) for value in values.values())
+                conn.execute(update(employees).where(employees.c.id == row.id).values(**values))
+                stats["converted"] += 1
+
+            last_id = rows[-1].id
+        print(f"[MIGRATION] ... {stats['rows']} employees scanned, {stats['converted']} converted")
+
+    return stats
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    batch_size = int(args[0]) if args else DEFAULT_BATCH_SIZE
+
+    run_migrations(engine)
+    print(f"[MIGRATION] Converting biometric columns to binary storage (batch size {batch_size})...")
+    stats = migrate(batch_size)
+
+    print(f"[MIGRATION] ✅ {stats['converted']} of {stats['rows']} employees converted, {stats['failed']} failed")
+    if stats["bytes_before"]:
+        print(f"[MIGRATION]    Biometric data: {stats['bytes_before'] / 1024:.1f} KB -> {stats['bytes_after'] / 1024:.1f} KB "
+              f"({stats['bytes_after'] / stats['bytes_before']:.0%})")
+
+    if "--vacuum" in sys.argv and engine.dialect.name == "sqlite":
+        print("[MIGRATION] Running VACUUM to release freed pages...")
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        print("[MIGRATION] ✅ VACUUM complete")
+
+if __name__ == "__main__":
+    main()
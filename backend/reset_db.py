@@ -119,9 +119,9 @@ def create_user_in_db(user_data):
             print(f"User with email {user_data['email']} already exists. Skipping...\n")
             return False
         
-        hashed_password = get_password_hash(user_data["password"])
-        hashed_security_question = get_password_hash(user_data["security_question"])
-        hashed_security_answer = get_password_hash(user_data["security_answer"])
+        hashed_password = get_password_hash(user_data["password"], profile=user_data["role"])
+        hashed_security_question = get_password_hash(user_data["security_question"], profile="secret")
+        hashed_security_answer = get_password_hash(user_data["security_answer"], profile="secret")
         
         new_user = User(
             email=user_data["email"],
@@ -0,0 +1,51 @@
+"""
+Manage the signing keys used when JWT_ALGORITHM is EdDSA or ES256.
+
+Rotation without logging anyone out:
+
+    1. python rotate_jwt_keys.py generate
+       Adds a new public key to JWT_KEYSET_FILE (its private key goes to
+       JWT_PRIVATE_KEY_DIR). Nothing is signed with it yet; distribute the
+       key set to every node.
+    2. python rotate_jwt_keys.py activate <kid>
+       New tokens are signed with <kid>. The previous key keeps validating
+       for ACCESS_TOKEN_EXPIRE_HOURS, then its tokens are rejected.
+    3. python rotate_jwt_keys.py prune
+       Removes keys whose validation window has passed.
+
+Usage:
+    python rotate_jwt_keys.py list|generate|activate <kid>|prune
+"""
+import os
+import sys
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.jwt_keys import read_keyset, generate_key, activate_key, prune_keys, private_key_path
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "generate":
+        kid = generate_key()
+        print(f"[AUTH] ✅ Generated {settings.ALGORITHM} key {kid} (not active yet)")
+        print(f"[AUTH]    Distribute {settings.JWT_KEYSET_FILE} to every node, then run: python rotate_jwt_keys.py activate {kid}")
+    elif command == "activate" and len(sys.argv) > 2:
+        activate_key(sys.argv[2])
+        print(f"[AUTH] ✅ Signing new tokens with {sys.argv[2]}; the previous key validates for another {settings.ACCESS_TOKEN_EXPIRE_HOURS}h")
+    elif command == "prune":
+        removed = prune_keys()
+        print(f"[AUTH] ✅ Removed {len(removed)} retired keys{': ' + ', '.join(removed) if removed else ''}")
+    elif command == "list":
+        keyset = read_keyset()
+        for key in keyset["keys"]:
+            state = "active" if key["kid"] == keyset.get("active_kid") else (f"retires {key['not_after']}" if key.get("not_after") else "staged")
+            private = "private key present" if os.path.exists(private_key_path(key["kid"])) else "public only"
+            print(f"{key['kid']:<20}{key['alg']:<8}{state:<45}{private}")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
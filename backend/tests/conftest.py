@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import, so point the app at a scratch database first
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("AES_KEY", "L2c-m5L9Dl7sRaRIMDzv3mS1mb6NaUfSj1TMSJETcfI=")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
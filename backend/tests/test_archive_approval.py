@@ -0,0 +1,49 @@
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+
+from app.attendance_archive import archive_month
+from app.auth import create_access_token
+from app.database import SessionLocal, engine
+from app.hmac_integrity import hmac_integrity
+from app.main import app
+from app.models import Attendance, AttendanceArchive, Employee, User
+
+
+def test_approve_pending_record_after_its_month_is_archived():
+    db = SessionLocal()
+    user = User(email="late@example.com", hashed_password="x", role="employee", is_active=True)
+    db.add(user)
+    db.flush()
+    employee = Employee(user_id=user.id, full_name="Late Approval", cnic="35202-0000000-1", employee_id="EMP-LATE", face_data=b"template")
+    db.add(employee)
+    db.flush()
+    day = date(2025, 1, 15)
+    pending = Attendance(
+        employee_id=employee.id,
+        date=datetime(2025, 1, 15, 9),
+        day=day,
+        status="pending_approval",
+        latitude="33.6",
+        longitude="72.9",
+        hmac=hmac_integrity.compute_attendance_hmac(employee.id, "2025-01-15", "pending_approval", "33.6", "72.9")
+    )
+    db.add(pending)
+    db.commit()
+    attendance_id, employee_id = pending.id, employee.id
+    db.close()
+
+    assert archive_month(engine, "2025-01") == 1
+
+    admin = {"Authorization": "Bearer " + create_access_token({"sub": "admin@example.com", "role": "admin"})}
+    response = TestClient(app).post("/api/admin/approve-attendance", json={"attendance_id": attendance_id}, headers=admin)
+    assert response.status_code == 200
+
+    db = SessionLocal()
+    try:
+        assert db.query(Attendance).filter(Attendance.id == attendance_id).first() is None
+        archived = db.query(AttendanceArchive).filter(AttendanceArchive.id == attendance_id).one()
+        assert archived.status == "present"
+        assert archived.hmac == hmac_integrity.compute_attendance_hmac(employee_id, "2025-01-15", "present", "33.6", "72.9")
+    finally:
+        db.close()
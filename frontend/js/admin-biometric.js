@@ -40,8 +40,8 @@ function displayBiometricRequests(requests) {
             <td>${req.employee_id}</td>
             <td>${req.email}</td>
             <td>
-                ${req.face_image ? 
-                    `<img src="${req.face_image}" alt="Employee Photo" style="width: 50px; height: 50px; object-fit: cover; border-radius: 50%; border: 2px solid #4cc9f0; cursor: pointer;" onclick="window.open('${req.face_image}', '_blank')">` : 
+                ${req.face_thumbnail_url ? 
+                    `<img data-face-src="${req.face_thumbnail_url}" data-face-etag="${req.face_thumbnail_etag || ''}" alt="Employee Photo" style="width: 50px; height: 50px; object-fit: cover; border-radius: 50%; border: 2px solid #4cc9f0; cursor: pointer;" onclick="window.open(this.src, '_blank')">` : 
                     '<span style="color: #888;"><i class="fas fa-user-slash"></i> No Photo</span>'
                 }
             </td>
@@ -60,6 +60,8 @@ function displayBiometricRequests(requests) {
             </td>
         </tr>
     `).join('');
+    
+    showFaceImages(tbody);
 }
 
 async function approveBiometricRequest(requestId) {
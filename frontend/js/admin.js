@@ -184,7 +184,11 @@ async function debugStatus() {
         console.log('   Expected Role: admin');
         
         console.log('\n📊 Checking Backend Status...');
-        const statusResponse = await fetch(`${API_BASE}/api/debug/status`);
+        const statusResponse = await fetch(`${API_BASE}/api/debug/status`, {
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
         const statusData = await statusResponse.json();
         console.log('   Backend:', statusData.backend);
         console.log('   Database:', statusData.database);
@@ -124,7 +124,7 @@ async function verifyBiometricAndLogin() {
                 alert('Please capture your face image');
                 return;
             }
-            verifyData.face_image = loginBiometricCapture.getFaceData();
+            verifyData.face_image = await encryptionClient.encryptData(loginBiometricCapture.getFaceData());
         } else {
             alert('Please select a biometric method');
             return;
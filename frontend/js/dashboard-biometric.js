@@ -149,7 +149,7 @@ async function performFaceVerification(statusDiv) {
             },
             body: JSON.stringify({
                 email: localStorage.getItem('email'),
-                face_image: faceData,
+                face_image: await encryptionClient.encryptData(faceData),
                 fingerprint_image: ""
             })
         });
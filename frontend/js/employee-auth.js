@@ -728,6 +728,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             try {
                 setButtonLoading(submitBtn, true);
+                formData.face_image = await encryptionClient.encryptData(faceDataToUse);
                 
                 console.log('📤 Sending signup request with biometric data to:', `${API_BASE}/api/employee/signup`);
                 
@@ -20,21 +20,14 @@ async function loadEmployeeInfo() {
         console.log('[DEBUG] employeeId:', employeeId);
         console.log('[DEBUG] API_BASE:', API_BASE);
         
-        const response = await fetch(`${API_BASE}/api/debug/all-employees`, {
+        const response = await fetch(`${API_BASE}/api/employee/me`, {
             headers: {'Authorization': `Bearer ${token}`}
         });
         
         console.log('[DEBUG] Response status:', response.status);
         
         if (response.ok) {
-            const employees = await response.json();
-            console.log('[DEBUG] Employees received:', employees);
-            
-            // Ensure ID comparison is type-safe
-            const targetId = parseInt(employeeId);
-            const employee = employees.find(e => e.id === targetId);
-            
-            console.log('[DEBUG] Looking for employee ID:', targetId);
+            const employee = await response.json();
             console.log('[DEBUG] Found employee object:', employee);
             
             if (employee) {
@@ -48,24 +41,10 @@ async function loadEmployeeInfo() {
                 console.log('[DEBUG] Avatar element found:', avatarEl);
                 
                 if (avatarEl) {
-                    // Check both face_image and face_data as fallback
-                    let faceImage = employee.face_image;
+                    const faceImage = employee.face_thumbnail_url;
+                    console.log('[DEBUG] Face thumbnail URL:', faceImage);
                     
-                    // If face_image is missing/empty, try to use face_data if it looks like an image
-                    if ((!faceImage || faceImage.length < 100) && employee.face_data && employee.face_data.startsWith('data:image')) {
-                        console.log('[DEBUG] Using face_data as fallback image source');
-                        faceImage = employee.face_data;
-                    }
-
-                    console.log('[DEBUG] Face image data type:', typeof faceImage);
-                    console.log('[DEBUG] Face image length:', faceImage ? faceImage.length : 0);
                     if (faceImage) {
-                        // Clean up base64 string - remove newlines and spaces
-                        faceImage = faceImage.replace(/[\r\n\s]/g, '');
-                        console.log('[DEBUG] Face image start:', faceImage.substring(0, 50));
-                    }
-                    
-                    if (faceImage && faceImage.length > 100) {
                         console.log('[DEBUG] Attempting to set avatar image...');
                         
                         // Create a new image object to test loading
@@ -90,14 +69,14 @@ async function loadEmployeeInfo() {
                         };
                         
                         // Set src AFTER setting callbacks
-                        img.src = faceImage;
+                        loadFaceThumbnail(faceImage, employee.face_thumbnail_etag)
+                            .then(url => { img.src = url; })
+                            .catch(img.onerror);
                     } else {
                         console.warn('[WARN] No valid face image found for employee');
                         avatarEl.textContent = employee.full_name.charAt(0).toUpperCase();
                     }
                 }
-            } else {
-                console.log('[DEBUG] Employee not found in list. Looking for id:', parseInt(employeeId));
             }
         } else {
             console.error('[ERROR] Response not OK:', response.status, response.statusText);
@@ -1,14 +1,66 @@
+// Envelope format understood by backend/app/pq_crypto.py:
+//   env1.rsa.<RSA-OAEP wrapped AES key>.<nonce>.<AES-256-GCM ciphertext>
+// The AES key is wrapped once per page session; each payload only costs AES-GCM.
+// encryptData never falls back to plaintext: if no session can be set up it throws.
+const ENVELOPE_PREFIX = 'env1.';
+
+function toBase64(bytes) {
+  let binary = '';
+  const chunkSize = 0x8000;
+  for (let i = 0; i < bytes.length; i += chunkSize) {
+    binary += String.fromCharCode.apply(null, bytes.subarray(i, i + chunkSize));
+  }
+  return btoa(binary);
+}
+
+function pemToBytes(pem) {
+  const body = pem.replace(/-----[^-]+-----/g, '').replace(/\s+/g, '');
+  return Uint8Array.from(atob(body), c => c.charCodeAt(0));
+}
+
 class EncryptionClient {
   constructor() {
     this.publicKey = null;
     this.isReady = false;
     this.algorithm = null;
+    this.session = null;
+    this.initPromise = null;
   }
 
-  async init() {
+  async startSession() {
+    const rsaKey = await crypto.subtle.importKey(
+      'spki', pemToBytes(this.publicKey), { name: 'RSA-OAEP', hash: 'SHA-256' }, false, ['encrypt']
+    );
+    const aesKey = await crypto.subtle.generateKey({ name: 'AES-GCM', length: 256 }, true, ['encrypt']);
+    const rawKey = await crypto.subtle.exportKey('raw', aesKey);
+    const wrappedKey = new Uint8Array(await crypto.subtle.encrypt({ name: 'RSA-OAEP' }, rsaKey, rawKey));
+    const prefix = new TextEncoder().encode(`${ENVELOPE_PREFIX}rsa.`);
+    const additionalData = new Uint8Array(prefix.length + wrappedKey.length);
+    additionalData.set(prefix);
+    additionalData.set(wrappedKey, prefix.length);
+    this.session = {
+      aesKey,
+      additionalData,
+      header: `${ENVELOPE_PREFIX}rsa.${toBase64(wrappedKey)}.`
+    };
+  }
+
+  init() {
+    if (!this.initPromise) {
+      this.initPromise = this.fetchPublicKey().then(data => {
+        if (!this.isReady) {
+          this.initPromise = null; // try again on the next call
+        }
+        return data;
+      });
+    }
+    return this.initPromise;
+  }
+
+  async fetchPublicKey() {
     try {
       console.log('🔐 Initializing RSA-4096 encryption client...');
-      const response = await fetch('https://localhost:8000/api/security/public-key', {
+      const response = await fetch(`${API_BASE}/api/security/public-key`, {
         method: 'GET',
         headers: {
           'Content-Type': 'application/json'
@@ -16,7 +68,7 @@ class EncryptionClient {
       });
 
       if (!response.ok) {
-        console.warn('⚠️ Could not fetch security info, proceeding with HTTPS transport security');
+        console.warn('⚠️ Could not fetch security info');
         this.isReady = false;
         return;
       }
@@ -33,29 +85,32 @@ class EncryptionClient {
       console.log(`   Type: ${this.encryptionType}`);
       console.log(`   Key Size: ${this.keySize}`);
       
+      await this.startSession();
       this.isReady = true;
       return data;
     } catch (error) {
       console.error('❌ Encryption init error:', error);
       this.isReady = false;
-      console.warn('⚠️ HTTPS provides transport layer encryption');
     }
   }
 
+  // Throws if the payload cannot be sealed; callers must not send it then
   async encryptData(data) {
-    if (!this.isReady || !this.publicKey) {
-      console.log('ℹ️  Transport encrypted via HTTPS (TLS 1.2+)');
-      return data;
+    if (!this.isReady) {
+      await this.init();
     }
-
-    try {
-      const dataStr = typeof data === 'string' ? data : JSON.stringify(data);
-      console.log(`🔒 Data will be secured with ${this.algorithm} + HTTPS`);
-      return data;
-    } catch (error) {
-      console.error('❌ Encryption error:', error);
-      return data;
+    if (!this.isReady || !this.session) {
+      throw new Error('Encryption is unavailable, so the data was not sent');
     }
+
+    const dataStr = typeof data === 'string' ? data : JSON.stringify(data);
+    const nonce = crypto.getRandomValues(new Uint8Array(12));
+    const ciphertext = await crypto.subtle.encrypt(
+      { name: 'AES-GCM', iv: nonce, additionalData: this.session.additionalData },
+      this.session.aesKey,
+      new TextEncoder().encode(dataStr)
+    );
+    return `${this.session.header}${toBase64(nonce)}.${toBase64(new Uint8Array(ciphertext))}`;
   }
 
   getSecurityStatus() {
@@ -64,7 +119,7 @@ class EncryptionClient {
       encryptionType: this.encryptionType,
       keySize: this.keySize,
       transportSecurity: 'TLS 1.2+ (HTTPS)',
-      status: this.isReady ? 'Active (RSA-4096)' : 'HTTPS Only'
+      status: this.isReady ? 'Active (RSA-4096 + AES-256-GCM envelope)' : 'Not initialized'
     };
   }
 }
@@ -0,0 +1,36 @@
+// Face images are only served with the bearer token, which <img src> cannot send.
+// They are fetched with the Authorization header and shown as blob URLs instead.
+const faceImageUrls = new Map(); // path + etag -> Promise of a blob URL
+
+function fetchFaceImage(path) {
+    return fetch(`${API_BASE}${path}`, {
+        headers: {
+            'Authorization': `Bearer ${localStorage.getItem('token')}`
+        }
+    }).then(response => {
+        if (!response.ok) {
+            throw new Error(`Face image request failed (${response.status})`);
+        }
+        return response.blob();
+    }).then(blob => URL.createObjectURL(blob));
+}
+
+// Thumbnails are keyed by their ETag, so the list refresh reuses the same blob URL
+function loadFaceThumbnail(path, etag) {
+    const key = `${path}#${etag || ''}`;
+    if (!faceImageUrls.has(key)) {
+        const request = fetchFaceImage(path);
+        request.catch(() => faceImageUrls.delete(key));
+        faceImageUrls.set(key, request);
+    }
+    return faceImageUrls.get(key);
+}
+
+// Fill every <img data-face-src="..." data-face-etag="..."> under root
+function showFaceImages(root) {
+    root.querySelectorAll('img[data-face-src]').forEach(img => {
+        loadFaceThumbnail(img.dataset.faceSrc, img.dataset.faceEtag)
+            .then(url => { img.src = url; })
+            .catch(error => console.error('Error loading face image:', error));
+    });
+}
@@ -68,8 +68,8 @@ function displayPendingApprovals(employees) {
     tbody.innerHTML = employees.map(emp => `
         <tr>
             <td>
-                ${emp.face_image ? 
-                    `<img src="${emp.face_image}" alt="Photo" style="width: 50px; height: 50px; border-radius: 50%; object-fit: cover; border: 2px solid var(--primary); cursor: pointer;" onclick="viewImage('${emp.face_image}')">` : 
+                ${emp.face_thumbnail_url ? 
+                    `<img data-face-src="${emp.face_thumbnail_url}" data-face-etag="${emp.face_thumbnail_etag || ''}" alt="Photo" style="width: 50px; height: 50px; border-radius: 50%; object-fit: cover; border: 2px solid var(--primary); cursor: pointer;" onclick="viewImage(this.src)">` : 
                     `<div style="width: 50px; height: 50px; border-radius: 50%; background: rgba(255,255,255,0.1); display: flex; align-items: center; justify-content: center; border: 2px solid var(--primary);"><i class="fas fa-user" style="color: var(--primary);"></i></div>`
                 }
             </td>
@@ -91,6 +91,7 @@ function displayPendingApprovals(employees) {
         </tr>
     `).join('');
     
+    showFaceImages(tbody);
     attachApproveListeners();
 }
 
@@ -126,6 +127,7 @@ function attachApproveListeners() {
 }
 
 let currentEmployeeId = null;
+let approvalImageUrl = null;
 
 function showApprovalModal(employeeId) {
     currentEmployeeId = employeeId;
@@ -137,8 +139,22 @@ function showApprovalModal(employeeId) {
     const imageContainer = document.getElementById('approval-employee-image-container');
     const imageElement = document.getElementById('approval-employee-image');
     
-    if (employee && employee.face_image) {
-        imageElement.src = employee.face_image;
+    if (employee && employee.face_image_url) {
+        // The list thumbnail is too small to check identity; show it only until the full image arrives
+        imageElement.removeAttribute('src');
+        if (employee.face_thumbnail_url) {
+            loadFaceThumbnail(employee.face_thumbnail_url, employee.face_thumbnail_etag).then(url => {
+                if (currentEmployeeId === employeeId && !approvalImageUrl) imageElement.src = url;
+            }).catch(() => {});
+        }
+        fetchFaceImage(employee.face_image_url).then(url => {
+            if (currentEmployeeId !== employeeId) {
+                URL.revokeObjectURL(url);
+                return;
+            }
+            approvalImageUrl = url;
+            imageElement.src = url;
+        }).catch(error => console.error('Error loading face image:', error));
         imageContainer.style.display = 'block';
     } else {
         imageContainer.style.display = 'none';
@@ -150,6 +166,10 @@ function showApprovalModal(employeeId) {
 function closeApprovalModal() {
     document.getElementById('approval-modal').style.display = 'none';
     currentEmployeeId = null;
+    if (approvalImageUrl) {
+        URL.revokeObjectURL(approvalImageUrl);
+        approvalImageUrl = null;
+    }
 }
 
 document.addEventListener('DOMContentLoaded', () => {